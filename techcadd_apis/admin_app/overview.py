@@ -0,0 +1,140 @@
+# admin_app/overview.py
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections
+from django.db.models import Count, Q, Sum
+from django.utils import timezone
+from staff_app.models import DailyRevenueRollup, Student_api, StudentRegistration
+
+OVERVIEW_CACHE_KEY = 'admin-overview'
+OVERVIEW_REFRESH_LOCK = 'admin-overview:refreshing'
+
+# One worker: a background refresh never piles up behind another
+_refresh_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix='admin-overview')
+_query_pool = None
+_query_pool_lock = threading.Lock()
+
+
+def _in_own_connection(query):
+    """Run a query function in a pool thread and close that thread's connection afterwards"""
+    def run():
+        try:
+            return query()
+        finally:
+            connections.close_all()
+    return run
+
+
+def _enquiries_by_centre(today):
+    month_start = today.replace(day=1)
+    return Student_api.objects.order_by().values('centre').annotate(
+        total=Count('id'),
+        today=Count('id', filter=Q(enquiry_date=today)),
+        this_month=Count('id', filter=Q(enquiry_date__gte=month_start)),
+        open=Count('id', filter=~Q(enquiry_status__in=Student_api.CLOSED_STATUSES)),
+        converted=Count('id', filter=Q(enquiry_status='admission_done')),
+    )
+
+
+def _registrations_by_branch(today):
+    month_start = today.replace(day=1)
+    return StudentRegistration.objects.order_by().values('branch').annotate(
+        total=Count('id'),
+        this_month=Count('id', filter=Q(created_at__date__gte=month_start)),
+        total_course_fee=Sum('total_course_fee'),
+        with_dues=Count('id', filter=Q(fee_balance__gt=0)),
+        outstanding_dues=Sum('fee_balance', filter=Q(fee_balance__gt=0)),
+    )
+
+
+def _collections_by_branch(today):
+    # Served from the revenue rollup, which is maintained from PaymentTransaction;
+    # net_amount is cash in less refunds, without fee adjustments
+    month_start = today.replace(day=1)
+    return DailyRevenueRollup.objects.filter(date__gte=month_start).order_by().values('branch').annotate(
+        today=Sum('net_amount', filter=Q(date=today)),
+        this_month=Sum('net_amount'),
+        payments_this_month=Sum('payment_count'),
+    )
+
+
+def _get_query_pool():
+    global _query_pool
+    with _query_pool_lock:
+        if _query_pool is None:
+            _query_pool = ThreadPoolExecutor(max_workers=3, thread_name_prefix='admin-overview-query')
+        return _query_pool
+
+
+def _plain(value):
+    return float(value) if isinstance(value, Decimal) else (value or 0)
+
+
+def compute_overview():
+    """Run the three grouped queries in parallel and merge them per branch"""
+    today = timezone.now().date()
+    pool = _get_query_pool()
+    futures = {
+        name: pool.submit(_in_own_connection(lambda query=query: list(query(today))))
+        for name, query in (
+            ('enquiries', _enquiries_by_centre),
+            ('registrations', _registrations_by_branch),
+            ('collections', _collections_by_branch),
+        )
+    }
+    results = {name: future.result() for name, future in futures.items()}
+
+    branches = {
+        code: {'branch': code, 'label': label, 'enquiries': {}, 'registrations': {}, 'collections': {}}
+        for code, label in StudentRegistration.CENTRE_CHOICES
+    }
+    keys = {'enquiries': 'centre', 'registrations': 'branch', 'collections': 'branch'}
+    totals = {name: {} for name in keys}
+    for name, rows in results.items():
+        for row in rows:
+            code = row.pop(keys[name])
+            values = {field: _plain(value) for field, value in row.items()}
+            if code in branches:
+                branches[code][name] = values
+            for field, value in values.items():
+                totals[name][field] = totals[name].get(field, 0) + value
+
+    return {
+        'date': today,
+        'computed_at': timezone.now(),
+        'branches': list(branches.values()),
+        'totals': totals,
+    }
+
+
+def _refresh():
+    try:
+        overview = compute_overview()
+        cache.set(OVERVIEW_CACHE_KEY, overview, getattr(settings, 'ADMIN_OVERVIEW_STALE_SECONDS', 600))
+    finally:
+        cache.delete(OVERVIEW_REFRESH_LOCK)
+
+
+def get_overview(force=False):
+    """
+    Stale-while-revalidate: fresh data is returned as is, stale data is returned at once
+    while one background refresh recomputes it, and only a cold cache computes inline
+    Returns (overview, is_stale)
+    """
+    overview = None if force else cache.get(OVERVIEW_CACHE_KEY)
+    if overview is None:
+        overview = compute_overview()
+        cache.set(OVERVIEW_CACHE_KEY, overview, getattr(settings, 'ADMIN_OVERVIEW_STALE_SECONDS', 600))
+        return overview, False
+
+    age = (timezone.now() - overview['computed_at']).total_seconds()
+    if age <= getattr(settings, 'ADMIN_OVERVIEW_FRESH_SECONDS', 60):
+        return overview, False
+
+    # cache.add is atomic, so only one request schedules the refresh
+    if cache.add(OVERVIEW_REFRESH_LOCK, True, 120):
+        _refresh_pool.submit(_in_own_connection(_refresh))
+    return overview, True
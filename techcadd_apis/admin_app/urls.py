@@ -16,4 +16,7 @@ urlpatterns = [
     path('staff/<int:staff_id>/', views.get_staff_detail, name='admin-staff-detail'),
     path('staff/<int:staff_id>/update/', views.update_staff_status, name='admin-update-staff'),
     path('staff/<int:staff_id>/delete/', views.delete_staff_account, name='admin-delete-staff'),
+    # Head office overview
+    path('overview/', views.admin_overview, name='admin-overview'),
+    path('cache-stats/', views.app_cache_stats, name='admin-cache-stats'),
 ]
\ No newline at end of file
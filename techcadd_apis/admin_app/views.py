@@ -210,4 +210,41 @@ def get_staff_detail(request, staff_id):
     except StaffProfile.DoesNotExist:
         return Response({
             'error': 'Staff account not found'
-        }, status=status.HTTP_404_NOT_FOUND)
\ No newline at end of file
+        }, status=status.HTTP_404_NOT_FOUND)
+# ----------------------------------------overview section start here -----------------------------------
+
+from .overview import get_overview
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def admin_overview(request):
+    """Per-branch enquiries, registrations, collections and dues for the head office screen"""
+    if not request.user.is_staff and not request.user.is_superuser:
+        return Response({
+            'error': 'Access denied. Admin privileges required.'
+        }, status=status.HTTP_403_FORBIDDEN)
+    
+    overview, is_stale = get_overview(force=request.GET.get('refresh') == '1')
+    
+    return Response({
+        **overview,
+        'stale': is_stale
+    })
+
+from techcadd_apis import app_cache
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def app_cache_stats(request):
+    """Hit/miss and latency counters of the application cache in the worker serving this request"""
+    if not request.user.is_staff and not request.user.is_superuser:
+        return Response({
+            'error': 'Access denied. Admin privileges required.'
+        }, status=status.HTTP_403_FORBIDDEN)
+    
+    if request.GET.get('reset') == '1':
+        app_cache.stats.reset()
+    
+    return Response({
+        'namespaces': app_cache.stats.snapshot()
+    })
@@ -0,0 +1,135 @@
+# staff_app/benchmarks.py
+import io
+import json
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+from wsgiref.util import setup_testing_defaults
+from django.core.handlers.wsgi import WSGIHandler
+from django.db.backends.signals import connection_created
+from rest_framework_simplejwt.tokens import AccessToken
+
+# Read-heavy endpoints a counselor's screen loads over and over
+STAFF_ENDPOINT_MIX = [
+    '/api/staff/dashboard/',
+    '/api/staff/students/stats/',
+    '/api/staff/students/list/',
+    '/api/staff/registrations/list/',
+    '/api/staff/registrations/dues/',
+    '/api/staff/students/follow-ups/',
+]
+
+
+def bearer_headers(user):
+    return {'HTTP_AUTHORIZATION': f'Bearer {AccessToken.for_user(user)}'}
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+class ConnectionCounter:
+    """Counts new database connections opened while active"""
+
+    def __init__(self):
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def _opened(self, sender, connection, **kwargs):
+        with self._lock:
+            self.count += 1
+
+    def __enter__(self):
+        connection_created.connect(self._opened, weak=False)
+        return self
+
+    def __exit__(self, *exc):
+        connection_created.disconnect(self._opened)
+
+
+def _environ(url, headers, method='GET', body=None):
+    parts = urlsplit(url)
+    environ = {
+        'REQUEST_METHOD': method,
+        'PATH_INFO': parts.path,
+        'QUERY_STRING': parts.query,
+        'SERVER_NAME': 'localhost',
+        'HTTP_HOST': 'localhost',
+    }
+    if body is not None:
+        payload = json.dumps(body).encode()
+        environ.update({
+            'CONTENT_TYPE': 'application/json',
+            'CONTENT_LENGTH': str(len(payload)),
+            'wsgi.input': io.BytesIO(payload),
+        })
+    environ.update(headers)
+    setup_testing_defaults(environ)
+    return environ
+
+
+def run_wsgi_benchmark(urls, headers=None, requests=200, concurrency=4, method='GET', body=None):
+    """
+    Drive the real WSGI handler from a thread pool, round-robin over urls
+    Unlike the test client this fires request_started/request_finished, so CONN_MAX_AGE
+    and pooling behave as they do behind gunicorn/uwsgi; body is sent as JSON
+    """
+    handler = WSGIHandler()
+    headers = headers or {}
+    latencies = {url: [] for url in urls}
+    statuses = {}
+    lock = threading.Lock()
+
+    def call(index):
+        url = urls[index % len(urls)]
+        collected = {}
+
+        def start_response(status, response_headers, exc_info=None):
+            collected['status'] = status.split(' ', 1)[0]
+
+        started = time.perf_counter()
+        result = handler(_environ(url, headers, method, body), start_response)
+        try:
+            for chunk in result:
+                pass
+        finally:
+            # Fires request_finished, which is where Django closes or keeps the connection
+            result.close()
+        elapsed = time.perf_counter() - started
+
+        with lock:
+            latencies[url].append(elapsed)
+            statuses[collected['status']] = statuses.get(collected['status'], 0) + 1
+
+    with ConnectionCounter() as connections_opened:
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            list(pool.map(call, range(requests)))
+        duration = time.perf_counter() - started
+
+    every = [value for values in latencies.values() for value in values]
+    return {
+        'requests': requests,
+        'concurrency': concurrency,
+        'duration': duration,
+        'requests_per_second': requests / duration if duration else 0.0,
+        'p50_ms': percentile(every, 50) * 1000,
+        'p99_ms': percentile(every, 99) * 1000,
+        'connections_opened': connections_opened.count,
+        'statuses': statuses,
+        'endpoints': [
+            {
+                'url': url,
+                'requests': len(values),
+                'mean_ms': statistics.mean(values) * 1000 if values else 0.0,
+                'p99_ms': percentile(values, 99) * 1000,
+            }
+            for url, values in latencies.items()
+        ],
+    }
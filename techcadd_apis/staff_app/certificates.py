@@ -0,0 +1,278 @@
+# staff_app/certificates.py
+import os
+import re
+import tempfile
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from pathlib import Path
+import django
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, F, Q
+from django.http import FileResponse
+from django.template.loader import render_to_string
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.response import Response
+from rest_framework.throttling import AnonRateThrottle
+from .models import StudentRegistration
+
+ISSUE_BATCH_SIZE = 500
+CERTIFICATE_TEMPLATE = 'staff_app/certificate.html'
+
+
+def eligible_condition(today):
+    """Same rule as StudentRegistration.is_eligible_for_certificate, as a query filter"""
+    return Q(paid_fee__gte=F('total_course_fee'), course_completion_date__lte=today)
+
+
+def certificate_scope(branch=None, course_id=None, course_type_id=None):
+    registrations = StudentRegistration.objects.all()
+    if branch:
+        registrations = registrations.filter(branch=branch)
+    if course_id:
+        registrations = registrations.filter(course_id=course_id)
+    if course_type_id:
+        registrations = registrations.filter(course_type_id=course_type_id)
+    return registrations
+
+
+def issue_certificates(branch=None, course_id=None, course_type_id=None, dry_run=False):
+    """
+    Issue certificates to every eligible registration in scope that has none yet
+    Returns a summary with the certificates issued (or that would be issued on a dry run)
+    """
+    today = timezone.now().date()
+    scope = certificate_scope(branch, course_id, course_type_id)
+    eligible = eligible_condition(today)
+
+    summary = scope.aggregate(
+        total_registrations=Count('id'),
+        already_issued=Count('id', filter=Q(certificate_issued=True)),
+        not_eligible=Count('id', filter=Q(certificate_issued=False) & ~eligible),
+    )
+
+    with transaction.atomic():
+        # Locked so a concurrent single issue cannot number the same rows
+        registrations = list(
+            scope.filter(eligible, certificate_issued=False)
+            .select_for_update()
+            .only('id', 'registration_number', 'student_name', 'certificate_number')
+            .order_by('id')
+        )
+        now = timezone.now()
+        for registration in registrations:
+            registration.certificate_issued = True
+            registration.certificate_issue_date = today
+            registration.generate_certificate_number()
+            registration.updated_at = now
+
+        if not dry_run:
+            StudentRegistration.objects.bulk_update(
+                registrations,
+                ['certificate_issued', 'certificate_issue_date', 'certificate_number', 'updated_at'],
+                batch_size=ISSUE_BATCH_SIZE
+            )
+            transaction.on_commit(lambda: forget_verifications(
+                [registration.certificate_number for registration in registrations]
+            ))
+
+    summary.update({
+        'issued': len(registrations),
+        'issue_date': today,
+        'dry_run': dry_run,
+        'certificates': [
+            {
+                'registration_number': registration.registration_number,
+                'student_name': registration.student_name,
+                'certificate_number': registration.certificate_number,
+            }
+            for registration in registrations
+        ],
+    })
+    return summary
+
+
+# Certificate documents
+# Rendered HTML is cached on disk under CERTIFICATE_ROOT/<template version>/<certificate number>.html.
+# Requests only ever read the cache; misses are rendered by a background thread pool and
+# batches by render_certificates across processes.
+
+_render_pool = None
+_render_lock = threading.Lock()
+_rendering = {}
+
+
+def get_template_version():
+    return str(getattr(settings, 'CERTIFICATE_TEMPLATE_VERSION', '1'))
+
+
+def certificate_path(certificate_number):
+    root = Path(getattr(settings, 'CERTIFICATE_ROOT', Path(settings.BASE_DIR) / 'certificates'))
+    safe_number = re.sub(r'[^A-Za-z0-9_-]', '_', certificate_number)
+    return root / get_template_version() / f'{safe_number}.html'
+
+
+def certificate_context(registration):
+    """Plain values only, so the context can be sent to a worker process"""
+    return {
+        'certificate_number': registration.certificate_number,
+        'registration_number': registration.registration_number,
+        'student_name': registration.student_name,
+        'father_name': registration.father_name,
+        'course_name': registration.course.name,
+        'course_type_name': registration.course_type.name,
+        'duration': registration.get_duration_months_display(),
+        'duration_hours': registration.duration_hours,
+        'joining_date': registration.joining_date,
+        'course_completion_date': registration.course_completion_date,
+        'branch': registration.get_branch_display(),
+        'issue_date': registration.certificate_issue_date,
+    }
+
+
+def render_certificate_file(context, force=False):
+    """Render one certificate to its cache path; written to a temp file and renamed so readers never see a partial file"""
+    path = certificate_path(context['certificate_number'])
+    if path.exists() and not force:
+        return str(path)
+
+    html = render_to_string(CERTIFICATE_TEMPLATE, context)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=path.parent, suffix='.tmp')
+    with os.fdopen(fd, 'w', encoding='utf-8') as f:
+        f.write(html)
+    os.replace(tmp_path, path)
+    return str(path)
+
+
+def _get_render_pool():
+    global _render_pool
+    with _render_lock:
+        if _render_pool is None:
+            _render_pool = ThreadPoolExecutor(
+                max_workers=getattr(settings, 'CERTIFICATE_RENDER_WORKERS', 2),
+                thread_name_prefix='certificate-render'
+            )
+        return _render_pool
+
+
+def _render_done(certificate_number, future):
+    with _render_lock:
+        if _rendering.get(certificate_number) is future:
+            del _rendering[certificate_number]
+
+
+def schedule_certificate_render(registration):
+    """Queue a render in the background pool unless one is already running for this certificate"""
+    context = certificate_context(registration)
+    number = context['certificate_number']
+    pool = _get_render_pool()
+    with _render_lock:
+        future = _rendering.get(number)
+        if future is not None:
+            return future
+        future = pool.submit(render_certificate_file, context)
+        _rendering[number] = future
+    # Outside the lock: the callback runs at once if the render already finished
+    future.add_done_callback(lambda done: _render_done(number, done))
+    return future
+
+
+def certificate_document_response(registration):
+    """Stream the cached document, or start rendering it and answer 202"""
+    if not registration.certificate_issued or not registration.certificate_number:
+        return Response({
+            'error': 'Certificate has not been issued yet'
+        }, status=status.HTTP_404_NOT_FOUND)
+
+    path = certificate_path(registration.certificate_number)
+    if path.exists():
+        return FileResponse(
+            open(path, 'rb'),
+            content_type='text/html; charset=utf-8',
+            as_attachment=True,
+            filename=f'{path.stem}.html'
+        )
+
+    schedule_certificate_render(registration)
+    return Response({
+        'status': 'rendering',
+        'message': 'Certificate document is being prepared, retry shortly'
+    }, status=status.HTTP_202_ACCEPTED, headers={'Retry-After': '2'})
+
+
+def _init_render_process():
+    # Needed when workers are spawned instead of forked
+    django.setup()
+
+
+def render_certificates_batch(registrations, processes=None, force=False):
+    """Render many certificates across worker processes; returns the number rendered"""
+    contexts = [
+        certificate_context(registration) for registration in registrations
+        if force or not certificate_path(registration.certificate_number).exists()
+    ]
+    if not contexts:
+        return 0
+
+    with ProcessPoolExecutor(max_workers=processes, initializer=_init_render_process) as pool:
+        list(pool.map(render_certificate_file, contexts, [force] * len(contexts), chunksize=20))
+    return len(contexts)
+
+
+# Public verification
+# Lookups hit the unique certificate_number index once, then the cache; unknown numbers are
+# cached too (for a shorter time) so repeated guesses never reach the database.
+
+VERIFY_CACHE_PREFIX = 'certificate-verify:'
+VERIFY_NOT_FOUND = 'not-found'
+
+
+class CertificateVerifyThrottle(AnonRateThrottle):
+    scope = 'certificate_verify'
+
+
+def normalize_certificate_number(certificate_number):
+    return certificate_number.strip().upper()
+
+
+def _verify_cache_key(certificate_number):
+    return VERIFY_CACHE_PREFIX + normalize_certificate_number(certificate_number)
+
+
+def forget_verifications(certificate_numbers):
+    """Drop cached verification results, e.g. a number cached as unknown that was just issued"""
+    cache.delete_many([_verify_cache_key(number) for number in certificate_numbers if number])
+
+
+def verify_certificate(certificate_number):
+    """Public details of an issued certificate, or None when the number is unknown"""
+    key = _verify_cache_key(certificate_number)
+    cached = cache.get(key)
+    if cached == VERIFY_NOT_FOUND:
+        return None
+    if cached is not None:
+        return cached
+
+    registration = StudentRegistration.objects.filter(
+        certificate_number=normalize_certificate_number(certificate_number),
+        certificate_issued=True
+    ).values(
+        'certificate_number', 'student_name', 'course__name', 'certificate_issue_date', 'branch'
+    ).first()
+
+    if registration is None:
+        cache.set(key, VERIFY_NOT_FOUND, getattr(settings, 'CERTIFICATE_VERIFY_NOT_FOUND_TTL', 300))
+        return None
+
+    details = {
+        'certificate_number': registration['certificate_number'],
+        'student_name': registration['student_name'],
+        'course_name': registration['course__name'],
+        'issue_date': registration['certificate_issue_date'],
+        'branch': dict(StudentRegistration.CENTRE_CHOICES).get(registration['branch'], registration['branch']),
+    }
+    cache.set(key, details, getattr(settings, 'CERTIFICATE_VERIFY_CACHE_TTL', 3600))
+    return details
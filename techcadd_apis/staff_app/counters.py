@@ -0,0 +1,175 @@
+# staff_app/counters.py
+from collections import defaultdict
+from decimal import Decimal
+import datetime
+from django.conf import settings
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Sum
+from django.db.models.functions import TruncDate
+from .models import EnquiryStatusChange, PaymentTransaction, StaffDailyCounter, Student_api, StudentRegistration
+
+COUNTER_FIELDS = ['enquiries_created', 'conversions', 'registrations_created', 'payments_received', 'payments_amount', 'follow_ups_due']
+
+
+def increment_row(model, key, deltas):
+    """
+    Add deltas to the row matching key with a single UPDATE ... SET f = f + n,
+    creating the row when it does not exist yet; runs in the caller's transaction
+    """
+    increments = {field: F(field) + value for field, value in deltas.items()}
+    with transaction.atomic():
+        if model.objects.filter(**key).update(**increments):
+            return
+        try:
+            with transaction.atomic():
+                model.objects.create(**key, **deltas)
+        except IntegrityError:
+            # A concurrent writer created the row first
+            model.objects.filter(**key).update(**increments)
+
+
+def bump_staff_counter(staff_id, date, **deltas):
+    deltas = {field: value for field, value in deltas.items() if value}
+    if staff_id and date and deltas:
+        increment_row(StaffDailyCounter, {'staff_id': staff_id, 'date': date}, deltas)
+
+
+def follow_up_slot(student):
+    """(counselor id, date) an open enquiry's follow-up is counted under, or None"""
+    if student.enquiry_status in Student_api.CLOSED_STATUSES:
+        return None
+    if not student.assign_enquiry_id or not student.next_follow_up_date:
+        return None
+    return (student.assign_enquiry_id, student.next_follow_up_date)
+
+
+def move_follow_ups(moves):
+    """Apply (old slot, new slot) pairs to the follow_ups_due counters"""
+    totals = defaultdict(int)
+    for old_slot, new_slot in moves:
+        if old_slot == new_slot:
+            continue
+        if old_slot:
+            totals[old_slot] -= 1
+        if new_slot:
+            totals[new_slot] += 1
+    for (staff_id, date), delta in totals.items():
+        bump_staff_counter(staff_id, date, follow_ups_due=delta)
+
+
+def staff_counters_for(staff_profile, date):
+    """The dashboard read: one lookup on the unique (staff, date) index"""
+    counters = StaffDailyCounter.objects.filter(staff=staff_profile, date=date).values(*COUNTER_FIELDS).first()
+    return counters or {field: 0 for field in COUNTER_FIELDS}
+
+
+def rebuild_staff_counters(since):
+    """Recompute counter rows from the source tables for dates from since onwards"""
+    rows = defaultdict(lambda: {field: 0 for field in COUNTER_FIELDS})
+
+    for group in Student_api.objects.filter(enquiry_date__gte=since).order_by().values(
+        'enquiry_taken_by', 'enquiry_date'
+    ).annotate(total=Count('id')):
+        rows[(group['enquiry_taken_by'], group['enquiry_date'])]['enquiries_created'] = group['total']
+
+    for group in EnquiryStatusChange.objects.filter(
+        changed_at__date__gte=since, to_status='admission_done', counselor__isnull=False
+    ).order_by().annotate(date=TruncDate('changed_at')).values('counselor', 'date').annotate(total=Count('id')):
+        rows[(group['counselor'], group['date'])]['conversions'] = group['total']
+
+    for group in StudentRegistration.objects.filter(created_at__date__gte=since).order_by().annotate(
+        date=TruncDate('created_at')
+    ).values('created_by', 'date').annotate(total=Count('id')):
+        rows[(group['created_by'], group['date'])]['registrations_created'] = group['total']
+
+    for group in PaymentTransaction.objects.filter(
+        payment_date__gte=since, entry_type='installment'
+    ).order_by().values('received_by', 'payment_date').annotate(total=Count('id'), amount=Sum('amount')):
+        row = rows[(group['received_by'], group['payment_date'])]
+        row['payments_received'] = group['total']
+        row['payments_amount'] = group['amount'] or Decimal('0')
+
+    for group in Student_api.objects.filter(
+        next_follow_up_date__gte=since, assign_enquiry__isnull=False
+    ).exclude(enquiry_status__in=Student_api.CLOSED_STATUSES).order_by().values(
+        'assign_enquiry', 'next_follow_up_date'
+    ).annotate(total=Count('id')):
+        rows[(group['assign_enquiry'], group['next_follow_up_date'])]['follow_ups_due'] = group['total']
+
+    counters = [
+        StaffDailyCounter(staff_id=staff_id, date=date, **values)
+        for (staff_id, date), values in rows.items()
+    ]
+    with transaction.atomic():
+        StaffDailyCounter.objects.filter(date__gte=since).delete()
+        StaffDailyCounter.objects.bulk_create(counters, batch_size=1000)
+    return len(counters)
+
+
+LEADERBOARD_METRICS = {
+    'conversions': 'conversions',
+    'registrations': 'registrations_created',
+    'collections': 'payments_amount',
+}
+
+
+def leaderboard_window(window, today):
+    """First day of the current day, week (from Monday) or month"""
+    if window == 'day':
+        return today
+    if window == 'week':
+        return today - datetime.timedelta(days=today.weekday())
+    if window == 'month':
+        return today.replace(day=1)
+    raise ValueError(window)
+
+
+def leaderboard(window, metric, today):
+    """
+    Active staff ranked by one metric over the window, summed from the daily counters
+    The ranking is cached per window start and metric for LEADERBOARD_CACHE_TTL seconds
+    """
+    start = leaderboard_window(window, today)
+    key = f'staff-leaderboard:{window}:{start.isoformat()}:{today.isoformat()}:{metric}'
+    ranking = cache.get(key)
+    if ranking is not None:
+        return ranking
+
+    totals = StaffDailyCounter.objects.filter(
+        date__gte=start,
+        date__lte=today,
+        staff__is_active=True
+    ).order_by().values(
+        'staff', 'staff__user__first_name', 'staff__user__last_name', 'staff__user__username', 'staff__role'
+    ).annotate(
+        conversions=Sum('conversions'),
+        registrations=Sum('registrations_created'),
+        collections=Sum('payments_amount'),
+    )
+
+    rows = []
+    for row in totals:
+        name = f"{row['staff__user__first_name']} {row['staff__user__last_name']}".strip()
+        rows.append({
+            'staff_id': row['staff'],
+            'name': name or row['staff__user__username'],
+            'role': row['staff__role'],
+            'conversions': row['conversions'] or 0,
+            'registrations': row['registrations'] or 0,
+            'collections': float(row['collections'] or 0),
+        })
+    # Ties on the chosen metric fall back to the other two
+    others = [name for name in LEADERBOARD_METRICS if name != metric]
+    rows.sort(key=lambda row: (row[metric], row[others[0]], row[others[1]]), reverse=True)
+    rows = [row for row in rows if any(row[name] for name in LEADERBOARD_METRICS)]
+
+    ranking = []
+    for position, row in enumerate(rows, start=1):
+        previous = ranking[-1] if ranking else None
+        # Equal scores share a rank
+        rank = previous['rank'] if previous and previous[metric] == row[metric] else position
+        ranking.append({'rank': rank, **row})
+
+    cache.set(key, ranking, getattr(settings, 'LEADERBOARD_CACHE_TTL', 60))
+    return ranking
@@ -0,0 +1,197 @@
+# staff_app/enquiry_funnel.py
+from collections import defaultdict
+from django.db import transaction
+from django.db.models import Count, Q, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+from .counters import bump_staff_counter, increment_row
+from .models import EnquiryFunnelDaily, EnquiryStatusChange, Student_api
+
+# group_by value -> rollup column
+DIMENSIONS = {
+    'enquiry_source': 'enquiry_source',
+    'trade': 'trade',
+    'centre': 'centre',
+    'counselor': 'counselor',
+}
+
+CONVERSION_STATUS = 'admission_done'
+
+
+def rollup_key(date, enquiry_source, trade, centre, counselor_id, status):
+    """Unique key of a funnel rollup row; unassigned enquiries are counted under counselor_key 0"""
+    return {
+        'date': date,
+        'enquiry_source': enquiry_source,
+        'trade': trade,
+        'centre': centre,
+        'counselor_id': counselor_id,
+        'counselor_key': counselor_id or 0,
+        'status': status,
+    }
+
+
+def record_status_changes(changes, changed_by=None):
+    """
+    Append history rows for (student, from_status) pairs whose status differs and
+    add them to the daily funnel rollup, in the caller's transaction
+    """
+    now = timezone.now()
+    today = timezone.localdate(now)
+    history = []
+    totals = defaultdict(lambda: {'entries': 0, 'first_entries': 0, 'days_since_enquiry_total': 0})
+    conversions = defaultdict(int)
+
+    for student, from_status in changes:
+        if from_status == student.enquiry_status:
+            continue
+        days = max((today - student.enquiry_date).days, 0) if student.enquiry_date else 0
+        history.append(EnquiryStatusChange(
+            student=student,
+            from_status=from_status or '',
+            to_status=student.enquiry_status,
+            counselor_id=student.assign_enquiry_id,
+            enquiry_source=student.enquiry_source,
+            trade=student.trade,
+            centre=student.centre,
+            changed_by=changed_by,
+            days_since_enquiry=days,
+            changed_at=now,
+        ))
+        key = (student.enquiry_source, student.trade, student.centre, student.assign_enquiry_id, student.enquiry_status)
+        totals[key]['entries'] += 1
+        totals[key]['first_entries'] += 0 if from_status else 1
+        totals[key]['days_since_enquiry_total'] += days
+        if student.enquiry_status == CONVERSION_STATUS:
+            conversions[student.assign_enquiry_id] += 1
+
+    if not history:
+        return 0
+
+    with transaction.atomic():
+        EnquiryStatusChange.objects.bulk_create(history)
+        for dimensions, deltas in totals.items():
+            increment_row(EnquiryFunnelDaily, rollup_key(today, *dimensions), {
+                field: value for field, value in deltas.items() if value
+            })
+        for counselor_id, count in conversions.items():
+            bump_staff_counter(counselor_id, today, conversions=count)
+    return len(history)
+
+
+def seed_missing_history():
+    """Give enquiries created before status history existed one entry into their current status"""
+    students = Student_api.objects.filter(status_changes__isnull=True).only(
+        'id', 'enquiry_status', 'assign_enquiry', 'enquiry_source', 'trade', 'centre', 'enquiry_date', 'created_at'
+    )
+    history = [
+        EnquiryStatusChange(
+            student=student,
+            from_status='',
+            to_status=student.enquiry_status,
+            counselor_id=student.assign_enquiry_id,
+            enquiry_source=student.enquiry_source,
+            trade=student.trade,
+            centre=student.centre,
+            days_since_enquiry=0,
+            changed_at=student.created_at,
+        )
+        for student in students.iterator(chunk_size=1000)
+    ]
+    EnquiryStatusChange.objects.bulk_create(history, batch_size=1000)
+    return len(history)
+
+
+def rebuild_funnel(since=None):
+    """
+    Recompute daily funnel rows from the status history, using the dimensions
+    snapshotted on each change rather than the enquiry's current ones
+    """
+    history = EnquiryStatusChange.objects.all()
+    rollups = EnquiryFunnelDaily.objects.all()
+    if since:
+        history = history.filter(changed_at__date__gte=since)
+        rollups = rollups.filter(date__gte=since)
+
+    grouped = history.order_by().annotate(date=TruncDate('changed_at')).values(
+        'date', 'enquiry_source', 'trade', 'centre', 'counselor', 'to_status'
+    ).annotate(
+        entries=Count('id'),
+        first_entries=Count('id', filter=Q(from_status='')),
+        days_since_enquiry_total=Sum('days_since_enquiry'),
+    )
+    rows = [
+        EnquiryFunnelDaily(
+            **rollup_key(
+                group['date'], group['enquiry_source'], group['trade'], group['centre'],
+                group['counselor'], group['to_status']
+            ),
+            entries=group['entries'],
+            first_entries=group['first_entries'],
+            days_since_enquiry_total=group['days_since_enquiry_total'],
+        )
+        for group in grouped
+    ]
+
+    with transaction.atomic():
+        rollups.delete()
+        EnquiryFunnelDaily.objects.bulk_create(rows, batch_size=1000)
+    return len(rows)
+
+
+def funnel_rollups(start_date, end_date, counselor=None, **filters):
+    rollups = EnquiryFunnelDaily.objects.filter(date__gte=start_date, date__lte=end_date)
+    if counselor is not None:
+        rollups = rollups.filter(counselor=counselor)
+    for field, value in filters.items():
+        if value:
+            rollups = rollups.filter(**{field: value})
+    return rollups
+
+
+def funnel_report(rollups, group_by=None):
+    """
+    Entries into each status per group, with the conversion rate over the enquiries
+    that entered the funnel (first status, whatever it was) in the same range
+    """
+    columns = [DIMENSIONS[group_by]] if group_by else []
+    grouped = rollups.order_by().values(*columns, 'status').annotate(
+        total=Sum('entries'), first_entries=Sum('first_entries')
+    )
+
+    groups = defaultdict(lambda: {status: 0 for status, label in Student_api.ENQUIRY_STATUS})
+    intake = defaultdict(int)
+    for row in grouped:
+        key = row[columns[0]] if columns else 'all'
+        groups[key][row['status']] += row['total']
+        intake[key] += row['first_entries']
+
+    report = []
+    for key, stages in groups.items():
+        report.append({
+            'key': key,
+            'enquiries': intake[key],
+            'stages': stages,
+            'conversion_rate': round(stages[CONVERSION_STATUS] * 100 / intake[key], 2) if intake[key] else None,
+        })
+    return report
+
+
+def time_to_status_report(rollups, status=CONVERSION_STATUS, group_by=None):
+    """Average days from enquiry to reaching a status, per group"""
+    columns = [DIMENSIONS[group_by]] if group_by else []
+    sums = {'entries': Sum('entries'), 'days_total': Sum('days_since_enquiry_total')}
+    rollups = rollups.filter(status=status).order_by()
+    if columns:
+        grouped = rollups.values(*columns).annotate(**sums)
+    else:
+        totals = rollups.aggregate(**sums)
+        grouped = [totals] if totals['entries'] else []
+    return [
+        {
+            'key': row[columns[0]] if columns else 'all',
+            'conversions': row['entries'],
+            'average_days': round(row['days_total'] / row['entries'], 1) if row['entries'] else None,
+        }
+        for row in grouped
+    ]
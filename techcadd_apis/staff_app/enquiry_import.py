@@ -0,0 +1,196 @@
+# staff_app/enquiry_import.py
+import csv
+import io
+import json
+from django.db import DatabaseError, IntegrityError, transaction
+from rest_framework import serializers
+from techcadd_apis import app_cache
+from .models import StaffProfile, Student_api, generate_password
+from .serializers import ImportStudentRowSerializer
+from .counters import bump_staff_counter, follow_up_slot, move_follow_ups
+from .enquiry_funnel import record_status_changes
+from .usernames import allocate_usernames
+
+DEFAULT_CHUNK_SIZE = 500
+
+
+def read_enquiry_rows(fileobj, filename=''):
+    """Parse an uploaded CSV or JSON file into a list of row dicts"""
+    raw = fileobj.read()
+    if isinstance(raw, bytes):
+        raw = raw.decode('utf-8-sig')
+
+    if filename.lower().endswith('.json') or raw.lstrip().startswith(('[', '{')):
+        data = json.loads(raw)
+        if isinstance(data, dict):
+            data = data.get('students')
+        if not isinstance(data, list):
+            raise ValueError('JSON must be a list of enquiries or {"students": [...]}')
+        return data
+
+    return list(csv.DictReader(io.StringIO(raw)))
+
+
+def _clean_row(row):
+    """Strip whitespace and drop blank cells so model defaults apply"""
+    cleaned = {}
+    for key, value in row.items():
+        if key is None:
+            continue
+        if isinstance(value, str):
+            value = value.strip()
+            if value == '':
+                continue
+        cleaned[key.strip()] = value
+    return cleaned
+
+
+def _error_messages(errors):
+    return {field: [str(message) for message in messages] for field, messages in errors.items()}
+
+
+def _insert_chunk(pending):
+    """
+    Insert a chunk with one bulk query, falling back to row by row on conflicts
+    Returns the created (row number, student) pairs and the per-row errors
+    """
+    students = [student for row_number, student in pending]
+    errors = []
+    try:
+        with transaction.atomic():
+            Student_api.objects.bulk_create(students)
+        created = pending
+    except IntegrityError:
+        # Another request took one of the emails or usernames meanwhile
+        created = []
+        for row_number, student in pending:
+            student.pk = None
+            student.username = ''
+            try:
+                with transaction.atomic():
+                    student.save()
+                created.append((row_number, student))
+            except IntegrityError as e:
+                errors.append({'row': row_number, 'errors': {'non_field_errors': [str(e)]}})
+    return created, errors
+
+
+def _record_new_enquiries(students, staff_profile):
+    # MySQL does not return primary keys from bulk_create
+    missing = [student for student in students if student.pk is None]
+    if missing:
+        ids = dict(Student_api.objects.filter(
+            username__in=[student.username for student in missing]
+        ).values_list('username', 'id'))
+        for student in missing:
+            student.pk = student.id = ids.get(student.username)
+        if any(student.pk is None for student in missing):
+            raise DatabaseError('Could not read back the ids of the inserted enquiries')
+    record_status_changes([(student, '') for student in students], changed_by=staff_profile)
+    bump_staff_counter(staff_profile.id, students[0].enquiry_date, enquiries_created=len(students))
+    move_follow_ups([(None, follow_up_slot(student)) for student in students])
+
+
+def _save_chunk(pending, staff_profile, report):
+    """
+    Insert a chunk together with its status history, staff counter and follow-up slots
+    in one transaction, so a failure part way leaves nothing of the chunk behind
+    """
+    try:
+        with transaction.atomic():
+            created, errors = _insert_chunk(pending)
+            if created:
+                _record_new_enquiries([student for row_number, student in created], staff_profile)
+    except DatabaseError as e:
+        report['errors'].extend(
+            {'row': row_number, 'errors': {'non_field_errors': [f'Not saved: {e}']}}
+            for row_number, student in pending
+        )
+        return 0
+
+    report['errors'].extend(errors)
+    for row_number, student in created:
+        report['created_students'].append({
+            'row': row_number,
+            'student_name': student.student_name,
+            'username': student.username,
+            'password': student.password,
+        })
+    report['created'] += len(created)
+    return len(created)
+
+
+def import_enquiries(rows, staff_profile, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Validate and insert enquiry rows in chunks
+    Returns a report with created credentials and per-row errors
+    """
+    staff_ids = set(StaffProfile.objects.filter(is_active=True).values_list('id', flat=True))
+    report = {
+        'total_rows': len(rows),
+        'created': 0,
+        'failed': 0,
+        'errors': [],
+        'created_students': [],
+    }
+    seen_emails = set()
+    # One serializer instance so its fields are built once, not per row
+    validator = ImportStudentRowSerializer(context={'staff_ids': staff_ids})
+
+    for start in range(0, len(rows), chunk_size):
+        valid_rows = []
+        for offset, row in enumerate(rows[start:start + chunk_size]):
+            row_number = start + offset + 1
+            if not isinstance(row, dict):
+                report['errors'].append({'row': row_number, 'errors': {'non_field_errors': ['Row must be an object']}})
+                continue
+
+            try:
+                data = validator.run_validation(_clean_row(row))
+            except serializers.ValidationError as e:
+                report['errors'].append({'row': row_number, 'errors': _error_messages(e.detail)})
+                continue
+
+            email = data['email'].lower()
+            if email in seen_emails:
+                report['errors'].append({'row': row_number, 'errors': {'email': ['Duplicate email in this import.']}})
+                continue
+            seen_emails.add(email)
+            valid_rows.append((row_number, data))
+
+        if not valid_rows:
+            continue
+
+        existing_emails = {
+            email.lower() for email in Student_api.objects.filter(
+                email__in=[data['email'] for row_number, data in valid_rows]
+            ).values_list('email', flat=True)
+        }
+
+        pending = []
+        for row_number, data in valid_rows:
+            if data['email'].lower() in existing_emails:
+                report['errors'].append({'row': row_number, 'errors': {'email': ['A student with this email already exists.']}})
+                continue
+            data = dict(data)
+            data['assign_enquiry_id'] = data.pop('assign_enquiry', None) or staff_profile.id
+            pending.append((row_number, Student_api(
+                enquiry_taken_by=staff_profile,
+                password=generate_password(),
+                **data
+            )))
+
+        if not pending:
+            continue
+
+        usernames = allocate_usernames(Student_api, [student.student_name for row_number, student in pending])
+        for (row_number, student), username in zip(pending, usernames):
+            student.username = username
+
+        if _save_chunk(pending, staff_profile, report):
+            # bulk_create sends no post_save
+            app_cache.invalidate('stats')
+
+    report['errors'].sort(key=lambda error: error['row'])
+    report['failed'] = len(report['errors'])
+    return report
@@ -0,0 +1,48 @@
+# staff_app/enquiry_stats.py
+from collections import Counter
+from django.conf import settings
+from django.db.models import Count
+from techcadd_apis import app_cache
+from .models import Student_api
+
+
+def _distribution(counter, field):
+    return [{field: value, 'count': count} for value, count in counter.items()]
+
+
+def compute_student_stats(students):
+    """One GROUP BY over (trade, status, centre), folded into every total and distribution"""
+    groups = students.order_by().values('trade', 'enquiry_status', 'centre').annotate(count=Count('id'))
+
+    trades, statuses, centres = Counter(), Counter(), Counter()
+    for group in groups:
+        trades[group['trade']] += group['count']
+        statuses[group['enquiry_status']] += group['count']
+        centres[group['centre']] += group['count']
+
+    return {
+        'total_students': sum(statuses.values()),
+        'new_enquiries': statuses['new'],
+        'converted_students': statuses['admission_done'],
+        'trade_distribution': _distribution(trades, 'trade'),
+        'status_distribution': _distribution(statuses, 'enquiry_status'),
+        'centre_distribution': _distribution(centres, 'centre'),
+    }
+
+
+def student_stats_for(staff_profile):
+    """Managers see every enquiry, everyone else the enquiries assigned to them"""
+    if staff_profile.role == 'manager':
+        scope = 'all'
+        students = Student_api.objects.all()
+    else:
+        scope = f'staff:{staff_profile.id}'
+        students = Student_api.objects.filter(assign_enquiry=staff_profile)
+
+    # The stats namespace is bumped on every enquiry write (see signals.py)
+    return app_cache.get_or_set(
+        'stats',
+        f'student-stats:{scope}',
+        lambda: compute_student_stats(students),
+        getattr(settings, 'STUDENT_STATS_CACHE_TTL', 60)
+    )
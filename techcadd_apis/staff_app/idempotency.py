@@ -0,0 +1,122 @@
+# staff_app/idempotency.py
+import datetime
+import functools
+import hashlib
+import json
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.renderers import JSONRenderer
+from rest_framework.response import Response
+from .models import IdempotencyKey
+
+IDEMPOTENCY_KEY_HEADER = 'Idempotency-Key'
+
+
+def get_ttl():
+    return getattr(settings, 'IDEMPOTENCY_KEY_TTL', datetime.timedelta(hours=24))
+
+
+def get_lease():
+    return getattr(settings, 'IDEMPOTENCY_KEY_LEASE', datetime.timedelta(seconds=60))
+
+
+def request_fingerprint(request):
+    """Hash of everything that makes two POSTs the same request"""
+    payload = json.dumps({
+        'method': request.method,
+        'path': request.path,
+        'query': sorted(request.query_params.lists()),
+        'data': request.data,
+    }, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def _replay(record, fingerprint):
+    if record.request_fingerprint != fingerprint:
+        return Response({
+            'error': 'Idempotency-Key was already used for a different request'
+        }, status=status.HTTP_422_UNPROCESSABLE_ENTITY)
+
+    if record.response_status is None:
+        return Response({
+            'error': 'A request with this Idempotency-Key is still being processed'
+        }, status=status.HTTP_409_CONFLICT)
+
+    return Response(
+        json.loads(record.response_body),
+        status=record.response_status,
+        headers={'Idempotent-Replayed': 'true'}
+    )
+
+
+def idempotent(view):
+    """
+    Replay the stored response when a POST is retried with the same Idempotency-Key
+    Place below @api_view so request.user is the authenticated staff user
+    """
+    @functools.wraps(view)
+    def wrapper(request, *args, **kwargs):
+        key = request.headers.get(IDEMPOTENCY_KEY_HEADER)
+        if not key or not isinstance(request.user, User):
+            return view(request, *args, **kwargs)
+
+        if len(key) > 255:
+            return Response({
+                'error': 'Idempotency-Key must be at most 255 characters'
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        lookup = {'user': request.user, 'endpoint': view.__name__, 'key': key}
+        fingerprint = request_fingerprint(request)
+        now = timezone.now()
+
+        # Single lookup on the unique (user, endpoint, key) index. An expired record is
+        # either a stored response past its TTL or the lease of a request whose worker died
+        record = IdempotencyKey.objects.filter(**lookup).first()
+        if record and record.expires_at <= now:
+            record.delete()
+            record = None
+        if record:
+            return _replay(record, fingerprint)
+
+        try:
+            with transaction.atomic():
+                # Held for a short lease only, so a request killed mid-way blocks retries briefly
+                record = IdempotencyKey.objects.create(
+                    request_fingerprint=fingerprint,
+                    expires_at=now + get_lease(),
+                    **lookup
+                )
+        except IntegrityError:
+            # A concurrent retry claimed the key first
+            record = IdempotencyKey.objects.filter(**lookup).first()
+            if record:
+                return _replay(record, fingerprint)
+            return Response({
+                'error': 'A request with this Idempotency-Key is still being processed'
+            }, status=status.HTTP_409_CONFLICT)
+
+        try:
+            response = view(request, *args, **kwargs)
+        except Exception:
+            record.delete()
+            raise
+
+        # Server errors are not stored so the client can retry them
+        if response.status_code >= 500 or getattr(response, 'data', None) is None:
+            record.delete()
+            return response
+
+        body = JSONRenderer().render(response.data).decode()
+        # A no-op when the lease ran out and a retry reclaimed the key meanwhile
+        IdempotencyKey.objects.filter(pk=record.pk).update(
+            response_status=response.status_code,
+            response_body=body,
+            response_hash=hashlib.sha256(body.encode()).hexdigest(),
+            expires_at=timezone.now() + get_ttl(),
+        )
+        return response
+
+    return wrapper
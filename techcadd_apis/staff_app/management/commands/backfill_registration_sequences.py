@@ -0,0 +1,50 @@
+# staff_app/management/commands/backfill_registration_sequences.py
+#  python manage.py backfill_registration_sequences
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from staff_app.models import RegistrationSequence, StudentRegistration
+
+class Command(BaseCommand):
+    help = 'Set each branch registration sequence to the highest registration number already issued'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Only report the values that would be written'
+        )
+
+    def handle(self, *args, **options):
+        # One pass over existing numbers, grouped by branch code in Python
+        highest = {code: 0 for code in StudentRegistration.BRANCH_CODES.values()}
+        numbers = StudentRegistration.objects.filter(
+            registration_number__startswith='TCD/'
+        ).values_list('registration_number', flat=True)
+        for registration_number in numbers.iterator():
+            parsed = RegistrationSequence.parse_number(registration_number)
+            if parsed:
+                branch_code, number = parsed
+                highest[branch_code] = max(highest.get(branch_code, 0), number)
+
+        with transaction.atomic():
+            sequences = {
+                sequence.branch_code: sequence
+                for sequence in RegistrationSequence.objects.select_for_update().filter(branch_code__in=highest)
+            }
+            for branch_code, number in sorted(highest.items()):
+                sequence = sequences.get(branch_code)
+                current = sequence.last_number if sequence else None
+                if current is not None and current >= number:
+                    self.stdout.write(f"{branch_code}: up to date ({current})")
+                    continue
+
+                self.stdout.write(f"{branch_code}: {current if current is not None else 'missing'} -> {number}")
+                if options['dry_run']:
+                    continue
+                if sequence:
+                    sequence.last_number = number
+                    sequence.save(update_fields=['last_number', 'updated_at'])
+                else:
+                    RegistrationSequence.objects.create(branch_code=branch_code, last_number=number)
+
+        self.stdout.write(self.style.SUCCESS('Registration sequences backfilled'))
@@ -0,0 +1,60 @@
+# staff_app/management/commands/benchmark_compression.py
+#  python manage.py benchmark_compression [--rows 5000] [--repeat 3]
+#  Bodies are rendered from existing registrations and enquiries, cycled up to --rows;
+#  with a small sample the repeated rows make the ratios optimistic
+import itertools
+import time
+from django.core.management.base import BaseCommand
+from rest_framework.renderers import JSONRenderer
+from staff_app.models import Student_api, StudentRegistration
+from staff_app.serializers import StudentListSerializer, StudentRegistrationSerializer
+from techcadd_apis import compression
+
+class Command(BaseCommand):
+    help = 'CPU time vs. bytes saved for gzip and brotli levels on large list responses'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=5000, help='Rows per list response')
+        parser.add_argument('--repeat', type=int, default=3, help='Compressions per setting; the best time is reported')
+        parser.add_argument('--sample', type=int, default=500, help='Existing rows serialized and cycled')
+
+    def handle(self, *args, **options):
+        registrations = StudentRegistration.objects.select_related(
+            'course', 'course_type', 'created_by__user'
+        ).order_by('id')[:options['sample']]
+        students = Student_api.objects.select_related(
+            'enquiry_taken_by__user'
+        ).order_by('id')[:options['sample']]
+        samples = {
+            'list_student_registrations': StudentRegistrationSerializer(registrations, many=True).data,
+            'list_students': StudentListSerializer(students, many=True).data,
+        }
+
+        settings_to_try = [('gzip', level) for level in (1, 6, 9)]
+        if compression.brotli is not None:
+            settings_to_try += [('br', quality) for quality in (1, 4, 11)]
+        else:
+            self.stdout.write(self.style.WARNING('brotli is not installed: gzip only'))
+
+        for name, sample in samples.items():
+            if not sample:
+                self.stdout.write(self.style.WARNING(f'{name}: no rows in the database, skipped'))
+                continue
+            rows = list(itertools.islice(itertools.cycle(sample), options['rows']))
+            body = JSONRenderer().render({'count': len(rows), 'results': rows})
+            self.stdout.write(f"{name}, {len(rows)} rows, {len(body) / 1024:.0f} KiB uncompressed")
+
+            for encoding, level in settings_to_try:
+                compressor_class = compression.BrotliCompressor if encoding == 'br' else compression.GzipCompressor
+                timings = []
+                for _ in range(options['repeat']):
+                    started = time.perf_counter()
+                    compressor = compressor_class(level)
+                    compressed = compressor.compress(body) + compressor.finish()
+                    timings.append(time.perf_counter() - started)
+                best = min(timings)
+                self.stdout.write(
+                    f'  {encoding} {level}: {best * 1000:.1f} ms CPU, {len(compressed) / 1024:.0f} KiB '
+                    f'({(1 - len(compressed) / len(body)) * 100:.1f}% saved, '
+                    f'{len(body) / best / 1024 / 1024:.0f} MiB/s)'
+                )
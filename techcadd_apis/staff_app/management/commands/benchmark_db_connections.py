@@ -0,0 +1,59 @@
+# staff_app/management/commands/benchmark_db_connections.py
+#  python manage.py benchmark_db_connections --staff <username> [--requests 500] [--concurrency 8] [--conn-max-age 0 60]
+#  Run once with DB_POOL=1 in the environment to compare against the connection pool
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from staff_app.benchmarks import STAFF_ENDPOINT_MIX, bearer_headers, run_wsgi_benchmark
+from staff_app.models import StaffProfile
+
+class Command(BaseCommand):
+    help = 'Measure requests/second and p99 latency of the staff endpoint mix per database connection setting'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--staff', required=True, help='Username of the staff member the requests run as')
+        parser.add_argument('--requests', type=int, default=500, help='Requests per run')
+        parser.add_argument('--concurrency', type=int, default=8, help='Parallel request threads')
+        parser.add_argument(
+            '--conn-max-age', type=int, nargs='+',
+            help='CONN_MAX_AGE values to compare, e.g. 0 60 (default: the configured value)'
+        )
+        parser.add_argument('--path', action='append', dest='paths', help='Endpoint to include (repeatable)')
+
+    def handle(self, *args, **options):
+        try:
+            staff_profile = StaffProfile.objects.select_related('user').get(user__username=options['staff'])
+        except StaffProfile.DoesNotExist:
+            raise CommandError(f"No staff member with username \"{options['staff']}\"")
+
+        database = settings.DATABASES['default']
+        pooled = 'POOL_OPTIONS' in database
+        ages = options['conn_max_age'] or [database.get('CONN_MAX_AGE', 0)]
+        if pooled and any(ages):
+            raise CommandError('The connection pool requires CONN_MAX_AGE=0')
+
+        headers = bearer_headers(staff_profile.user)
+        paths = options['paths'] or STAFF_ENDPOINT_MIX
+        self.stdout.write(
+            f"Engine {database['ENGINE']}, health checks {'on' if database.get('CONN_HEALTH_CHECKS') else 'off'}, "
+            f"{options['requests']} requests x {options['concurrency']} threads"
+        )
+
+        for age in ages:
+            # Connections opened by the worker threads read this settings dict
+            database['CONN_MAX_AGE'] = age
+            connections.close_all()
+            # Warm-up run so the first comparison does not pay for imports and caches
+            run_wsgi_benchmark(paths, headers, requests=len(paths), concurrency=1)
+            result = run_wsgi_benchmark(paths, headers, options['requests'], options['concurrency'])
+
+            label = 'pooled' if pooled else f'CONN_MAX_AGE={age}'
+            self.stdout.write(self.style.SUCCESS(
+                f"{label}: {result['requests_per_second']:.1f} req/s, p50 {result['p50_ms']:.1f} ms, "
+                f"p99 {result['p99_ms']:.1f} ms, {result['connections_opened']} connections opened, "
+                f"statuses {result['statuses']}"
+            ))
+            for endpoint in result['endpoints']:
+                self.stdout.write(
+                    f"  {endpoint['url']}: mean {endpoint['mean_ms']:.1f} ms, p99 {endpoint['p99_ms']:.1f} ms"
+                )
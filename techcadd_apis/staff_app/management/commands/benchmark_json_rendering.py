@@ -0,0 +1,62 @@
+# staff_app/management/commands/benchmark_json_rendering.py
+#  python manage.py benchmark_json_rendering [--rows 10000] [--repeat 5]
+#  Rows are built from existing registrations and payments, cycled up to --rows
+import itertools
+import json
+import time
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.renderers import JSONRenderer
+from staff_app.models import PaymentTransaction, StudentRegistration
+from staff_app.serializers import PaymentTransactionSerializer, StudentRegistrationSerializer
+from techcadd_apis import fast_json
+
+class Command(BaseCommand):
+    help = 'Compare DRF JSONRenderer and the orjson renderer on large list responses'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=10000, help='Rows per list response')
+        parser.add_argument('--repeat', type=int, default=5, help='Renders per renderer; the best time is reported')
+        parser.add_argument('--sample', type=int, default=500, help='Existing rows serialized and cycled')
+
+    def handle(self, *args, **options):
+        if fast_json.orjson is None:
+            self.stdout.write(self.style.WARNING('orjson is not installed: FastJSONRenderer falls back to DRF'))
+
+        registrations = StudentRegistration.objects.select_related(
+            'course', 'course_type', 'created_by__user'
+        ).order_by('id')[:options['sample']]
+        payments = PaymentTransaction.objects.select_related('received_by__user').order_by('id')[:options['sample']]
+
+        payloads = {
+            'registrations (StudentRegistrationSerializer)': StudentRegistrationSerializer(registrations, many=True).data,
+            'payments (PaymentTransactionSerializer)': PaymentTransactionSerializer(payments, many=True).data,
+            # Report views return raw values() rows with Decimal and date objects
+            'payments (raw values)': list(payments.values(
+                'id', 'amount', 'payment_date', 'payment_mode', 'entry_type', 'created_at'
+            )),
+        }
+
+        for name, sample in payloads.items():
+            if not sample:
+                self.stdout.write(self.style.WARNING(f'{name}: no rows in the database, skipped'))
+                continue
+            data = {'count': options['rows'], 'results': list(itertools.islice(itertools.cycle(sample), options['rows']))}
+            self.stdout.write(f"{name}, {options['rows']} rows")
+
+            outputs = {}
+            for renderer in (JSONRenderer(), fast_json.FastJSONRenderer()):
+                timings = []
+                for _ in range(options['repeat']):
+                    started = time.perf_counter()
+                    outputs[type(renderer).__name__] = renderer.render(data, 'application/json')
+                    timings.append(time.perf_counter() - started)
+                body = outputs[type(renderer).__name__]
+                self.stdout.write(
+                    f'  {type(renderer).__name__}: best {min(timings) * 1000:.1f} ms, '
+                    f'mean {sum(timings) / len(timings) * 1000:.1f} ms, {len(body) / 1024:.0f} KiB'
+                )
+
+            drf, fast = (json.loads(body) for body in outputs.values())
+            if drf != fast:
+                raise CommandError(f'{name}: FastJSONRenderer output differs from JSONRenderer')
+            self.stdout.write(self.style.SUCCESS('  outputs are identical once parsed'))
@@ -0,0 +1,86 @@
+# staff_app/management/commands/benchmark_payment_contention.py
+#  python manage.py benchmark_payment_contention --staff <username> [--requests 400] [--concurrency 8]
+#  Creates throwaway registrations (BENCH-... numbers, outside the branch sequences),
+#  posts add-payment requests against them and deletes them again afterwards
+import datetime
+import uuid
+from decimal import Decimal
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Sum
+from staff_app.benchmarks import bearer_headers, run_wsgi_benchmark
+from staff_app.models import Course, StaffProfile, StudentRegistration
+
+class Command(BaseCommand):
+    help = 'Requests/second and p99 of add-payment with every thread on one registration vs. one registration per thread'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--staff', required=True, help='Username of the staff member the payments are posted as')
+        parser.add_argument('--requests', type=int, default=400, help='Payments per run')
+        parser.add_argument('--concurrency', type=int, default=8, help='Parallel request threads')
+        parser.add_argument('--course', type=int, help='Course id for the throwaway registrations (default: the first one)')
+
+    def handle(self, *args, **options):
+        try:
+            staff_profile = StaffProfile.objects.select_related('user').get(user__username=options['staff'])
+        except StaffProfile.DoesNotExist:
+            raise CommandError(f"No staff member with username \"{options['staff']}\"")
+        courses = Course.objects.select_related('course_type').order_by('id')
+        course = courses.filter(id=options['course']).first() if options['course'] else courses.first()
+        if course is None:
+            raise CommandError('No course to register the throwaway students for')
+
+        headers = bearer_headers(staff_profile.user)
+        self.stdout.write(f"{options['requests']} payments x {options['concurrency']} threads")
+
+        for label, registrations in (('one registration', 1), ('one registration per thread', options['concurrency'])):
+            created = self.create_registrations(registrations, options['requests'], staff_profile, course)
+            try:
+                urls = [
+                    f'/api/staff/registrations/add-payment/?registration_number={registration.registration_number}'
+                    for registration in created
+                ]
+                result = run_wsgi_benchmark(
+                    urls, headers, options['requests'], options['concurrency'],
+                    method='POST', body={'amount': '1.00', 'payment_mode': 'cash'}
+                )
+                problems = self.check_ledgers(created)
+            finally:
+                # Deleting the payments takes them back out of the rollups and staff counters
+                for registration in created:
+                    registration.payment_transactions.all().delete()
+                    registration.delete()
+
+            style = self.style.ERROR if problems else self.style.SUCCESS
+            self.stdout.write(style(
+                f"{label}: {result['requests_per_second']:.1f} req/s, p50 {result['p50_ms']:.1f} ms, "
+                f"p99 {result['p99_ms']:.1f} ms, statuses {result['statuses']}"
+            ))
+            for problem in problems:
+                self.stdout.write(self.style.ERROR(f'  {problem}'))
+
+    def create_registrations(self, count, requests, staff_profile, course):
+        run = uuid.uuid4().hex[:8]
+        return [
+            StudentRegistration.objects.create(
+                registration_number=f'BENCH-{run}-{n:02d}',
+                branch='ludhiana', joining_date=datetime.date.today(), student_name=f'Benchmark {run} {n}',
+                father_name='-', date_of_birth=datetime.date(2000, 1, 1), email=f'bench-{run}-{n}@example.invalid',
+                qualification='-', work_college='-', contact_address='-', phone_no='0000000000',
+                course_type=course.course_type, course=course, duration_months=course.duration_months,
+                duration_hours=course.duration_hours, total_course_fee=requests, created_by=staff_profile
+            )
+            for n in range(count)
+        ]
+
+    def check_ledgers(self, registrations):
+        """Installments numbered 1..n without gaps and paid_fee equal to the ledger, per registration"""
+        problems = []
+        for registration in registrations:
+            registration.refresh_from_db()
+            numbers = sorted(registration.payment_transactions.values_list('installment_number', flat=True))
+            if numbers != list(range(1, len(numbers) + 1)):
+                problems.append(f'{registration.registration_number}: installment numbers are not 1..{len(numbers)}')
+            ledger = registration.payment_transactions.aggregate(total=Sum('amount'))['total'] or Decimal('0')
+            if registration.paid_fee != ledger:
+                problems.append(f'{registration.registration_number}: paid_fee {registration.paid_fee} != ledger {ledger}')
+        return problems
@@ -0,0 +1,46 @@
+# staff_app/management/commands/import_enquiries.py
+#  python manage.py import_enquiries leads.csv --staff counselor1
+from django.core.management.base import BaseCommand, CommandError
+from staff_app.models import StaffProfile
+from staff_app.enquiry_import import DEFAULT_CHUNK_SIZE, import_enquiries, read_enquiry_rows
+
+class Command(BaseCommand):
+    help = 'Bulk import student enquiries from a CSV or JSON file'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='CSV or JSON file with one enquiry per row')
+        parser.add_argument(
+            '--staff',
+            required=True,
+            help='Username of the staff member the enquiries are taken by'
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=DEFAULT_CHUNK_SIZE,
+            help='Rows validated and inserted per batch'
+        )
+
+    def handle(self, *args, **options):
+        try:
+            staff_profile = StaffProfile.objects.get(user__username=options['staff'], is_active=True)
+        except StaffProfile.DoesNotExist:
+            raise CommandError(f"Active staff member '{options['staff']}' not found")
+
+        try:
+            with open(options['path'], 'rb') as f:
+                rows = read_enquiry_rows(f, options['path'])
+        except (OSError, ValueError, UnicodeDecodeError) as e:
+            raise CommandError(f"Could not read {options['path']}: {e}")
+
+        report = import_enquiries(rows, staff_profile, chunk_size=options['chunk_size'])
+
+        for error in report['errors']:
+            messages = '; '.join(
+                f"{field}: {' '.join(field_errors)}" for field, field_errors in error['errors'].items()
+            )
+            self.stdout.write(self.style.WARNING(f"Row {error['row']}: {messages}"))
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported {report['created']} of {report['total_rows']} enquiries ({report['failed']} failed)"
+        ))
@@ -0,0 +1,52 @@
+# staff_app/management/commands/issue_certificates.py
+#  python manage.py issue_certificates [--branch ludhiana] [--course 3] [--course-type 1] [--dry-run]
+from django.core.management.base import BaseCommand, CommandError
+from staff_app.models import StudentRegistration
+from staff_app.certificates import issue_certificates
+
+class Command(BaseCommand):
+    help = 'Issue certificates to every registration with fees cleared and course completed'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--branch',
+            help='Only issue for this branch'
+        )
+        parser.add_argument(
+            '--course',
+            type=int,
+            help='Only issue for this course id'
+        )
+        parser.add_argument(
+            '--course-type',
+            type=int,
+            help='Only issue for this course type id'
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='List the certificates that would be issued without saving'
+        )
+
+    def handle(self, *args, **options):
+        branches = dict(StudentRegistration.CENTRE_CHOICES)
+        if options['branch'] and options['branch'] not in branches:
+            raise CommandError(f"Unknown branch '{options['branch']}'. Choose from: {', '.join(branches)}")
+
+        summary = issue_certificates(
+            branch=options['branch'],
+            course_id=options['course'],
+            course_type_id=options['course_type'],
+            dry_run=options['dry_run']
+        )
+
+        for certificate in summary['certificates']:
+            self.stdout.write(
+                f"{certificate['certificate_number']}  {certificate['registration_number']}  {certificate['student_name']}"
+            )
+
+        verb = 'Would issue' if options['dry_run'] else 'Issued'
+        self.stdout.write(self.style.SUCCESS(
+            f"{verb} {summary['issued']} certificates "
+            f"({summary['already_issued']} already issued, {summary['not_eligible']} not eligible yet)"
+        ))
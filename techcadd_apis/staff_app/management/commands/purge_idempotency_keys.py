@@ -0,0 +1,12 @@
+# staff_app/management/commands/purge_idempotency_keys.py
+#  python manage.py purge_idempotency_keys
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from staff_app.models import IdempotencyKey
+
+class Command(BaseCommand):
+    help = 'Delete stored Idempotency-Key responses past their TTL'
+
+    def handle(self, *args, **kwargs):
+        deleted, _ = IdempotencyKey.objects.filter(expires_at__lte=timezone.now()).delete()
+        self.stdout.write(self.style.SUCCESS(f'Deleted {deleted} expired idempotency keys'))
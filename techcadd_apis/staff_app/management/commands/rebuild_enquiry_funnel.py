@@ -0,0 +1,34 @@
+# staff_app/management/commands/rebuild_enquiry_funnel.py
+#  python manage.py rebuild_enquiry_funnel [--seed] [--since 2024-01-01]
+import datetime
+from django.core.management.base import BaseCommand, CommandError
+from staff_app.enquiry_funnel import rebuild_funnel, seed_missing_history
+
+class Command(BaseCommand):
+    help = 'Recompute the daily enquiry funnel rollup from the status history'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--seed',
+            action='store_true',
+            help='First give enquiries without any history an entry into their current status'
+        )
+        parser.add_argument(
+            '--since',
+            help='First date to rebuild (YYYY-MM-DD), default is the whole history'
+        )
+
+    def handle(self, *args, **options):
+        since = None
+        if options['since']:
+            try:
+                since = datetime.date.fromisoformat(options['since'])
+            except ValueError:
+                raise CommandError(f"Invalid date \"{options['since']}\", expected YYYY-MM-DD")
+
+        if options['seed']:
+            seeded = seed_missing_history()
+            self.stdout.write(f'Seeded history for {seeded} enquiries')
+
+        count = rebuild_funnel(since=since)
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt {count} funnel rollup rows'))
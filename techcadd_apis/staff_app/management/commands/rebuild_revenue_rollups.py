@@ -0,0 +1,35 @@
+# staff_app/management/commands/rebuild_revenue_rollups.py
+#  python manage.py rebuild_revenue_rollups [--since 2024-01-01] [--until 2024-12-31]
+import datetime
+from django.core.management.base import BaseCommand, CommandError
+from staff_app.revenue import rebuild_rollups
+
+class Command(BaseCommand):
+    help = 'Recompute the daily revenue rollup table from the payment ledger (net amount = installments + refunds)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--since',
+            help='First payment date to rebuild (YYYY-MM-DD), default is the whole ledger'
+        )
+        parser.add_argument(
+            '--until',
+            help='Last payment date to rebuild (YYYY-MM-DD)'
+        )
+
+    def handle(self, *args, **options):
+        since = self.parse_date(options['since'])
+        until = self.parse_date(options['until'])
+        if since and until and since > until:
+            raise CommandError('--since must not be after --until')
+
+        count = rebuild_rollups(since=since, until=until)
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt {count} revenue rollup rows'))
+
+    def parse_date(self, value):
+        if not value:
+            return None
+        try:
+            return datetime.date.fromisoformat(value)
+        except ValueError:
+            raise CommandError(f'Invalid date "{value}", expected YYYY-MM-DD')
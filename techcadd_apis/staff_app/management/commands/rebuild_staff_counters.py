@@ -0,0 +1,26 @@
+# staff_app/management/commands/rebuild_staff_counters.py
+#  python manage.py rebuild_staff_counters [--since 2024-01-01]
+import datetime
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from staff_app.counters import rebuild_staff_counters
+
+class Command(BaseCommand):
+    help = 'Recompute the per-staff daily dashboard counters from enquiries, registrations and payments'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--since',
+            help='First date to rebuild (YYYY-MM-DD), default is today'
+        )
+
+    def handle(self, *args, **options):
+        since = timezone.now().date()
+        if options['since']:
+            try:
+                since = datetime.date.fromisoformat(options['since'])
+            except ValueError:
+                raise CommandError(f"Invalid date \"{options['since']}\", expected YYYY-MM-DD")
+
+        count = rebuild_staff_counters(since)
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt {count} staff counter rows from {since}'))
@@ -0,0 +1,85 @@
+# staff_app/management/commands/reconcile_fees.py
+#  python manage.py reconcile_fees [--fix]
+from decimal import Decimal
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import DecimalField, Sum, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+from staff_app.models import StudentRegistration
+
+class Command(BaseCommand):
+    help = 'Compare each registration paid_fee with its payment ledger and optionally repair mismatches'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=500,
+            help='Registrations checked per grouped query'
+        )
+        parser.add_argument(
+            '--branch',
+            help='Only reconcile registrations of this branch'
+        )
+        parser.add_argument(
+            '--fix',
+            action='store_true',
+            help='Set paid_fee and fee_balance from the ledger for mismatched registrations'
+        )
+
+    def handle(self, *args, **options):
+        registrations = StudentRegistration.objects.order_by('id')
+        if options['branch']:
+            registrations = registrations.filter(branch=options['branch'])
+
+        checked = mismatched = repaired = 0
+        last_id = 0
+        while True:
+            with transaction.atomic():
+                chunk = registrations.filter(id__gt=last_id)[:options['chunk_size']]
+                if options['fix']:
+                    # Payments lock the registration row first, so the ledger cannot move under us
+                    chunk = chunk.select_for_update()
+                ids = list(chunk.values_list('id', flat=True))
+                if not ids:
+                    break
+                last_id = ids[-1]
+
+                # One grouped query per chunk: registration fields plus its ledger total
+                rows = StudentRegistration.objects.filter(id__in=ids).order_by('id').values(
+                    'id', 'registration_number', 'total_course_fee', 'paid_fee', 'fee_balance'
+                ).annotate(
+                    ledger_total=Coalesce(
+                        Sum('payment_transactions__amount'),
+                        Value(Decimal('0')),
+                        output_field=DecimalField(max_digits=12, decimal_places=2)
+                    )
+                )
+
+                to_repair = []
+                for row in rows:
+                    checked += 1
+                    expected_balance = row['total_course_fee'] - row['ledger_total']
+                    if row['paid_fee'] == row['ledger_total'] and row['fee_balance'] == expected_balance:
+                        continue
+
+                    mismatched += 1
+                    self.stdout.write(self.style.WARNING(
+                        f"{row['registration_number']}: paid_fee {row['paid_fee']} / balance {row['fee_balance']}, "
+                        f"ledger {row['ledger_total']} / balance {expected_balance}"
+                    ))
+                    to_repair.append(StudentRegistration(
+                        id=row['id'],
+                        paid_fee=row['ledger_total'],
+                        fee_balance=expected_balance,
+                        updated_at=timezone.now()
+                    ))
+
+                if options['fix'] and to_repair:
+                    StudentRegistration.objects.bulk_update(to_repair, ['paid_fee', 'fee_balance', 'updated_at'])
+                    repaired += len(to_repair)
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Checked {checked} registrations: {mismatched} mismatched, {repaired} repaired'
+        ))
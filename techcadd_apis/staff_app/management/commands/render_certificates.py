@@ -0,0 +1,41 @@
+# staff_app/management/commands/render_certificates.py
+#  python manage.py render_certificates [--branch ludhiana] [--processes 4] [--force]
+from django.core.management.base import BaseCommand
+from staff_app.models import StudentRegistration
+from staff_app.certificates import get_template_version, render_certificates_batch
+
+class Command(BaseCommand):
+    help = 'Render certificate documents for issued certificates into the on-disk cache using worker processes'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--branch',
+            help='Only render certificates of this branch'
+        )
+        parser.add_argument(
+            '--processes',
+            type=int,
+            help='Worker processes, default is one per CPU'
+        )
+        parser.add_argument(
+            '--force',
+            action='store_true',
+            help='Re-render documents that are already cached'
+        )
+
+    def handle(self, *args, **options):
+        registrations = StudentRegistration.objects.filter(
+            certificate_issued=True,
+            certificate_number__isnull=False
+        ).select_related('course', 'course_type').order_by('id')
+        if options['branch']:
+            registrations = registrations.filter(branch=options['branch'])
+
+        rendered = render_certificates_batch(
+            registrations.iterator(chunk_size=500),
+            processes=options['processes'],
+            force=options['force']
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f'Rendered {rendered} certificate documents (template version {get_template_version()})'
+        ))
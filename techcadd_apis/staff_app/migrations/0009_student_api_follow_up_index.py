@@ -0,0 +1,17 @@
+# Generated by Django 4.2.25 on 2026-10-19 14:25
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('staff_app', '0008_paymenttransaction'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='student_api',
+            index=models.Index(fields=['assign_enquiry', 'next_follow_up_date', 'enquiry_status'], name='students_follow_up_idx'),
+        ),
+    ]
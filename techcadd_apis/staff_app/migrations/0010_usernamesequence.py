@@ -0,0 +1,29 @@
+# Generated by Django 4.2.25 on 2026-10-19 14:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('staff_app', '0009_student_api_follow_up_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UsernameSequence',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('scope', models.CharField(max_length=50)),
+                ('base', models.CharField(max_length=50)),
+                ('last_suffix', models.IntegerField(default=-1)),
+            ],
+            options={
+                'db_table': 'username_sequences',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='usernamesequence',
+            constraint=models.UniqueConstraint(fields=('scope', 'base'), name='unique_username_sequence'),
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 4.2.25 on 2026-10-19 14:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('staff_app', '0010_usernamesequence'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RegistrationSequence',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('branch_code', models.CharField(max_length=10, unique=True)),
+                ('last_number', models.IntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'db_table': 'registration_sequences',
+            },
+        ),
+    ]
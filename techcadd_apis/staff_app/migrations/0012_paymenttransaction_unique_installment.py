@@ -0,0 +1,36 @@
+# Generated by Django 4.2.25 on 2026-10-19 14:31
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def renumber_duplicate_installments(apps, schema_editor):
+    """Give every payment of a registration a distinct installment number before adding the constraint"""
+    PaymentTransaction = apps.get_model('staff_app', 'PaymentTransaction')
+    duplicated = PaymentTransaction.objects.values('student_registration').annotate(
+        payments=Count('id'), numbers=Count('installment_number', distinct=True)
+    ).filter(payments__gt=models.F('numbers')).values_list('student_registration', flat=True)
+
+    for registration_id in duplicated:
+        payments = PaymentTransaction.objects.filter(
+            student_registration_id=registration_id
+        ).order_by('installment_number', 'id')
+        for number, payment in enumerate(payments, start=1):
+            if payment.installment_number != number:
+                payment.installment_number = number
+                payment.save(update_fields=['installment_number'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('staff_app', '0011_registrationsequence'),
+    ]
+
+    operations = [
+        migrations.RunPython(renumber_duplicate_installments, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='paymenttransaction',
+            constraint=models.UniqueConstraint(fields=('student_registration', 'installment_number'), name='unique_installment_per_registration'),
+        ),
+    ]
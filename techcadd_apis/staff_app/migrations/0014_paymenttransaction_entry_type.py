@@ -0,0 +1,28 @@
+# Generated by Django 4.2.25 on 2026-10-19 14:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('staff_app', '0013_idempotencykey'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='paymenttransaction',
+            name='entry_type',
+            field=models.CharField(choices=[('installment', 'Installment'), ('adjustment', 'Adjustment'), ('refund', 'Refund')], default='installment', max_length=20),
+        ),
+        migrations.AlterField(
+            model_name='paymenttransaction',
+            name='amount',
+            field=models.DecimalField(decimal_places=2, help_text='Signed: refunds and downward adjustments are negative', max_digits=10),
+        ),
+        migrations.AlterField(
+            model_name='paymenttransaction',
+            name='installment_number',
+            field=models.IntegerField(blank=True, help_text='Installment number (1st, 2nd, 3rd, etc.), empty for adjustments and refunds', null=True),
+        ),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 4.2.25 on 2026-10-19 14:38
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('staff_app', '0014_paymenttransaction_entry_type'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyRevenueRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('branch', models.CharField(choices=[('jalandhar1', 'Jalandhar 1'), ('jalandhar2', 'Jalandhar 2'), ('maqsudan', 'Maqsudan'), ('ludhiana', 'Ludhiana'), ('hoshiarpur', 'Hoshiarpur'), ('mohali', 'Mohali'), ('phagwara', 'Phagwara')], max_length=20)),
+                ('payment_mode', models.CharField(choices=[('cash', 'Cash'), ('online', 'Online'), ('cheque', 'Cheque'), ('card', 'Card'), ('upi', 'UPI')], max_length=20)),
+                ('collected_amount', models.DecimalField(decimal_places=2, default=0, help_text='Sum of installments', max_digits=12)),
+                ('adjusted_amount', models.DecimalField(decimal_places=2, default=0, help_text='Sum of signed adjustments', max_digits=12)),
+                ('refunded_amount', models.DecimalField(decimal_places=2, default=0, help_text='Sum of refunds, negative', max_digits=12)),
+                ('net_amount', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('payment_count', models.IntegerField(default=0, help_text='Number of installments')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('course_type', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='revenue_rollups', to='staff_app.coursetype')),
+                ('received_by', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='revenue_rollups', to='staff_app.staffprofile')),
+            ],
+            options={
+                'db_table': 'daily_revenue_rollups',
+                'ordering': ['date'],
+                'indexes': [models.Index(fields=['branch', 'date'], name='revenue_rollup_branch_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='dailyrevenuerollup',
+            constraint=models.UniqueConstraint(fields=('date', 'branch', 'course_type', 'payment_mode', 'received_by'), name='unique_daily_revenue_rollup'),
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 4.2.25 on 2026-10-19 14:39
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('staff_app', '0015_dailyrevenuerollup'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='paymenttransaction',
+            index=models.Index(fields=['student_registration', 'payment_date'], name='payment_registration_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='studentregistration',
+            index=models.Index(fields=['branch', 'fee_balance'], name='registration_dues_idx'),
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 4.2.25 on 2026-10-19 15:10
+
+from django.db import migrations, models
+
+
+def blank_certificate_numbers_to_null(apps, schema_editor):
+    """Registrations without a certificate stored '', which a unique index would reject more than once"""
+    StudentRegistration = apps.get_model('staff_app', 'StudentRegistration')
+    StudentRegistration.objects.filter(certificate_number='').update(certificate_number=None)
+
+
+def null_certificate_numbers_to_blank(apps, schema_editor):
+    StudentRegistration = apps.get_model('staff_app', 'StudentRegistration')
+    StudentRegistration.objects.filter(certificate_number__isnull=True).update(certificate_number='')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('staff_app', '0016_dues_indexes'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='studentregistration',
+            name='certificate_number',
+            field=models.CharField(blank=True, max_length=50, null=True),
+        ),
+        migrations.RunPython(blank_certificate_numbers_to_null, null_certificate_numbers_to_blank),
+        migrations.AlterField(
+            model_name='studentregistration',
+            name='certificate_number',
+            field=models.CharField(blank=True, max_length=50, null=True, unique=True),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.25 on 2026-10-19 14:43
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('staff_app', '0017_certificate_number_unique'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='student_api',
+            name='enquiry_status',
+            field=models.CharField(choices=[('new', 'New'), ('registration_done', 'Registration Done'), ('visited', 'Visited'), ('in_process', 'In Process'), ('negative', 'Negative'), ('positive', 'Positive'), ('follow_up_required', 'Follow Up Required'), ('admission_done', 'Admission Done'), ('course_completed', 'Course Completed'), ('dropped', 'Dropped')], default='new', max_length=20),
+        ),
+    ]
@@ -0,0 +1,56 @@
+# Generated by Django 4.2.25 on 2026-10-19 14:44
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('staff_app', '0018_student_api_new_status'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EnquiryStatusChange',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('from_status', models.CharField(blank=True, choices=[('new', 'New'), ('registration_done', 'Registration Done'), ('visited', 'Visited'), ('in_process', 'In Process'), ('negative', 'Negative'), ('positive', 'Positive'), ('follow_up_required', 'Follow Up Required'), ('admission_done', 'Admission Done'), ('course_completed', 'Course Completed'), ('dropped', 'Dropped')], max_length=20)),
+                ('to_status', models.CharField(choices=[('new', 'New'), ('registration_done', 'Registration Done'), ('visited', 'Visited'), ('in_process', 'In Process'), ('negative', 'Negative'), ('positive', 'Positive'), ('follow_up_required', 'Follow Up Required'), ('admission_done', 'Admission Done'), ('course_completed', 'Course Completed'), ('dropped', 'Dropped')], max_length=20)),
+                ('days_since_enquiry', models.IntegerField(default=0)),
+                ('changed_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('changed_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='staff_app.staffprofile')),
+                ('counselor', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='enquiry_status_changes', to='staff_app.staffprofile')),
+                ('student', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='status_changes', to='staff_app.student_api')),
+            ],
+            options={
+                'db_table': 'enquiry_status_changes',
+                'ordering': ['changed_at', 'id'],
+                'indexes': [models.Index(fields=['student', 'changed_at'], name='status_change_student_idx'), models.Index(fields=['changed_at'], name='status_change_date_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='EnquiryFunnelDaily',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('enquiry_source', models.CharField(choices=[('social_media', 'Social Media'), ('just_dial', 'Just Dial'), ('random_call', 'Random Call'), ('direct_visit', 'Direct Visit'), ('banner', 'Banner'), ('website', 'Website'), ('reference', 'Reference'), ('newspaper', 'Newspaper'), ('friend_reference', 'Friend Reference'), ('google_search', 'Google Search')], max_length=20)),
+                ('trade', models.CharField(choices=[('computer', 'Computer'), ('it', 'IT'), ('graphic_designing', 'Graphic Designing'), ('civil', 'Civil'), ('mechanical', 'Mechanical'), ('ielts', 'IELTS'), ('ece', 'ECE'), ('programming', 'Programming'), ('digital_marketing', 'Digital Marketing'), ('hardware', 'Hardware'), ('networking', 'Networking')], max_length=20)),
+                ('centre', models.CharField(choices=[('jalandhar1', 'Jalandhar 1'), ('jalandhar2', 'Jalandhar 2'), ('maqsudan', 'Maqsudan'), ('ludhiana', 'Ludhiana'), ('hoshiarpur', 'Hoshiarpur'), ('mohali', 'Mohali'), ('phagwara', 'Phagwara')], max_length=20)),
+                ('status', models.CharField(choices=[('new', 'New'), ('registration_done', 'Registration Done'), ('visited', 'Visited'), ('in_process', 'In Process'), ('negative', 'Negative'), ('positive', 'Positive'), ('follow_up_required', 'Follow Up Required'), ('admission_done', 'Admission Done'), ('course_completed', 'Course Completed'), ('dropped', 'Dropped')], max_length=20)),
+                ('entries', models.IntegerField(default=0, help_text='Enquiries that moved into this status')),
+                ('days_since_enquiry_total', models.IntegerField(default=0, help_text='Sum of days from enquiry to this status, for averages')),
+                ('counselor', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='funnel_rollups', to='staff_app.staffprofile')),
+            ],
+            options={
+                'db_table': 'enquiry_funnel_daily',
+                'ordering': ['date'],
+                'indexes': [models.Index(fields=['date', 'status'], name='funnel_daily_date_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='enquiryfunneldaily',
+            constraint=models.UniqueConstraint(fields=('date', 'enquiry_source', 'trade', 'centre', 'counselor', 'status'), name='unique_enquiry_funnel_daily'),
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 4.2.25 on 2026-10-19 14:46
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('staff_app', '0019_enquiry_status_history'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StaffDailyCounter',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('enquiries_created', models.IntegerField(default=0)),
+                ('registrations_created', models.IntegerField(default=0)),
+                ('payments_received', models.IntegerField(default=0)),
+                ('payments_amount', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('follow_ups_due', models.IntegerField(default=0)),
+                ('staff', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_counters', to='staff_app.staffprofile')),
+            ],
+            options={
+                'db_table': 'staff_daily_counters',
+                'ordering': ['-date'],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='staffdailycounter',
+            constraint=models.UniqueConstraint(fields=('staff', 'date'), name='unique_staff_daily_counter'),
+        ),
+    ]
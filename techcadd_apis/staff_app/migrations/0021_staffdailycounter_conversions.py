@@ -0,0 +1,18 @@
+# Generated by Django 4.2.25 on 2026-10-19 14:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('staff_app', '0020_staffdailycounter'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='staffdailycounter',
+            name='conversions',
+            field=models.IntegerField(default=0),
+        ),
+    ]
@@ -0,0 +1,49 @@
+# Generated by Django 4.2.25 on 2026-10-19 15:04
+
+from django.db import migrations, models
+from django.db.models import F
+
+MANUAL_EDIT_REMARK = 'Paid fee set manually'
+
+
+def manual_edits_to_corrections(apps, schema_editor):
+    """Paid fee edits were booked as adjustments; take them out of the revenue rollup as well"""
+    PaymentTransaction = apps.get_model('staff_app', 'PaymentTransaction')
+    DailyRevenueRollup = apps.get_model('staff_app', 'DailyRevenueRollup')
+    edits = PaymentTransaction.objects.filter(
+        entry_type='adjustment', remark=MANUAL_EDIT_REMARK
+    ).select_related('student_registration')
+    for entry in edits:
+        DailyRevenueRollup.objects.filter(
+            date=entry.payment_date,
+            branch=entry.student_registration.branch,
+            course_type_id=entry.student_registration.course_type_id,
+            payment_mode=entry.payment_mode,
+            received_by_id=entry.received_by_id,
+        ).update(
+            adjusted_amount=F('adjusted_amount') - entry.amount,
+            net_amount=F('net_amount') - entry.amount,
+        )
+    edits.update(entry_type='correction')
+
+
+def corrections_to_manual_edits(apps, schema_editor):
+    # Rollups are not restored; run rebuild_revenue_rollups after reversing
+    PaymentTransaction = apps.get_model('staff_app', 'PaymentTransaction')
+    PaymentTransaction.objects.filter(entry_type='correction').update(entry_type='adjustment')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('staff_app', '0021_staffdailycounter_conversions'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='paymenttransaction',
+            name='entry_type',
+            field=models.CharField(choices=[('installment', 'Installment'), ('adjustment', 'Adjustment'), ('refund', 'Refund'), ('correction', 'Manual correction')], default='installment', max_length=20),
+        ),
+        migrations.RunPython(manual_edits_to_corrections, corrections_to_manual_edits),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 4.2.25 on 2026-10-19 15:05
+
+from django.db import migrations, models
+from django.db.models import F
+
+
+def net_cash_only(apps, schema_editor):
+    # net_amount used to include fee adjustments; keep only installments and refunds
+    DailyRevenueRollup = apps.get_model('staff_app', 'DailyRevenueRollup')
+    DailyRevenueRollup.objects.update(net_amount=F('collected_amount') + F('refunded_amount'))
+
+
+def net_with_adjustments(apps, schema_editor):
+    DailyRevenueRollup = apps.get_model('staff_app', 'DailyRevenueRollup')
+    DailyRevenueRollup.objects.update(
+        net_amount=F('collected_amount') + F('refunded_amount') + F('adjusted_amount')
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('staff_app', '0022_paymenttransaction_correction_entry_type'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='dailyrevenuerollup',
+            name='net_amount',
+            field=models.DecimalField(decimal_places=2, default=0, help_text='Cash collected less refunds; adjustments excluded', max_digits=12),
+        ),
+        migrations.RunPython(net_cash_only, net_with_adjustments),
+    ]
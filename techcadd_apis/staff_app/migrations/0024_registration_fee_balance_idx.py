@@ -0,0 +1,17 @@
+# Generated by Django 4.2.25 on 2026-10-19 15:07
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('staff_app', '0023_dailyrevenuerollup_net_cash'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='studentregistration',
+            index=models.Index(fields=['fee_balance'], name='registration_fee_balance_idx'),
+        ),
+    ]
@@ -0,0 +1,90 @@
+# Generated by Django 4.2.25 on 2026-10-19 15:22
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Q, Subquery, Sum
+from django.db.models.functions import TruncDate
+
+
+def snapshot_and_rebuild(apps, schema_editor):
+    """
+    Give existing history rows the enquiry's dimensions (its current values are all there
+    is to go on) and recompute the rollup, which merges rows duplicated under a NULL
+    counselor and fills in first_entries
+    """
+    Student_api = apps.get_model('staff_app', 'Student_api')
+    EnquiryStatusChange = apps.get_model('staff_app', 'EnquiryStatusChange')
+    EnquiryFunnelDaily = apps.get_model('staff_app', 'EnquiryFunnelDaily')
+
+    student = Student_api.objects.filter(pk=OuterRef('student_id'))
+    EnquiryStatusChange.objects.update(**{
+        field: Subquery(student.values(field)[:1]) for field in ('enquiry_source', 'trade', 'centre')
+    })
+
+    grouped = EnquiryStatusChange.objects.order_by().annotate(date=TruncDate('changed_at')).values(
+        'date', 'enquiry_source', 'trade', 'centre', 'counselor', 'to_status'
+    ).annotate(
+        entries=Count('id'),
+        first_entries=Count('id', filter=Q(from_status='')),
+        days_since_enquiry_total=Sum('days_since_enquiry'),
+    )
+    rows = [
+        EnquiryFunnelDaily(
+            date=group['date'],
+            enquiry_source=group['enquiry_source'],
+            trade=group['trade'],
+            centre=group['centre'],
+            counselor_id=group['counselor'],
+            counselor_key=group['counselor'] or 0,
+            status=group['to_status'],
+            entries=group['entries'],
+            first_entries=group['first_entries'],
+            days_since_enquiry_total=group['days_since_enquiry_total'],
+        )
+        for group in grouped
+    ]
+    EnquiryFunnelDaily.objects.all().delete()
+    EnquiryFunnelDaily.objects.bulk_create(rows, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('staff_app', '0024_registration_fee_balance_idx'),
+    ]
+
+    operations = [
+        migrations.RemoveConstraint(
+            model_name='enquiryfunneldaily',
+            name='unique_enquiry_funnel_daily',
+        ),
+        migrations.AddField(
+            model_name='enquiryfunneldaily',
+            name='counselor_key',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='enquiryfunneldaily',
+            name='first_entries',
+            field=models.IntegerField(default=0, help_text="Of those, enquiries created in this status (the funnel's intake)"),
+        ),
+        migrations.AddField(
+            model_name='enquirystatuschange',
+            name='centre',
+            field=models.CharField(blank=True, choices=[('jalandhar1', 'Jalandhar 1'), ('jalandhar2', 'Jalandhar 2'), ('maqsudan', 'Maqsudan'), ('ludhiana', 'Ludhiana'), ('hoshiarpur', 'Hoshiarpur'), ('mohali', 'Mohali'), ('phagwara', 'Phagwara')], max_length=20),
+        ),
+        migrations.AddField(
+            model_name='enquirystatuschange',
+            name='enquiry_source',
+            field=models.CharField(blank=True, choices=[('social_media', 'Social Media'), ('just_dial', 'Just Dial'), ('random_call', 'Random Call'), ('direct_visit', 'Direct Visit'), ('banner', 'Banner'), ('website', 'Website'), ('reference', 'Reference'), ('newspaper', 'Newspaper'), ('friend_reference', 'Friend Reference'), ('google_search', 'Google Search')], max_length=20),
+        ),
+        migrations.AddField(
+            model_name='enquirystatuschange',
+            name='trade',
+            field=models.CharField(blank=True, choices=[('computer', 'Computer'), ('it', 'IT'), ('graphic_designing', 'Graphic Designing'), ('civil', 'Civil'), ('mechanical', 'Mechanical'), ('ielts', 'IELTS'), ('ece', 'ECE'), ('programming', 'Programming'), ('digital_marketing', 'Digital Marketing'), ('hardware', 'Hardware'), ('networking', 'Networking')], max_length=20),
+        ),
+        migrations.RunPython(snapshot_and_rebuild, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='enquiryfunneldaily',
+            constraint=models.UniqueConstraint(fields=('date', 'enquiry_source', 'trade', 'centre', 'counselor_key', 'status'), name='unique_enquiry_funnel_daily_key'),
+        ),
+    ]
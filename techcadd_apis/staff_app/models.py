@@ -2,11 +2,37 @@ from django.db import models
 # staff_app/models.py - Add this import at the top
 from dateutil.relativedelta import relativedelta
 from django.utils import timezone
-from django.db import models
+from django.db import models, transaction, IntegrityError
+from django.db.models import F
+from django.db.models.functions import Cast, Substr
 from django.contrib.auth.models import User
+from django.core.exceptions import ValidationError
 from django.db.models.signals import post_save
 from django.dispatch import receiver
 import datetime
+import secrets
+import string
+
+def generate_password(length=8):
+    """Random alphanumeric password for auto-generated student logins"""
+    alphabet = string.ascii_letters + string.digits
+    return ''.join(secrets.choice(alphabet) for i in range(length))
+
+class UsernameSequence(models.Model):
+    """Last numeric suffix handed out for a username base, per table"""
+    scope = models.CharField(max_length=50)  # db_table of the model the usernames belong to
+    base = models.CharField(max_length=50)
+    last_suffix = models.IntegerField(default=-1)  # -1: unused, 0: bare base, n: base + n
+    
+    class Meta:
+        db_table = 'username_sequences'
+        constraints = [
+            models.UniqueConstraint(fields=['scope', 'base'], name='unique_username_sequence'),
+        ]
+    
+    def __str__(self):
+        return f"{self.scope}: {self.base} ({self.last_suffix})"
+
 class StaffProfile(models.Model):
     STAFF_ROLES = [
         ('trainer', 'Trainer'),
@@ -77,6 +103,7 @@ class Student_api(models.Model):
     
     
     ENQUIRY_STATUS = [
+        ('new', 'New'),
         ('registration_done', 'Registration Done'),
         ('visited', 'Visited'),
         ('in_process', 'In Process'),
@@ -87,6 +114,8 @@ class Student_api(models.Model):
         ('course_completed', 'Course Completed'),
         ('dropped', 'Dropped'),
     ]
+    # Statuses that no longer need a follow-up call
+    CLOSED_STATUSES = ['registration_done', 'negative', 'admission_done', 'course_completed', 'dropped']
     # Student Personal Details
     student_name = models.CharField(max_length=100)
     date_of_birth = models.DateField()
@@ -126,30 +155,23 @@ class Student_api(models.Model):
     class Meta:
         db_table = 'students'
         ordering = ['-created_at']
+        indexes = [
+            # Follow-up worklist: one range scan per counselor
+            models.Index(fields=['assign_enquiry', 'next_follow_up_date', 'enquiry_status'], name='students_follow_up_idx'),
+        ]
     
     def __str__(self):
         return f"{self.student_name} ({self.username})"
     
     def save(self, *args, **kwargs):
-        # Auto-generate username if not provided
-        if not self.username:
-            base_username = self.student_name.lower().replace(' ', '')
-            username = base_username
-            counter = 1
-            # FIX: Use Student_api instead of Student
-            while Student_api.objects.filter(username=username).exists():
-                username = f"{base_username}{counter}"
-                counter += 1
-            self.username = username
+        from .usernames import save_with_username
         
         # Auto-generate password if not provided
         if not self.password:
-            import secrets
-            import string
-            alphabet = string.ascii_letters + string.digits
-            self.password = ''.join(secrets.choice(alphabet) for i in range(8))
+            self.password = generate_password()
         
-        super().save(*args, **kwargs)
+        # Auto-generates the username if not provided
+        save_with_username(self, super().save, *args, **kwargs)
 
 
 # staff_app/models.py - Add these models
@@ -195,6 +217,55 @@ class Course(models.Model):
     def __str__(self):
         return f"{self.name} - {self.course_type}"
 
+class RegistrationSequence(models.Model):
+    """Last registration number issued for a branch code (TCD/<branch_code>/NNNN)"""
+    branch_code = models.CharField(max_length=10, unique=True)
+    last_number = models.IntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        db_table = 'registration_sequences'
+    
+    def __str__(self):
+        return f"{self.branch_code}: {self.last_number}"
+    
+    @staticmethod
+    def parse_number(registration_number):
+        """Split 'TCD/4001/0042' into ('4001', 42); None if it does not match"""
+        try:
+            prefix, branch_code, number = registration_number.split('/')
+            return (branch_code, int(number)) if prefix == 'TCD' else None
+        except (AttributeError, ValueError):
+            return None
+    
+    @classmethod
+    def highest_issued(cls, branch_code):
+        """Highest number already used by registrations of this branch"""
+        prefix = f"TCD/{branch_code}/"
+        # Numeric MAX over the suffix, so TCD/4001/10000 ranks above TCD/4001/9999
+        return StudentRegistration.objects.filter(
+            registration_number__startswith=prefix
+        ).aggregate(
+            highest=models.Max(Cast(Substr('registration_number', len(prefix) + 1), models.IntegerField()))
+        )['highest'] or 0
+    
+    @classmethod
+    def next_number(cls, branch_code):
+        """
+        Atomically increment and return the branch counter
+        The row stays locked until the caller's transaction ends
+        """
+        with transaction.atomic():
+            updated = cls.objects.filter(branch_code=branch_code).update(last_number=F('last_number') + 1)
+            if not updated:
+                # First registration for this branch since sequences were added
+                try:
+                    with transaction.atomic():
+                        cls.objects.create(branch_code=branch_code, last_number=cls.highest_issued(branch_code) + 1)
+                except IntegrityError:
+                    cls.objects.filter(branch_code=branch_code).update(last_number=F('last_number') + 1)
+            return cls.objects.values_list('last_number', flat=True).get(branch_code=branch_code)
+
 class StudentRegistration(models.Model):
     CENTRE_CHOICES = [
         ('jalandhar1', 'Jalandhar 1'),
@@ -246,56 +317,43 @@ class StudentRegistration(models.Model):
     course_completion_date = models.DateField(null=True, blank=True)
     certificate_issued = models.BooleanField(default=False)
     certificate_issue_date = models.DateField(null=True, blank=True)
-    certificate_number = models.CharField(max_length=50, blank=True)
+    certificate_number = models.CharField(max_length=50, null=True, blank=True, unique=True)
     class Meta:
         db_table = 'student_registrations'
         ordering = ['-created_at']
+        indexes = [
+            # Dues report filtered to one branch: fee_balance > 0 within the branch, sorted by amount
+            models.Index(fields=['branch', 'fee_balance'], name='registration_dues_idx'),
+            # Unfiltered fee_balance > 0 (all-branch dues, pending_orders, overview) cannot use
+            # the composite index above as a range scan, so it gets one that leads with fee_balance
+            models.Index(fields=['fee_balance'], name='registration_fee_balance_idx'),
+        ]
     
     def __str__(self):
         return f"{self.student_name} - {self.course.name}"
     
     def save(self, *args, **kwargs):
-        if not self.registration_number:
-            self.registration_number = self.generate_registration_number()
-        self.fee_balance = self.total_course_fee - self.paid_fee
-        
-        # Calculate course completion date based on duration
-        if self.joining_date and self.duration_months:
-            self.course_completion_date = self.calculate_completion_date()
-        
-        # Auto-generate username if not provided
-        if not self.username:
-            base_username = self.student_name.lower().replace(' ', '')
-            username = base_username
-            counter = 1
-            while StudentRegistration.objects.filter(username=username).exists():
-                username = f"{base_username}{counter}"
-                counter += 1
-            self.username = username
+        from .usernames import save_with_username
         
-        # Auto-generate password if not provided
-        if not self.password:
-            import secrets
-            import string
-            alphabet = string.ascii_letters + string.digits
-            self.password = ''.join(secrets.choice(alphabet) for i in range(8))
-        
-        super().save(*args, **kwargs)
+        # The branch sequence row stays locked until the insert commits
+        with transaction.atomic():
+            if not self.registration_number:
+                self.registration_number = self.generate_registration_number()
+            self.fee_balance = self.total_course_fee - self.paid_fee
+            
+            # Calculate course completion date based on duration
+            if self.joining_date and self.duration_months:
+                self.course_completion_date = self.calculate_completion_date()
+            
+            # Auto-generate password if not provided
+            if not self.password:
+                self.password = generate_password()
+            
+            # Auto-generates the username if not provided
+            save_with_username(self, super().save, *args, **kwargs)
     def generate_registration_number(self):
         branch_code = self.BRANCH_CODES.get(self.branch, '4000')
-        last_reg = StudentRegistration.objects.filter(
-            registration_number__startswith=f"TCD/{branch_code}/"
-        ).order_by('-id').first()
-        
-        if last_reg and last_reg.registration_number:
-            try:
-                last_number = int(last_reg.registration_number.split('/')[-1])
-                sequential_number = last_number + 1
-            except (ValueError, IndexError):
-                sequential_number = 1
-        else:
-            sequential_number = 1
-        
+        sequential_number = RegistrationSequence.next_number(branch_code)
         sequential_str = str(sequential_number).zfill(4)
         return f"TCD/{branch_code}/{sequential_str}"
     
@@ -374,6 +432,50 @@ class StudentRegistration(models.Model):
             return total_days
         return None
 
+    def record_ledger_entry(self, amount, received_by, entry_type='installment', **fields):
+        """
+        Append a PaymentTransaction and move paid_fee/fee_balance by its signed amount
+        Installments are numbered while this registration row is locked
+        Raises ValidationError when paid_fee would leave 0..total_course_fee
+        """
+        with transaction.atomic():
+            # Bounds are checked against the locked row, so concurrent entries cannot
+            # together push paid_fee outside 0..total_course_fee
+            locked = StudentRegistration.objects.select_for_update().values(
+                'paid_fee', 'total_course_fee'
+            ).get(pk=self.pk)
+            new_paid_fee = locked['paid_fee'] + amount
+            if new_paid_fee < 0 or new_paid_fee > locked['total_course_fee']:
+                raise ValidationError({
+                    'amount': f"Paid fee would become {new_paid_fee}; it must stay between 0 and {locked['total_course_fee']}"
+                })
+            
+            installment_number = None
+            if entry_type == 'installment':
+                last_installment = self.payment_transactions.aggregate(
+                    last=models.Max('installment_number')
+                )['last'] or 0
+                installment_number = last_installment + 1
+            
+            entry = PaymentTransaction.objects.create(
+                student_registration=self,
+                entry_type=entry_type,
+                installment_number=installment_number,
+                amount=amount,
+                received_by=received_by,
+                **fields
+            )
+            
+            # Update fees in the database, not from a stale copy
+            StudentRegistration.objects.filter(pk=self.pk).update(
+                paid_fee=F('paid_fee') + amount,
+                fee_balance=F('fee_balance') - amount,
+                updated_at=timezone.now()
+            )
+        
+        self.refresh_from_db(fields=['paid_fee', 'fee_balance', 'updated_at'])
+        return entry
+
 
 # staff_app/models.py - Add this model
 
@@ -385,10 +487,18 @@ class PaymentTransaction(models.Model):
         ('card', 'Card'),
         ('upi', 'UPI'),
     ]
+    ENTRY_TYPES = [
+        ('installment', 'Installment'),
+        ('adjustment', 'Adjustment'),
+        ('refund', 'Refund'),
+        # paid_fee edited by hand; keeps the ledger matching but is not revenue
+        ('correction', 'Manual correction'),
+    ]
     
     student_registration = models.ForeignKey(StudentRegistration, on_delete=models.CASCADE, related_name='payment_transactions')
-    installment_number = models.IntegerField(help_text="Installment number (1st, 2nd, 3rd, etc.)")
-    amount = models.DecimalField(max_digits=10, decimal_places=2)
+    entry_type = models.CharField(max_length=20, choices=ENTRY_TYPES, default='installment')
+    installment_number = models.IntegerField(null=True, blank=True, help_text="Installment number (1st, 2nd, 3rd, etc.), empty for adjustments and refunds")
+    amount = models.DecimalField(max_digits=10, decimal_places=2, help_text="Signed: refunds and downward adjustments are negative")
     payment_date = models.DateField(auto_now_add=True)
     payment_mode = models.CharField(max_length=20, choices=PAYMENT_MODES, default='cash')
     transaction_id = models.CharField(max_length=100, blank=True, help_text="Transaction ID for online payments")
@@ -399,6 +509,154 @@ class PaymentTransaction(models.Model):
     class Meta:
         db_table = 'payment_transactions'
         ordering = ['installment_number']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['student_registration', 'installment_number'],
+                name='unique_installment_per_registration'
+            ),
+        ]
+        indexes = [
+            # Last payment date per registration for the dues aging subquery
+            models.Index(fields=['student_registration', 'payment_date'], name='payment_registration_date_idx'),
+        ]
+    
+    def __str__(self):
+        if self.entry_type != 'installment':
+            return f"{self.get_entry_type_display()} - {self.amount} for {self.student_registration.registration_number}"
+        return f"Installment #{self.installment_number} - {self.amount} for {self.student_registration.registration_number}"
+
+
+class DailyRevenueRollup(models.Model):
+    """Ledger totals per day and reporting dimension, kept current from PaymentTransaction"""
+    date = models.DateField()
+    branch = models.CharField(max_length=20, choices=StudentRegistration.CENTRE_CHOICES)
+    course_type = models.ForeignKey(CourseType, on_delete=models.CASCADE, related_name='revenue_rollups')
+    payment_mode = models.CharField(max_length=20, choices=PaymentTransaction.PAYMENT_MODES)
+    received_by = models.ForeignKey(StaffProfile, on_delete=models.CASCADE, related_name='revenue_rollups')
+    collected_amount = models.DecimalField(max_digits=12, decimal_places=2, default=0, help_text="Sum of installments")
+    adjusted_amount = models.DecimalField(max_digits=12, decimal_places=2, default=0, help_text="Sum of signed adjustments")
+    refunded_amount = models.DecimalField(max_digits=12, decimal_places=2, default=0, help_text="Sum of refunds, negative")
+    net_amount = models.DecimalField(max_digits=12, decimal_places=2, default=0, help_text="Cash collected less refunds; adjustments excluded")
+    payment_count = models.IntegerField(default=0, help_text="Number of installments")
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        db_table = 'daily_revenue_rollups'
+        ordering = ['date']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['date', 'branch', 'course_type', 'payment_mode', 'received_by'],
+                name='unique_daily_revenue_rollup'
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['branch', 'date'], name='revenue_rollup_branch_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.date} {self.branch} {self.payment_mode} - {self.net_amount}"
+
+
+class IdempotencyKey(models.Model):
+    """Stored response of a POST sent with an Idempotency-Key header, replayed on retries"""
+    key = models.CharField(max_length=255)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='idempotency_keys')
+    endpoint = models.CharField(max_length=100)
+    request_fingerprint = models.CharField(max_length=64)
+    response_status = models.PositiveSmallIntegerField(null=True, blank=True)  # null while the first request runs
+    response_body = models.TextField(blank=True)
+    response_hash = models.CharField(max_length=64, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    expires_at = models.DateTimeField(db_index=True)
+    
+    class Meta:
+        db_table = 'idempotency_keys'
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'endpoint', 'key'], name='unique_idempotency_key'),
+        ]
+    
+    def __str__(self):
+        return f"{self.endpoint} {self.key} ({self.response_status})"
+
+
+class EnquiryStatusChange(models.Model):
+    """Append-only history of enquiry status transitions; from_status is blank for a new enquiry"""
+    student = models.ForeignKey(Student_api, on_delete=models.CASCADE, related_name='status_changes')
+    from_status = models.CharField(max_length=20, choices=Student_api.ENQUIRY_STATUS, blank=True)
+    to_status = models.CharField(max_length=20, choices=Student_api.ENQUIRY_STATUS)
+    # Snapshot of the assigned counselor and funnel dimensions when the change happened,
+    # so rebuilding the rollup keeps each transition in the bucket it was counted under
+    counselor = models.ForeignKey(StaffProfile, on_delete=models.SET_NULL, null=True, blank=True, related_name='enquiry_status_changes')
+    enquiry_source = models.CharField(max_length=20, choices=Student_api.ENQUIRY_SOURCE_CHOICES, blank=True)
+    trade = models.CharField(max_length=20, choices=Student_api.TRADE_CHOICES, blank=True)
+    centre = models.CharField(max_length=20, choices=Student_api.CENTRE_CHOICES, blank=True)
+    changed_by = models.ForeignKey(StaffProfile, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    days_since_enquiry = models.IntegerField(default=0)
+    changed_at = models.DateTimeField(default=timezone.now)
+    
+    class Meta:
+        db_table = 'enquiry_status_changes'
+        ordering = ['changed_at', 'id']
+        indexes = [
+            models.Index(fields=['student', 'changed_at'], name='status_change_student_idx'),
+            models.Index(fields=['changed_at'], name='status_change_date_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.student_id}: {self.from_status or '-'} -> {self.to_status}"
+
+
+class EnquiryFunnelDaily(models.Model):
+    """Status transitions per day and funnel dimension, kept current by enquiry_funnel.record_status_changes"""
+    date = models.DateField()
+    enquiry_source = models.CharField(max_length=20, choices=Student_api.ENQUIRY_SOURCE_CHOICES)
+    trade = models.CharField(max_length=20, choices=Student_api.TRADE_CHOICES)
+    centre = models.CharField(max_length=20, choices=Student_api.CENTRE_CHOICES)
+    counselor = models.ForeignKey(StaffProfile, on_delete=models.CASCADE, null=True, blank=True, related_name='funnel_rollups')
+    # counselor_id, or 0 for unassigned enquiries. The unique key uses this column because
+    # MySQL unique indexes never treat two NULLs as equal
+    counselor_key = models.PositiveIntegerField(default=0)
+    status = models.CharField(max_length=20, choices=Student_api.ENQUIRY_STATUS)
+    entries = models.IntegerField(default=0, help_text="Enquiries that moved into this status")
+    first_entries = models.IntegerField(default=0, help_text="Of those, enquiries created in this status (the funnel's intake)")
+    days_since_enquiry_total = models.IntegerField(default=0, help_text="Sum of days from enquiry to this status, for averages")
+    
+    class Meta:
+        db_table = 'enquiry_funnel_daily'
+        ordering = ['date']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['date', 'enquiry_source', 'trade', 'centre', 'counselor_key', 'status'],
+                name='unique_enquiry_funnel_daily_key'
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['date', 'status'], name='funnel_daily_date_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.date} {self.status} - {self.entries}"
+
+
+class StaffDailyCounter(models.Model):
+    """Per-staff activity for one day, incremented in the same transaction as the write it counts"""
+    staff = models.ForeignKey(StaffProfile, on_delete=models.CASCADE, related_name='daily_counters')
+    date = models.DateField()
+    enquiries_created = models.IntegerField(default=0)
+    # Assigned enquiries moved to admission_done on this day
+    conversions = models.IntegerField(default=0)
+    registrations_created = models.IntegerField(default=0)
+    payments_received = models.IntegerField(default=0)
+    payments_amount = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    # Open enquiries assigned to this staff member with next_follow_up_date on this day
+    follow_ups_due = models.IntegerField(default=0)
+    
+    class Meta:
+        db_table = 'staff_daily_counters'
+        ordering = ['-date']
+        constraints = [
+            models.UniqueConstraint(fields=['staff', 'date'], name='unique_staff_daily_counter'),
+        ]
     
     def __str__(self):
-        return f"Installment #{self.installment_number} - {self.amount} for {self.student_registration.registration_number}"
\ No newline at end of file
+        return f"{self.staff} {self.date}"
@@ -0,0 +1,95 @@
+# staff_app/reference_data.py
+import hashlib
+import json
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils.cache import patch_cache_control, patch_vary_headers
+from rest_framework import status
+from rest_framework.response import Response
+from techcadd_apis import app_cache
+from .models import Course, CourseType, StaffProfile, Student_api, StudentRegistration
+from .serializers import CourseSerializer, CourseTypeSerializer
+
+# Form dropdown data. Each payload is cached as a snapshot together with its ETag, in the
+# app_cache namespace whose models it is built from, so a change to those models yields a new
+# snapshot and a new ETag. An unchanged client revalidates with If-None-Match and gets a 304.
+
+
+def _plain(rows):
+    # ReturnList keeps a reference to its serializer, which should not go into the cache
+    return [dict(row) for row in rows]
+
+
+def _snapshot(payload):
+    body = json.dumps(payload, cls=DjangoJSONEncoder, sort_keys=True, separators=(',', ':'))
+    return {'payload': payload, 'etag': '"%s"' % hashlib.sha256(body.encode()).hexdigest()[:32]}
+
+
+def _build_student_options():
+    staff_members = StaffProfile.objects.filter(is_active=True).select_related('user')
+    return _snapshot({
+        'centre_choices': Student_api.CENTRE_CHOICES,
+        'trade_choices': Student_api.TRADE_CHOICES,
+        'enquiry_source_choices': Student_api.ENQUIRY_SOURCE_CHOICES,
+        'enquiry_status_choices': Student_api.ENQUIRY_STATUS,
+        'staff_options': [
+            {'id': staff.id, 'name': staff.user.get_full_name() or staff.user.username}
+            for staff in staff_members
+        ],
+    })
+
+
+def _build_registration_options():
+    course_types = CourseType.objects.filter(is_active=True).order_by('id')
+    return _snapshot({
+        'course_types': _plain(CourseTypeSerializer(course_types, many=True).data),
+        'duration_choices': [{'value': value, 'label': label} for value, label in Course.DURATION_CHOICES],
+        'branch_choices': StudentRegistration.CENTRE_CHOICES,
+    })
+
+
+def _build_courses_by_type(course_type_id):
+    courses = Course.objects.filter(
+        course_type_id=course_type_id, is_active=True
+    ).select_related('course_type').order_by('id')
+    return _snapshot(_plain(CourseSerializer(courses, many=True).data))
+
+
+def _ttl():
+    return getattr(settings, 'REFERENCE_DATA_CACHE_TTL', 3600)
+
+
+def student_options():
+    return app_cache.get_or_set('staff_directory', 'student-options', _build_student_options, _ttl())
+
+
+def registration_options():
+    return app_cache.get_or_set('catalog', 'registration-options', _build_registration_options, _ttl())
+
+
+def courses_by_type(course_type_id):
+    return app_cache.get_or_set(
+        'catalog', f'courses-by-type:{course_type_id}', lambda: _build_courses_by_type(course_type_id), _ttl()
+    )
+
+
+def _client_has(request, etag):
+    # Weak comparison: CompressionMiddleware hands out W/"..." for compressed bodies
+    if_none_match = request.headers.get('If-None-Match', '')
+    tags = [tag.strip().removeprefix('W/') for tag in if_none_match.split(',')]
+    return if_none_match.strip() == '*' or etag in tags
+
+
+def reference_response(request, snapshot):
+    """200 with the snapshot, or 304 when the client's copy is current"""
+    if _client_has(request, snapshot['etag']):
+        response = Response(status=status.HTTP_304_NOT_MODIFIED)
+    else:
+        response = Response(snapshot['payload'])
+    response['ETag'] = snapshot['etag']
+    # Per-user (bearer token) data: private, reused for max-age, then revalidated
+    patch_cache_control(
+        response, private=True, max_age=getattr(settings, 'REFERENCE_DATA_MAX_AGE', 600), must_revalidate=True
+    )
+    patch_vary_headers(response, ['Authorization'])
+    return response
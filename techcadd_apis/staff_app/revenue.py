@@ -0,0 +1,142 @@
+# staff_app/revenue.py
+from decimal import Decimal
+from django.db import transaction
+from django.db.models import Count, F, Q, Sum
+from django.db.models.functions import TruncMonth, TruncWeek
+from .counters import increment_row
+from .models import DailyRevenueRollup, PaymentTransaction, StudentRegistration
+
+PERIODS = {
+    'day': None,
+    'week': TruncWeek,
+    'month': TruncMonth,
+}
+
+# group_by value -> (rollup column, label column)
+DIMENSIONS = {
+    'branch': ('branch', None),
+    'course_type': ('course_type', 'course_type__name'),
+    'payment_mode': ('payment_mode', None),
+    'received_by': ('received_by', 'received_by__user__username'),
+}
+
+AMOUNT_FIELDS = ['collected_amount', 'adjusted_amount', 'refunded_amount', 'net_amount', 'payment_count']
+
+ENTRY_AMOUNT_FIELD = {
+    'installment': 'collected_amount',
+    'adjustment': 'adjusted_amount',
+    'refund': 'refunded_amount',
+}
+
+
+# Entry types that move cash; net_amount is what actually came in, so adjustments
+# (concessions) stay in their own column
+CASH_ENTRY_TYPES = ['installment', 'refund']
+
+
+def _rollup_amounts(entry, sign=1):
+    amount = entry.amount * sign
+    amounts = {ENTRY_AMOUNT_FIELD[entry.entry_type]: amount}
+    if entry.entry_type in CASH_ENTRY_TYPES:
+        amounts['net_amount'] = amount
+    if entry.entry_type == 'installment':
+        amounts['payment_count'] = sign
+    return amounts
+
+
+def apply_to_rollup(entry, sign=1):
+    """
+    Add (sign=1) or remove (sign=-1) one ledger entry from its daily rollup row
+    Runs inside the caller's transaction so the rollup commits with the entry
+    """
+    if entry.entry_type not in ENTRY_AMOUNT_FIELD:
+        # Manual corrections are not revenue
+        return
+    registration = entry.student_registration
+    key = {
+        'date': entry.payment_date,
+        'branch': registration.branch,
+        'course_type_id': registration.course_type_id,
+        'payment_mode': entry.payment_mode,
+        'received_by_id': entry.received_by_id,
+    }
+    increment_row(DailyRevenueRollup, key, _rollup_amounts(entry, sign))
+
+
+def rebuild_rollups(since=None, until=None):
+    """Recompute rollup rows from the ledger for a date range (all dates when open)"""
+    ledger = PaymentTransaction.objects.filter(entry_type__in=ENTRY_AMOUNT_FIELD)
+    rollups = DailyRevenueRollup.objects.all()
+    if since:
+        ledger = ledger.filter(payment_date__gte=since)
+        rollups = rollups.filter(date__gte=since)
+    if until:
+        ledger = ledger.filter(payment_date__lte=until)
+        rollups = rollups.filter(date__lte=until)
+
+    # order_by() drops the model ordering so it does not leak into GROUP BY
+    grouped = ledger.order_by().values(
+        'payment_date',
+        'student_registration__branch',
+        'student_registration__course_type',
+        'payment_mode',
+        'received_by',
+    ).annotate(
+        collected_amount=Sum('amount', filter=Q(entry_type='installment'), default=Decimal('0')),
+        adjusted_amount=Sum('amount', filter=Q(entry_type='adjustment'), default=Decimal('0')),
+        refunded_amount=Sum('amount', filter=Q(entry_type='refund'), default=Decimal('0')),
+        net_amount=Sum('amount', filter=Q(entry_type__in=CASH_ENTRY_TYPES), default=Decimal('0')),
+        payment_count=Count('id', filter=Q(entry_type='installment')),
+    )
+
+    rows = [
+        DailyRevenueRollup(
+            date=group['payment_date'],
+            branch=group['student_registration__branch'],
+            course_type_id=group['student_registration__course_type'],
+            payment_mode=group['payment_mode'],
+            received_by_id=group['received_by'],
+            **{field: group[field] for field in AMOUNT_FIELDS}
+        )
+        for group in grouped
+    ]
+
+    with transaction.atomic():
+        rollups.delete()
+        DailyRevenueRollup.objects.bulk_create(rows, batch_size=1000)
+    return len(rows)
+
+
+def revenue_report(start_date, end_date, period='day', group_by='branch', branch=None):
+    """Totals per period and dimension, read from the rollup table only"""
+    rollups = DailyRevenueRollup.objects.filter(date__gte=start_date, date__lte=end_date)
+    if branch:
+        rollups = rollups.filter(branch=branch)
+
+    column, label_column = DIMENSIONS[group_by]
+    trunc = PERIODS[period]
+    period_expression = trunc('date') if trunc else F('date')
+    group_columns = [column] + ([label_column] if label_column else [])
+
+    sums = {field: Sum(field) for field in AMOUNT_FIELDS}
+    grouped = rollups.order_by().annotate(
+        period_start=period_expression
+    ).values('period_start', *group_columns).annotate(**sums).order_by('period_start', column)
+
+    choice_labels = {
+        'branch': dict(StudentRegistration.CENTRE_CHOICES),
+        'payment_mode': dict(PaymentTransaction.PAYMENT_MODES),
+    }.get(group_by, {})
+
+    rows = []
+    for group in grouped:
+        key = group[column]
+        rows.append({
+            'period_start': group['period_start'],
+            'key': key,
+            'label': group[label_column] if label_column else choice_labels.get(key, key),
+            **{field: group[field] for field in AMOUNT_FIELDS},
+        })
+
+    totals = rollups.aggregate(**sums)
+    return rows, totals
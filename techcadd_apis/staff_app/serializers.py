@@ -2,7 +2,11 @@
 from django.contrib.auth.models import User
 from rest_framework import serializers
 from django.contrib.auth import authenticate
+from django.db import transaction
+from django.utils import timezone
 from .models import *
+from .counters import bump_staff_counter, follow_up_slot, move_follow_ups
+from .enquiry_funnel import record_status_changes
 
 class StaffLoginSerializer(serializers.Serializer):
     username = serializers.CharField()
@@ -149,9 +153,41 @@ class CreateStudentSerializer(serializers.ModelSerializer):
                 validated_data['assign_enquiry'] = staff_profile
         
         # Create student - username and password will be auto-generated in save()
-        student = Student_api.objects.create(**validated_data)
+        with transaction.atomic():
+            student = Student_api.objects.create(**validated_data)
+            record_status_changes([(student, '')], changed_by=validated_data.get('enquiry_taken_by'))
+            bump_staff_counter(student.enquiry_taken_by_id, student.enquiry_date, enquiries_created=1)
+            move_follow_ups([(None, follow_up_slot(student))])
         return student
 
+class ImportStudentRowSerializer(serializers.ModelSerializer):
+    """Validates one bulk import row without touching the database"""
+    # Checked against a preloaded set of staff ids instead of a query per row
+    assign_enquiry = serializers.IntegerField(required=False, allow_null=True)
+
+    class Meta:
+        model = Student_api
+        fields = (
+            'student_name', 'date_of_birth', 'qualification', 'work_college',
+            'mobile', 'email', 'address', 'centre', 'batch_time',
+            'course_fee_offer', 'course_interested', 'trade', 'enquiry_source',
+            'assign_enquiry', 'enquiry_status', 'remark', 'next_follow_up_date'
+        )
+        # Email uniqueness is checked with one IN query per chunk
+        extra_kwargs = {'email': {'validators': []}}
+
+    def validate_mobile(self, value):
+        """Validate mobile number format"""
+        if len(value) < 10:
+            raise serializers.ValidationError("Mobile number must be at least 10 digits")
+        return value
+
+    def validate_assign_enquiry(self, value):
+        staff_ids = self.context.get('staff_ids', set())
+        if value is not None and value not in staff_ids:
+            raise serializers.ValidationError("Active staff member not found.")
+        return value
+
 class StudentListSerializer(serializers.ModelSerializer):
     enquiry_taken_by_name = serializers.CharField(source='enquiry_taken_by.user.get_full_name', read_only=True)
     enquiry_status_display = serializers.CharField(source='get_enquiry_status_display', read_only=True)
@@ -188,6 +224,16 @@ class UpdateStudentSerializer(serializers.ModelSerializer):
         if instance and Student_api.objects.filter(email=value).exclude(id=instance.id).exists():
             raise serializers.ValidationError("A student with this email already exists.")
         return value
+    
+    def update(self, instance, validated_data):
+        # Status history and follow-up counters change in the same transaction
+        previous_status = instance.enquiry_status
+        previous_follow_up = follow_up_slot(instance)
+        with transaction.atomic():
+            instance = super().update(instance, validated_data)
+            record_status_changes([(instance, previous_status)], changed_by=self.context.get('staff_profile'))
+            move_follow_ups([(previous_follow_up, follow_up_slot(instance))])
+        return instance
 
         # ----------------registration section start ================
 # staff_app/serializers.py - Add these serializers
@@ -297,19 +343,21 @@ class CreateStudentRegistrationSerializer(serializers.ModelSerializer):
             staff_profile = StaffProfile.objects.get(user=request.user)
             validated_data['created_by'] = staff_profile
         
-        # Create registration
-        registration = StudentRegistration.objects.create(**validated_data)
-        # Create initial payment
-        paid_fee = validated_data.get('paid_fee', 0)
-        if paid_fee > 0:
-            PaymentTransaction.objects.create(
-                student_registration=registration,
-                installment_number=1,
-                amount=paid_fee,
-                payment_mode='cash',  # Use actual payment mode
-                received_by=staff_profile,
-                remark='Initial registration payment'
-            )
+        with transaction.atomic():
+            # Create registration
+            registration = StudentRegistration.objects.create(**validated_data)
+            bump_staff_counter(registration.created_by_id, timezone.localdate(), registrations_created=1)
+            # Create initial payment
+            paid_fee = validated_data.get('paid_fee', 0)
+            if paid_fee > 0:
+                PaymentTransaction.objects.create(
+                    student_registration=registration,
+                    installment_number=1,
+                    amount=paid_fee,
+                    payment_mode='cash',  # Use actual payment mode
+                    received_by=staff_profile,
+                    remark='Initial registration payment'
+                )
         return registration
 
 class CourseOptionsSerializer(serializers.Serializer):
@@ -358,18 +406,38 @@ class UpdateFeeSerializer(serializers.ModelSerializer):
             raise serializers.ValidationError(
                 f"Paid fee cannot exceed total course fee: {self.instance.total_course_fee}"
             )
+        if value < 0:
+            raise serializers.ValidationError("Paid fee cannot be negative")
         return value
+    
+    def update(self, instance, validated_data):
+        # Record the change as a correction so the ledger keeps matching paid_fee
+        if 'paid_fee' in validated_data:
+            with transaction.atomic():
+                current = StudentRegistration.objects.select_for_update().values_list(
+                    'paid_fee', flat=True
+                ).get(pk=instance.pk)
+                difference = validated_data['paid_fee'] - current
+                if difference:
+                    instance.record_ledger_entry(
+                        difference,
+                        received_by=self.context.get('staff_profile'),
+                        entry_type='correction',
+                        remark='Paid fee set manually'
+                    )
+        return instance
 
 # staff_app/serializers.py - Add these serializers
 
 class PaymentTransactionSerializer(serializers.ModelSerializer):
     received_by_name = serializers.CharField(source='received_by.user.get_full_name', read_only=True)
     payment_mode_display = serializers.CharField(source='get_payment_mode_display', read_only=True)
+    entry_type_display = serializers.CharField(source='get_entry_type_display', read_only=True)
     
     class Meta:
         model = PaymentTransaction
         fields = (
-            'id', 'installment_number', 'amount', 'payment_date', 
+            'id', 'entry_type', 'entry_type_display', 'installment_number', 'amount', 'payment_date', 
             'payment_mode', 'payment_mode_display', 'transaction_id',
             'received_by', 'received_by_name', 'remark', 'created_at'
         )
@@ -379,28 +447,65 @@ class AddPaymentSerializer(serializers.ModelSerializer):
         model = PaymentTransaction
         fields = ('amount', 'payment_mode', 'transaction_id', 'remark')
     
+    def validate_amount(self, value):
+        if value <= 0:
+            raise serializers.ValidationError("Payment amount must be greater than zero")
+        return value
+    
     def create(self, validated_data):
-        request = self.context.get('request')
         registration = self.context.get('registration')
         staff_profile = self.context.get('staff_profile')
         
-        # Get next installment number
-        last_payment = PaymentTransaction.objects.filter(
-            student_registration=registration
-        ).order_by('-installment_number').first()
-        
-        next_installment = (last_payment.installment_number + 1) if last_payment else 1
-        
-        # Create payment transaction
-        payment = PaymentTransaction.objects.create(
-            student_registration=registration,
-            installment_number=next_installment,
-            received_by=staff_profile,
-            **validated_data
+        # Numbered and applied to paid_fee under a lock on the registration row
+        return registration.record_ledger_entry(received_by=staff_profile, **validated_data)
+
+class AddFeeAdjustmentSerializer(serializers.ModelSerializer):
+    """
+    Concessions, corrections and refunds recorded as ledger entries
+    Refund amounts are entered as positive numbers and stored negative
+    """
+    entry_type = serializers.ChoiceField(choices=[('adjustment', 'Adjustment'), ('refund', 'Refund')])
+    remark = serializers.CharField()
+    
+    class Meta:
+        model = PaymentTransaction
+        fields = ('entry_type', 'amount', 'payment_mode', 'transaction_id', 'remark')
+    
+    def validate(self, data):
+        amount = data['amount']
+        if amount == 0:
+            raise serializers.ValidationError({'amount': 'Amount cannot be zero'})
+        if data['entry_type'] == 'refund':
+            if amount < 0:
+                raise serializers.ValidationError({'amount': 'Enter the refund as a positive amount'})
+            data['amount'] = -amount
+        # The 0..total_course_fee bounds are checked by record_ledger_entry under the row lock
+        return data
+    
+    def create(self, validated_data):
+        registration = self.context.get('registration')
+        staff_profile = self.context.get('staff_profile')
+        return registration.record_ledger_entry(received_by=staff_profile, **validated_data)
+
+class FeeLedgerEntrySerializer(PaymentTransactionSerializer):
+    """Fee history row with the running totals annotated by the history query"""
+    running_paid = serializers.DecimalField(max_digits=12, decimal_places=2, read_only=True)
+    running_balance = serializers.DecimalField(max_digits=12, decimal_places=2, read_only=True)
+    
+    class Meta(PaymentTransactionSerializer.Meta):
+        fields = PaymentTransactionSerializer.Meta.fields + ('running_paid', 'running_balance')
+
+class DueRegistrationSerializer(serializers.ModelSerializer):
+    """Dues report row; last_payment_date and aging_bucket are annotated by the dues query"""
+    branch_display = serializers.CharField(source='get_branch_display', read_only=True)
+    course_name = serializers.CharField(source='course.name', read_only=True)
+    last_payment_date = serializers.DateField(read_only=True)
+    aging_bucket = serializers.CharField(read_only=True)
+    
+    class Meta:
+        model = StudentRegistration
+        fields = (
+            'id', 'registration_number', 'student_name', 'phone_no', 'branch', 'branch_display',
+            'course_name', 'total_course_fee', 'paid_fee', 'fee_balance',
+            'last_payment_date', 'aging_bucket'
         )
-        
-        # Update student registration paid_fee
-        registration.paid_fee += payment.amount
-        registration.save()
-        
-        return payment
\ No newline at end of file
@@ -0,0 +1,53 @@
+# staff_app/signals.py
+from django.contrib.auth.models import User
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.utils import timezone
+from techcadd_apis.app_cache import invalidate_on_change
+from .counters import bump_staff_counter, follow_up_slot, move_follow_ups
+from .models import Course, CourseType, PaymentTransaction, StaffProfile, Student_api, StudentRegistration
+from .revenue import apply_to_rollup
+
+# Application cache namespaces (lesson-level course_tree models are wired in student_lms)
+invalidate_on_change('catalog', CourseType, Course)
+invalidate_on_change('course_tree', Course)
+invalidate_on_change('staff_directory', StaffProfile)
+# Only the names shown in staff options; sign-ins save last_login alone
+invalidate_on_change('staff_directory', User, fields=['username', 'first_name', 'last_name'])
+invalidate_on_change('stats', Student_api)
+
+
+@receiver(post_save, sender=PaymentTransaction)
+def add_payment_to_rollup(sender, instance, created, raw=False, **kwargs):
+    # Ledger entries are append-only; edits in place are picked up by rebuild_revenue_rollups
+    if created and not raw:
+        apply_to_rollup(instance)
+        count_payment(instance)
+
+
+@receiver(post_delete, sender=PaymentTransaction)
+def remove_payment_from_rollup(sender, instance, **kwargs):
+    apply_to_rollup(instance, sign=-1)
+    count_payment(instance, sign=-1)
+
+
+def count_payment(entry, sign=1):
+    if entry.entry_type == 'installment':
+        bump_staff_counter(
+            entry.received_by_id,
+            entry.payment_date,
+            payments_received=sign,
+            payments_amount=entry.amount * sign
+        )
+
+
+@receiver(post_delete, sender=Student_api)
+def remove_follow_up(sender, instance, **kwargs):
+    move_follow_ups([(follow_up_slot(instance), None)])
+    bump_staff_counter(instance.enquiry_taken_by_id, instance.enquiry_date, enquiries_created=-1)
+
+
+@receiver(post_delete, sender=StudentRegistration)
+def remove_registration_count(sender, instance, **kwargs):
+    # Its payments are cascaded and leave the counters through remove_payment_from_rollup
+    bump_staff_counter(instance.created_by_id, timezone.localdate(instance.created_at), registrations_created=-1)
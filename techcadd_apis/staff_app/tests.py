@@ -1,3 +1,932 @@
-from django.test import TestCase
+import datetime
+import io
+import json
+import threading
+import time
+from unittest import mock
+from concurrent.futures import ThreadPoolExecutor
+from django.contrib.auth.models import User, update_last_login
+from decimal import Decimal
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, IntegrityError, OperationalError, connection, connections, transaction
+from django.db.models import Count, Sum
+from django.test import TestCase, TransactionTestCase, override_settings, skipUnlessDBFeature
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.decorators import api_view
+from rest_framework.response import Response
+from rest_framework.test import APIClient, APIRequestFactory, force_authenticate
+from techcadd_apis import app_cache
+from .benchmarks import bearer_headers
+from .enquiry_import import import_enquiries, read_enquiry_rows
+from .enquiry_funnel import funnel_report, rebuild_funnel, record_status_changes
+from .enquiry_stats import student_stats_for
+from .idempotency import idempotent
+from .usernames import allocate_usernames
+from .counters import COUNTER_FIELDS, rebuild_staff_counters
+from .revenue import rebuild_rollups
+from .serializers import CreateStudentRegistrationSerializer
+from .models import (
+    Course, CourseType, DailyRevenueRollup, EnquiryFunnelDaily, EnquiryStatusChange, IdempotencyKey, PaymentTransaction, RegistrationSequence,
+    StaffDailyCounter, StaffProfile, Student_api, StudentRegistration, UsernameSequence
+)
 
-# Create your tests here.
+
+def run_concurrently(worker, threads):
+    """Start worker(index) in every thread at the same moment; each thread closes its own connection"""
+    barrier = threading.Barrier(threads)
+
+    def run(index):
+        try:
+            barrier.wait()
+            return worker(index)
+        finally:
+            connection.close()
+
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        return list(pool.map(run, range(threads)))
+
+
+class StaffDataMixin:
+    def create_staff(self, username='counselor', role='counselor'):
+        user = User.objects.create_user(username=username, password='secret')
+        return StaffProfile.objects.create(user=user, role=role)
+
+    def create_course(self):
+        course_type = CourseType.objects.create(name='IT')
+        course = Course.objects.create(
+            course_type=course_type, name='Web Development', duration_months='3_months',
+            duration_hours=100, course_fee=10000
+        )
+        return course_type, course
+
+    def enquiry_row(self, name, **fields):
+        """One import/create payload for an enquiry"""
+        row = dict(
+            student_name=name, date_of_birth='2000-01-01', qualification='BCA', mobile='9999999999',
+            email=f'{name.replace(" ", "").lower()}@example.com', address='Address', centre='ludhiana',
+            trade='it', enquiry_source='website'
+        )
+        row.update(fields)
+        return row
+
+    def create_registration(self, staff_profile, course_type, course, name='Student', branch='ludhiana', **fields):
+        data = dict(
+            branch=branch, joining_date=datetime.date(2024, 1, 1), student_name=name, father_name='Father',
+            date_of_birth=datetime.date(2000, 1, 1), email=f'{name.replace(" ", "").lower()}@example.com',
+            qualification='BCA', work_college='College', contact_address='Address', phone_no='9999999999',
+            course_type=course_type, course=course, duration_months='3_months', duration_hours=100,
+            total_course_fee=10000, created_by=staff_profile
+        )
+        data.update(fields)
+        return StudentRegistration.objects.create(**data)
+
+
+# Row locks (SELECT ... FOR UPDATE) are what serialize these writers, so the
+# threaded tests only run on backends that have them: the configured MySQL database,
+# not SQLite. The sequential tests further down cover the same invariants everywhere.
+@skipUnlessDBFeature('has_select_for_update')
+class RegistrationNumberConcurrencyTests(StaffDataMixin, TransactionTestCase):
+    threads = 8
+    per_thread = 10
+
+    def setUp(self):
+        self.staff_profile = self.create_staff()
+        self.course_type, self.course = self.create_course()
+
+    def test_concurrent_registrations_get_unique_gap_free_numbers(self):
+        def register(index):
+            return [
+                self.create_registration(
+                    self.staff_profile, self.course_type, self.course, name=f'Student {index} {n}'
+                ).registration_number
+                for n in range(self.per_thread)
+            ]
+
+        numbers = [number for batch in run_concurrently(register, self.threads) for number in batch]
+        total = self.threads * self.per_thread
+
+        self.assertEqual(len(numbers), total)
+        self.assertEqual(len(set(numbers)), total)
+        suffixes = sorted(RegistrationSequence.parse_number(number)[1] for number in numbers)
+        self.assertEqual(suffixes, list(range(1, total + 1)))
+        self.assertEqual(RegistrationSequence.objects.get(branch_code='4004').last_number, total)
+
+
+@skipUnlessDBFeature('has_select_for_update')
+class UsernameAllocationConcurrencyTests(TransactionTestCase):
+    threads = 8
+    per_thread = 5
+
+    def test_concurrent_requests_for_a_new_base_get_distinct_usernames(self):
+        def allocate(index):
+            return [username for n in range(self.per_thread) for username in allocate_usernames(Student_api, ['Asha Rani'])]
+
+        usernames = [username for batch in run_concurrently(allocate, self.threads) for username in batch]
+        total = self.threads * self.per_thread
+
+        self.assertEqual(len(set(usernames)), total)
+        self.assertEqual(set(usernames), {'asharani'} | {f'asharani{n}' for n in range(1, total)})
+        self.assertEqual(UsernameSequence.objects.get(base='asharani').last_suffix, total - 1)
+
+
+@skipUnlessDBFeature('has_select_for_update')
+class PaymentInstallmentConcurrencyTests(StaffDataMixin, TransactionTestCase):
+    threads = 8
+    per_thread = 5
+
+    def setUp(self):
+        self.staff_profile = self.create_staff()
+        course_type, course = self.create_course()
+        self.registration = self.create_registration(self.staff_profile, course_type, course)
+
+    def test_concurrent_payments_are_numbered_and_totalled_exactly(self):
+        url = f'/api/staff/registrations/add-payment/?registration_number={self.registration.registration_number}'
+
+        def pay(index):
+            client = APIClient()
+            client.force_authenticate(self.staff_profile.user)
+            return [
+                client.post(url, {'amount': '100.00', 'payment_mode': 'cash'}, format='json').status_code
+                for n in range(self.per_thread)
+            ]
+
+        statuses = [code for batch in run_concurrently(pay, self.threads) for code in batch]
+        total = self.threads * self.per_thread
+        self.assertEqual(statuses, [201] * total)
+
+        ledger = PaymentTransaction.objects.filter(student_registration=self.registration)
+        numbers = sorted(ledger.values_list('installment_number', flat=True))
+        self.assertEqual(numbers, list(range(1, total + 1)))
+
+        self.registration.refresh_from_db()
+        ledger_total = ledger.aggregate(total=Sum('amount'))['total']
+        self.assertEqual(ledger_total, Decimal('100.00') * total)
+        self.assertEqual(self.registration.paid_fee, ledger_total)
+        self.assertEqual(self.registration.fee_balance, self.registration.total_course_fee - ledger_total)
+
+
+@skipUnlessDBFeature('has_select_for_update')
+class FeeBoundsConcurrencyTests(StaffDataMixin, TransactionTestCase):
+    threads = 6
+
+    def setUp(self):
+        self.staff_profile = self.create_staff()
+        course_type, course = self.create_course()
+        self.registration = self.create_registration(self.staff_profile, course_type, course)
+        self.registration.record_ledger_entry(Decimal('3000.00'), self.staff_profile)
+
+    def test_concurrent_refunds_cannot_take_paid_fee_below_zero(self):
+        url = f'/api/staff/registrations/fee-adjustment/?registration_number={self.registration.registration_number}'
+
+        def refund(index):
+            client = APIClient()
+            client.force_authenticate(self.staff_profile.user)
+            data = {'entry_type': 'refund', 'amount': '1000.00', 'payment_mode': 'cash', 'remark': 'Refund'}
+            return client.post(url, data, format='json').status_code
+
+        statuses = run_concurrently(refund, self.threads)
+        self.assertEqual(sorted(statuses), [201] * 3 + [400] * (self.threads - 3))
+
+        self.registration.refresh_from_db()
+        self.assertEqual(self.registration.paid_fee, Decimal('0.00'))
+        self.assertEqual(self.registration.fee_balance, self.registration.total_course_fee)
+
+
+class PaymentInstallmentTests(StaffDataMixin, TestCase):
+    def setUp(self):
+        self.staff_profile = self.create_staff()
+        course_type, course = self.create_course()
+        self.registration = self.create_registration(self.staff_profile, course_type, course)
+        self.client = APIClient()
+        self.client.force_authenticate(self.staff_profile.user)
+
+    def test_payments_are_numbered_and_totalled_from_the_ledger(self):
+        url = f'/api/staff/registrations/add-payment/?registration_number={self.registration.registration_number}'
+        for amount in ['1000.00', '250.50', '749.50']:
+            response = self.client.post(url, {'amount': amount, 'payment_mode': 'cash'}, format='json')
+            self.assertEqual(response.status_code, 201)
+        # Adjustments are not installments and do not take a number
+        self.registration.record_ledger_entry(Decimal('-500.00'), self.staff_profile, entry_type='adjustment')
+        response = self.client.post(url, {'amount': '100.00', 'payment_mode': 'upi'}, format='json')
+        self.assertEqual(response.data['payment_details']['installment_number'], 4)
+
+        ledger = PaymentTransaction.objects.filter(student_registration=self.registration)
+        self.assertEqual(
+            list(ledger.filter(entry_type='installment').order_by('id').values_list('installment_number', flat=True)),
+            [1, 2, 3, 4]
+        )
+        self.registration.refresh_from_db()
+        self.assertEqual(self.registration.paid_fee, Decimal('1600.00'))
+        self.assertEqual(self.registration.paid_fee, ledger.aggregate(total=Sum('amount'))['total'])
+        self.assertEqual(self.registration.fee_balance, Decimal('8400.00'))
+
+
+class FeeLedgerTests(StaffDataMixin, TestCase):
+    def setUp(self):
+        self.staff_profile = self.create_staff()
+        course_type, course = self.create_course()
+        self.registration = self.create_registration(self.staff_profile, course_type, course)
+        self.client = APIClient()
+        self.client.force_authenticate(self.staff_profile.user)
+        self.query = f'?registration_number={self.registration.registration_number}'
+
+    def adjust(self, entry_type, amount):
+        data = {'entry_type': entry_type, 'amount': amount, 'payment_mode': 'cash', 'remark': 'Test'}
+        return self.client.post(f'/api/staff/registrations/fee-adjustment/{self.query}', data, format='json')
+
+    def test_refund_larger_than_paid_fee_is_rejected(self):
+        self.registration.record_ledger_entry(Decimal('1000.00'), self.staff_profile)
+
+        response = self.adjust('refund', '1500.00')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('amount', response.data['details'])
+        self.assertEqual(self.adjust('refund', '400.00').status_code, 201)
+
+        self.registration.refresh_from_db()
+        self.assertEqual(self.registration.paid_fee, Decimal('600.00'))
+        refund = PaymentTransaction.objects.get(entry_type='refund')
+        self.assertEqual((refund.amount, refund.installment_number), (Decimal('-400.00'), None))
+
+    def test_manual_paid_fee_edit_is_booked_as_a_correction(self):
+        self.registration.record_ledger_entry(Decimal('1000.00'), self.staff_profile)
+
+        response = self.client.put(f'/api/staff/registrations/update-fee/{self.query}', {'paid_fee': '1500.00'}, format='json')
+        self.assertEqual(response.status_code, 200)
+
+        correction = PaymentTransaction.objects.get(entry_type='correction')
+        self.assertEqual(correction.amount, Decimal('500.00'))
+        self.registration.refresh_from_db()
+        self.assertEqual(self.registration.paid_fee, Decimal('1500.00'))
+        # Not revenue: the rollup only has the installment
+        self.assertEqual(DailyRevenueRollup.objects.get().net_amount, Decimal('1000.00'))
+
+    def test_history_running_balance_follows_entry_time(self):
+        installment = self.registration.record_ledger_entry(Decimal('3000.00'), self.staff_profile)
+        refund = self.registration.record_ledger_entry(Decimal('-500.00'), self.staff_profile, entry_type='refund')
+        concession = self.registration.record_ledger_entry(Decimal('1000.00'), self.staff_profile, entry_type='adjustment')
+        # The concession was entered with an earlier time than the refund, so it comes first
+        now = timezone.now()
+        for entry, minutes in ((installment, 30), (concession, 20), (refund, 10)):
+            PaymentTransaction.objects.filter(pk=entry.pk).update(created_at=now - datetime.timedelta(minutes=minutes))
+
+        response = self.client.get(f'/api/staff/registrations/fee-history/{self.query}')
+        self.assertEqual(response.status_code, 200)
+        rows = [
+            (row['id'], Decimal(row['running_paid']), Decimal(row['running_balance']))
+            for row in response.data['payment_history']
+        ]
+        self.assertEqual(rows, [
+            (installment.id, Decimal('3000.00'), Decimal('7000.00')),
+            (concession.id, Decimal('4000.00'), Decimal('6000.00')),
+            (refund.id, Decimal('3500.00'), Decimal('6500.00')),
+        ])
+        self.assertEqual(response.data['fee_balance'], 6500.0)
+        self.assertEqual(response.data['total_refunded'], 500.0)
+
+
+class OutstandingDuesTests(StaffDataMixin, TestCase):
+    def setUp(self):
+        self.staff_profile = self.create_staff()
+        course_type, course = self.create_course()
+        self.today = timezone.now().date()
+
+        def registration(name, joined_days_ago, branch='ludhiana', paid=None, paid_days_ago=None):
+            registration = self.create_registration(
+                self.staff_profile, course_type, course, name=name, branch=branch,
+                joining_date=self.today - datetime.timedelta(days=joined_days_ago)
+            )
+            if paid:
+                entry = registration.record_ledger_entry(Decimal(paid), self.staff_profile)
+                PaymentTransaction.objects.filter(pk=entry.pk).update(
+                    payment_date=self.today - datetime.timedelta(days=paid_days_ago)
+                )
+            return registration.registration_number
+
+        self.recent_payment = registration('Recent Payment', 100, paid='1000.00', paid_days_ago=10)
+        self.unpaid_45 = registration('Unpaid 45', 45)
+        self.mohali_75 = registration('Mohali 75', 200, branch='mohali', paid='4000.00', paid_days_ago=75)
+        self.unpaid_120 = registration('Unpaid 120', 120)
+        registration('Paid Up', 150, paid='10000.00', paid_days_ago=5)
+        # A concession is not an installment and does not reset the aging
+        StudentRegistration.objects.get(registration_number=self.mohali_75).record_ledger_entry(
+            Decimal('500.00'), self.staff_profile, entry_type='adjustment'
+        )
+
+        self.client = APIClient()
+        self.client.force_authenticate(self.staff_profile.user)
+
+    def dues(self, **params):
+        response = self.client.get('/api/staff/registrations/dues/', params)
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def test_ages_from_last_installment_or_joining_date(self):
+        data = self.dues()
+        buckets = {row['registration_number']: row['aging_bucket'] for row in data['registrations']}
+        self.assertEqual(buckets, {
+            self.recent_payment: '0_30',
+            self.unpaid_45: '31_60',
+            self.mohali_75: '61_90',
+            self.unpaid_120: '90_plus',
+        })
+        self.assertEqual(
+            {name: bucket['count'] for name, bucket in data['summary'].items()},
+            {'0_30': 1, '31_60': 1, '61_90': 1, '90_plus': 1}
+        )
+        self.assertEqual(data['summary']['61_90']['amount'], 5500.0)
+        self.assertEqual(data['total_outstanding'], 9000.0 + 10000.0 + 5500.0 + 10000.0)
+
+    def test_zero_balance_excluded_and_branch_and_bucket_filters(self):
+        ludhiana = self.dues(branch='ludhiana')
+        self.assertEqual(
+            sorted(row['registration_number'] for row in ludhiana['registrations']),
+            sorted([self.recent_payment, self.unpaid_45, self.unpaid_120])
+        )
+        self.assertEqual(ludhiana['summary']['61_90']['count'], 0)
+
+        old = self.dues(bucket='90_plus')
+        self.assertEqual([row['registration_number'] for row in old['registrations']], [self.unpaid_120])
+        self.assertEqual(self.client.get('/api/staff/registrations/dues/', {'bucket': 'old'}).status_code, 400)
+
+
+class RegistrationSequenceTests(StaffDataMixin, TestCase):
+    def setUp(self):
+        self.staff_profile = self.create_staff()
+        self.course_type, self.course = self.create_course()
+
+    def test_highest_issued_compares_numbers_not_strings(self):
+        self.create_registration(
+            self.staff_profile, self.course_type, self.course, name='Old 1', registration_number='TCD/4004/9999'
+        )
+        self.create_registration(
+            self.staff_profile, self.course_type, self.course, name='Old 2', registration_number='TCD/4004/10000'
+        )
+        self.assertEqual(RegistrationSequence.highest_issued('4004'), 10000)
+
+        registration = self.create_registration(self.staff_profile, self.course_type, self.course, name='New')
+        self.assertEqual(registration.registration_number, 'TCD/4004/10001')
+
+    def test_numbers_are_gap_free_per_branch(self):
+        numbers = {'ludhiana': [], 'mohali': []}
+        for n in range(6):
+            branch = 'ludhiana' if n % 3 else 'mohali'
+            registration = self.create_registration(
+                self.staff_profile, self.course_type, self.course, name=f'Student {n}', branch=branch
+            )
+            numbers[branch].append(registration.registration_number)
+
+        self.assertEqual(numbers['ludhiana'], ['TCD/4004/0001', 'TCD/4004/0002', 'TCD/4004/0003', 'TCD/4004/0004'])
+        self.assertEqual(numbers['mohali'], ['TCD/4006/0001', 'TCD/4006/0002'])
+        self.assertEqual(dict(RegistrationSequence.objects.values_list('branch_code', 'last_number')), {'4004': 4, '4006': 2})
+
+    def test_failed_insert_does_not_use_up_a_number(self):
+        self.create_registration(self.staff_profile, self.course_type, self.course, name='First')
+        with self.assertRaises(IntegrityError):
+            # Same email as the first registration
+            self.create_registration(self.staff_profile, self.course_type, self.course, name='First')
+
+        registration = self.create_registration(self.staff_profile, self.course_type, self.course, name='Second')
+        self.assertEqual(registration.registration_number, 'TCD/4004/0002')
+
+
+class RevenueRollupTests(StaffDataMixin, TestCase):
+    def setUp(self):
+        self.staff_profile = self.create_staff(username='manager', role='manager')
+        course_type, course = self.create_course()
+        registration = self.create_registration(self.staff_profile, course_type, course)
+        registration.record_ledger_entry(Decimal('4000.00'), self.staff_profile)
+        registration.record_ledger_entry(Decimal('-500.00'), self.staff_profile, entry_type='refund')
+        registration.record_ledger_entry(Decimal('-1500.00'), self.staff_profile, entry_type='adjustment')
+
+    def assert_rollup(self):
+        rollup = DailyRevenueRollup.objects.get()
+        self.assertEqual(rollup.collected_amount, Decimal('4000.00'))
+        self.assertEqual(rollup.refunded_amount, Decimal('-500.00'))
+        self.assertEqual(rollup.adjusted_amount, Decimal('-1500.00'))
+        self.assertEqual(rollup.net_amount, Decimal('3500.00'))
+
+    def test_daily_sales_is_cash_in_less_refunds(self):
+        self.assert_rollup()
+        client = APIClient()
+        client.force_authenticate(self.staff_profile.user)
+        response = client.get('/api/staff/reports/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['daily_sales'], 3500.0)
+
+    def test_rebuild_matches_incremental_rollup(self):
+        DailyRevenueRollup.objects.update(net_amount=0)
+        rebuild_rollups()
+        self.assert_rollup()
+
+
+class StaffDirectoryInvalidationTests(StaffDataMixin, TestCase):
+    def setUp(self):
+        self.staff_profile = self.create_staff()
+        self.user = self.staff_profile.user
+
+    def saves_invalidate(self, save):
+        with mock.patch('techcadd_apis.app_cache.invalidate') as invalidate:
+            with self.captureOnCommitCallbacks(execute=True):
+                save()
+        return mock.call('staff_directory') in invalidate.call_args_list
+
+    def test_sign_in_does_not_invalidate(self):
+        self.assertFalse(self.saves_invalidate(lambda: update_last_login(None, self.user)))
+
+    def test_name_change_invalidates(self):
+        self.user.first_name = 'Asha'
+        self.assertTrue(self.saves_invalidate(lambda: self.user.save(update_fields=['first_name'])))
+        self.assertTrue(self.saves_invalidate(self.user.save))
+
+
+@override_settings(DATABASE_REPLICAS=['replica1'], REPLICA_STICKY_SECONDS=1)
+class ReplicaRoutingTests(StaffDataMixin, TransactionTestCase):
+    def setUp(self):
+        # A second connection to the test database stands in for the replica, as
+        # TEST: {'MIRROR': 'default'} would; TransactionTestCase commits, so it sees the data
+        primary = connections[DEFAULT_DB_ALIAS]
+        connections['replica1'] = primary.__class__(dict(primary.settings_dict), alias='replica1')
+        self.addCleanup(self.drop_replica)
+        cache.clear()
+
+        self.staff_profile = self.create_staff()
+        course_type, course = self.create_course()
+        self.registration = self.create_registration(self.staff_profile, course_type, course)
+        self.headers = bearer_headers(self.staff_profile.user)
+
+    def drop_replica(self):
+        connections['replica1'].close()
+        del connections['replica1']
+
+    def request(self, method, path, headers, **kwargs):
+        """Response plus the SQL each database ran for it"""
+        with CaptureQueriesContext(connections[DEFAULT_DB_ALIAS]) as primary:
+            with CaptureQueriesContext(connections['replica1']) as replica:
+                response = getattr(APIClient(), method)(path, format='json', **headers, **kwargs)
+        return response, [q['sql'] for q in primary], [q['sql'] for q in replica]
+
+    def list_students(self, headers):
+        response, primary, replica = self.request('get', '/api/staff/students/list/', headers)
+        self.assertEqual(response.status_code, 200)
+        # Only the token's user lookup runs before the view
+        view_queries_on_primary = [sql for sql in primary if 'auth_user' not in sql]
+        return bool(replica) and not view_queries_on_primary
+
+    def pay(self):
+        url = f'/api/staff/registrations/add-payment/?registration_number={self.registration.registration_number}'
+        data = {'amount': '100.00', 'payment_mode': 'cash'}
+        response, primary, replica = self.request('post', url, self.headers, data=data)
+        self.assertEqual(response.status_code, 201)
+        self.assertTrue(any(sql.startswith('INSERT') for sql in primary))
+        self.assertEqual(replica, [])
+
+    def test_replica_reads_view_reads_from_the_replica(self):
+        self.assertTrue(self.list_students(self.headers))
+
+    def test_writer_reads_primary_until_sticky_window_passes(self):
+        self.pay()
+        self.assertFalse(self.list_students(self.headers))
+        # Other clients are not pinned by this write
+        other = self.create_staff(username='other')
+        self.assertTrue(self.list_students(bearer_headers(other.user)))
+
+        time.sleep(1.1)
+        self.assertTrue(self.list_students(self.headers))
+
+
+class EnquiryImportTests(StaffDataMixin, TestCase):
+    def setUp(self):
+        self.staff_profile = self.create_staff()
+
+    def test_reads_csv_and_json_files(self):
+        csv_file = io.BytesIO('\ufeffstudent_name,email\nAsha,asha@example.com\n'.encode('utf-8'))
+        self.assertEqual(read_enquiry_rows(csv_file, 'enquiries.csv'), [{'student_name': 'Asha', 'email': 'asha@example.com'}])
+
+        rows = [{'student_name': 'Asha'}]
+        self.assertEqual(read_enquiry_rows(io.BytesIO(json.dumps(rows).encode()), 'enquiries.json'), rows)
+        wrapped = io.StringIO(json.dumps({'students': rows}))
+        self.assertEqual(read_enquiry_rows(wrapped), rows)
+        with self.assertRaises(ValueError):
+            read_enquiry_rows(io.StringIO('{"rows": []}'))
+
+    def test_reports_row_errors_and_duplicate_emails(self):
+        Student_api.objects.create(enquiry_taken_by=self.staff_profile, **self.enquiry_row('Existing'))
+        rows = [
+            self.enquiry_row('First', email=' first@example.com '),
+            self.enquiry_row('Short Mobile', mobile='123'),
+            self.enquiry_row('Again', email='FIRST@example.com'),
+            self.enquiry_row('Taken', email='existing@example.com'),
+            'not an object',
+            self.enquiry_row('Second'),
+        ]
+
+        report = import_enquiries(rows, self.staff_profile, chunk_size=2)
+
+        self.assertEqual(report['created'], 2)
+        self.assertEqual([row['row'] for row in report['created_students']], [1, 6])
+        self.assertEqual(report['failed'], 4)
+        errors = {error['row']: error['errors'] for error in report['errors']}
+        self.assertIn('mobile', errors[2])
+        self.assertEqual(errors[3], {'email': ['Duplicate email in this import.']})
+        self.assertEqual(errors[4], {'email': ['A student with this email already exists.']})
+        self.assertEqual(errors[5], {'non_field_errors': ['Row must be an object']})
+
+        imported = Student_api.objects.filter(email__in=['first@example.com', 'second@example.com'])
+        self.assertEqual(imported.count(), 2)
+        self.assertEqual(EnquiryStatusChange.objects.filter(student__in=imported, from_status='').count(), 2)
+        self.assertEqual(StaffDailyCounter.objects.get(staff=self.staff_profile).enquiries_created, 2)
+
+    def test_failed_bookkeeping_rolls_back_its_chunk(self):
+        rows = [self.enquiry_row(f'Student {n}') for n in range(3)]
+        with mock.patch(
+            'staff_app.enquiry_import.record_status_changes', side_effect=[1, DatabaseError('history unavailable')]
+        ):
+            report = import_enquiries(rows, self.staff_profile, chunk_size=2)
+
+        self.assertEqual(report['created'], 2)
+        self.assertEqual([error['row'] for error in report['errors']], [3])
+        self.assertFalse(Student_api.objects.filter(student_name='Student 2').exists())
+        self.assertEqual(StaffDailyCounter.objects.get(staff=self.staff_profile).enquiries_created, 2)
+
+
+class UsernameAllocationTests(StaffDataMixin, TestCase):
+    def setUp(self):
+        self.staff_profile = self.create_staff()
+
+    def test_allocates_bare_base_then_numbered_suffixes(self):
+        self.assertEqual(allocate_usernames(Student_api, ['Asha Rani', 'Asha Rani', 'Ravi']), ['asharani', 'asharani1', 'ravi'])
+        self.assertEqual(allocate_usernames(Student_api, ['Asha Rani']), ['asharani2'])
+
+    def test_new_base_is_seeded_from_existing_usernames(self):
+        for username in ['asha', 'asha7', 'asha12', 'ashak3']:
+            Student_api.objects.create(
+                enquiry_taken_by=self.staff_profile, username=username, **self.enquiry_row(username)
+            )
+
+        self.assertEqual(allocate_usernames(Student_api, ['Asha', 'Asha K']), ['asha13', 'ashak4'])
+        self.assertEqual(UsernameSequence.objects.get(base='asha').last_suffix, 13)
+
+        student = Student_api.objects.create(
+            enquiry_taken_by=self.staff_profile, **self.enquiry_row('Asha', email='asha.new@example.com')
+        )
+        self.assertEqual(student.username, 'asha14')
+
+
+@api_view(['POST'])
+@idempotent
+def idempotent_echo(request):
+    """Test view: counts its runs and answers with the status asked for"""
+    idempotent_echo.runs += 1
+    if idempotent_echo.during_run:
+        idempotent_echo.during_run()
+    return Response({'run': idempotent_echo.runs}, status=int(request.data.get('status', 201)))
+
+
+class IdempotencyTests(StaffDataMixin, TestCase):
+    def setUp(self):
+        self.user = self.create_staff().user
+        self.factory = APIRequestFactory()
+        idempotent_echo.runs = 0
+        idempotent_echo.during_run = None
+
+    def post(self, data, key='key-1'):
+        request = self.factory.post('/echo/', data, format='json', HTTP_IDEMPOTENCY_KEY=key)
+        force_authenticate(request, self.user)
+        return idempotent_echo(request)
+
+    def test_retry_with_the_same_key_replays_the_stored_response(self):
+        first = self.post({'amount': 1})
+        retry = self.post({'amount': 1})
+        self.assertEqual((first.status_code, first.data), (201, {'run': 1}))
+        self.assertEqual((retry.status_code, retry.data), (201, {'run': 1}))
+        self.assertEqual(retry['Idempotent-Replayed'], 'true')
+        self.assertEqual(idempotent_echo.runs, 1)
+        # Another key is another request
+        self.assertEqual(self.post({'amount': 1}, key='key-2').data, {'run': 2})
+
+    def test_same_key_with_a_different_body_is_rejected(self):
+        self.post({'amount': 1})
+        self.assertEqual(self.post({'amount': 2}).status_code, 422)
+        self.assertEqual(idempotent_echo.runs, 1)
+
+    def test_retry_while_the_first_request_runs_gets_409(self):
+        retries = []
+        idempotent_echo.during_run = lambda: retries.append(self.post({'amount': 1}))
+        self.assertEqual(self.post({'amount': 1}).status_code, 201)
+        self.assertEqual(retries[0].status_code, 409)
+        self.assertEqual(idempotent_echo.runs, 1)
+
+    def test_server_errors_are_not_stored(self):
+        self.assertEqual(self.post({'status': 503}).status_code, 503)
+        self.assertFalse(IdempotencyKey.objects.exists())
+        self.assertEqual(self.post({'status': 503}).data, {'run': 2})
+
+    def test_stored_response_expires_after_the_ttl(self):
+        self.post({'amount': 1})
+        record = IdempotencyKey.objects.get()
+        self.assertGreater(record.expires_at, timezone.now() + datetime.timedelta(hours=23))
+
+        IdempotencyKey.objects.update(expires_at=timezone.now() - datetime.timedelta(seconds=1))
+        self.assertEqual(self.post({'amount': 1}).data, {'run': 2})
+
+    def test_key_left_by_a_dead_request_is_reclaimed_after_its_lease(self):
+        self.post({'amount': 1})
+        # What a worker killed mid-request leaves behind
+        IdempotencyKey.objects.update(response_status=None, response_body='')
+        self.assertEqual(self.post({'amount': 1}).status_code, 409)
+
+        IdempotencyKey.objects.update(expires_at=timezone.now() - datetime.timedelta(seconds=1))
+        self.assertEqual(self.post({'amount': 1}).data, {'run': 2})
+
+    def test_database_errors_creating_a_registration_are_not_stored(self):
+        client = APIClient()
+        client.force_authenticate(self.user)
+        with mock.patch.object(CreateStudentRegistrationSerializer, 'is_valid', return_value=True), \
+                mock.patch.object(CreateStudentRegistrationSerializer, 'save', side_effect=OperationalError('deadlock')):
+            with self.assertRaises(OperationalError):
+                client.post('/api/staff/registrations/create/', {}, format='json', HTTP_IDEMPOTENCY_KEY='key-1')
+        self.assertFalse(IdempotencyKey.objects.exists())
+
+
+def per_status_counts(students):
+    """student_stats as it was computed before the single GROUP BY, one query per figure"""
+    return {
+        'total_students': students.count(),
+        'new_enquiries': students.filter(enquiry_status='new').count(),
+        'converted_students': students.filter(enquiry_status='admission_done').count(),
+        'trade_distribution': list(students.values('trade').annotate(count=Count('id'))),
+        'status_distribution': list(students.values('enquiry_status').annotate(count=Count('id'))),
+        'centre_distribution': list(students.values('centre').annotate(count=Count('id'))),
+    }
+
+
+class StudentStatsTests(StaffDataMixin, TestCase):
+    def setUp(self):
+        cache.clear()
+        app_cache.clear_local()
+        self.manager = self.create_staff(username='manager', role='manager')
+        self.counselor = self.create_staff(username='counselor')
+        other = self.create_staff(username='other')
+        enquiries = [
+            ('A', self.counselor, 'new', 'it', 'ludhiana'),
+            ('B', self.counselor, 'admission_done', 'it', 'mohali'),
+            ('C', self.counselor, 'visited', 'civil', 'ludhiana'),
+            ('D', other, 'new', 'civil', 'mohali'),
+            ('E', other, 'admission_done', 'ielts', 'phagwara'),
+            ('F', None, 'negative', 'it', 'ludhiana'),
+        ]
+        for name, assigned, enquiry_status, trade, centre in enquiries:
+            Student_api.objects.create(
+                enquiry_taken_by=self.manager, assign_enquiry=assigned,
+                **self.enquiry_row(name, enquiry_status=enquiry_status, trade=trade, centre=centre)
+            )
+
+    def assertSameStats(self, stats, expected):
+        def normalized(data):
+            return {
+                key: sorted(map(sorted, (row.items() for row in value))) if isinstance(value, list) else value
+                for key, value in data.items()
+            }
+        self.assertEqual(normalized(stats), normalized(expected))
+
+    def test_matches_per_status_counts_for_a_counselor_and_for_everyone(self):
+        self.assertSameStats(
+            student_stats_for(self.counselor), per_status_counts(Student_api.objects.filter(assign_enquiry=self.counselor))
+        )
+        self.assertSameStats(student_stats_for(self.manager), per_status_counts(Student_api.objects.all()))
+        self.assertEqual(student_stats_for(self.manager)['total_students'], 6)
+
+    def test_enquiry_save_invalidates_the_cached_stats(self):
+        self.assertEqual(student_stats_for(self.counselor)['new_enquiries'], 1)
+        student = Student_api.objects.get(student_name='C')
+        student.enquiry_status = 'new'
+        with self.captureOnCommitCallbacks(execute=True):
+            student.save()
+        self.assertEqual(student_stats_for(self.counselor)['new_enquiries'], 2)
+        self.assertSameStats(
+            student_stats_for(self.counselor), per_status_counts(Student_api.objects.filter(assign_enquiry=self.counselor))
+        )
+
+
+class EnquiryFunnelTests(StaffDataMixin, TestCase):
+    def setUp(self):
+        self.staff_profile = self.create_staff()
+
+    def enquiry(self, name, **fields):
+        return Student_api.objects.create(enquiry_taken_by=self.staff_profile, **self.enquiry_row(name, **fields))
+
+    def rollup_rows(self):
+        return sorted(EnquiryFunnelDaily.objects.values_list(
+            'date', 'enquiry_source', 'trade', 'centre', 'counselor', 'counselor_key', 'status',
+            'entries', 'first_entries', 'days_since_enquiry_total'
+        ))
+
+    def test_unassigned_enquiries_share_one_rollup_row(self):
+        for name in ('First', 'Second'):
+            record_status_changes([(self.enquiry(name), '')])
+
+        row = EnquiryFunnelDaily.objects.get()
+        self.assertEqual((row.counselor_id, row.counselor_key, row.entries, row.first_entries), (None, 0, 2, 2))
+        # The unique key no longer has a NULL in it, so a second row for the key cannot be inserted
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            EnquiryFunnelDaily.objects.create(
+                date=row.date, enquiry_source=row.enquiry_source, trade=row.trade, centre=row.centre,
+                status=row.status, entries=1
+            )
+
+    def test_rebuild_keeps_transitions_in_the_buckets_they_were_counted_under(self):
+        student = self.enquiry('Mover', assign_enquiry=self.staff_profile)
+        record_status_changes([(student, '')])
+        student.enquiry_status = 'visited'
+        record_status_changes([(student, 'new')])
+        # Later edits to the enquiry's dimensions do not rewrite its history
+        Student_api.objects.filter(pk=student.pk).update(trade='civil', centre='mohali', enquiry_source='banner')
+
+        incremental = self.rollup_rows()
+        self.assertEqual({row[2] for row in incremental}, {'it'})
+        rebuild_funnel()
+        self.assertEqual(self.rollup_rows(), incremental)
+
+    def test_conversion_rate_counts_every_enquiry_entering_the_funnel(self):
+        walk_in = self.enquiry('Walk In')
+        record_status_changes([(walk_in, '')])
+        walk_in.enquiry_status = 'admission_done'
+        record_status_changes([(walk_in, 'new')])
+        # Imported straight into a later status, never 'new'
+        imported = [self.enquiry(f'Imported {n}', enquiry_status='admission_done') for n in range(2)]
+        imported.append(self.enquiry('Imported Visited', enquiry_status='visited'))
+        record_status_changes([(student, '') for student in imported])
+
+        [report] = funnel_report(EnquiryFunnelDaily.objects.all())
+        self.assertEqual(report['enquiries'], 4)
+        self.assertEqual(report['stages']['new'], 1)
+        self.assertEqual(report['stages']['admission_done'], 3)
+        self.assertEqual(report['conversion_rate'], 75.0)
+
+
+class StaffCounterTests(StaffDataMixin, TestCase):
+    def setUp(self):
+        self.counselor = self.create_staff()
+        self.other = self.create_staff(username='other')
+        self.client = APIClient()
+        self.client.force_authenticate(self.counselor.user)
+        self.today = timezone.localdate()
+
+    def create_enquiry(self, name):
+        row = self.enquiry_row(name, next_follow_up_date=self.today.isoformat())
+        response = self.client.post('/api/staff/students/create/', row, format='json')
+        self.assertEqual(response.status_code, 201, response.data)
+        return Student_api.objects.get(email=row['email'])
+
+    def update_enquiry(self, student, **fields):
+        response = self.client.put(f'/api/staff/students/{student.id}/update/', fields, format='json')
+        self.assertEqual(response.status_code, 200, response.data)
+
+    def register(self, name, course_type, course):
+        response = self.client.post('/api/staff/registrations/create/', {
+            'branch': 'ludhiana', 'joining_date': self.today.isoformat(), 'student_name': name,
+            'father_name': 'Father', 'date_of_birth': '2000-01-01', 'email': f'{name.lower()}@example.com',
+            'qualification': 'BCA', 'work_college': 'College', 'contact_address': 'Address',
+            'phone_no': '9999999999', 'course_type': course_type.id, 'course': course.id,
+            'duration_months': '3_months', 'duration_hours': 100, 'total_course_fee': '10000', 'paid_fee': '1000'
+        }, format='json')
+        self.assertEqual(response.status_code, 201, response.data)
+        return StudentRegistration.objects.get(email=f'{name.lower()}@example.com')
+
+    def pay(self, registration, amount):
+        url = f'/api/staff/registrations/add-payment/?registration_number={registration.registration_number}'
+        response = self.client.post(url, {'amount': amount, 'payment_mode': 'cash'}, format='json')
+        self.assertEqual(response.status_code, 201, response.data)
+
+    def recount(self, staff_profile):
+        """The dashboard figures counted straight from the source tables"""
+        payments = PaymentTransaction.objects.filter(
+            received_by=staff_profile, payment_date=self.today, entry_type='installment'
+        )
+        return {
+            'follow_ups_due_today': Student_api.objects.filter(
+                assign_enquiry=staff_profile, next_follow_up_date=self.today
+            ).exclude(enquiry_status__in=Student_api.CLOSED_STATUSES).count(),
+            'enquiries_created_today': Student_api.objects.filter(
+                enquiry_taken_by=staff_profile, enquiry_date=self.today
+            ).count(),
+            'registrations_created_today': StudentRegistration.objects.filter(
+                created_by=staff_profile, created_at__date=self.today
+            ).count(),
+            'payments_received_today': payments.count(),
+            'payments_amount_today': float(payments.aggregate(total=Sum('amount'))['total'] or 0),
+        }
+
+    def dashboard(self, staff_profile):
+        client = APIClient()
+        client.force_authenticate(staff_profile.user)
+        return client.get('/api/staff/dashboard/').data['quick_stats']
+
+    def counter_rows(self):
+        return sorted(
+            row for row in StaffDailyCounter.objects.values_list('staff', 'date', *COUNTER_FIELDS) if any(row[2:])
+        )
+
+    def test_counters_match_a_recount_after_edits_and_deletes(self):
+        moved, closed, reassigned, deleted = (
+            self.create_enquiry(name) for name in ('Moved', 'Closed', 'Reassigned', 'Deleted')
+        )
+        self.update_enquiry(moved, next_follow_up_date=(self.today + datetime.timedelta(days=1)).isoformat())
+        self.update_enquiry(closed, enquiry_status='negative')
+        self.update_enquiry(closed, enquiry_status='follow_up_required')
+        self.update_enquiry(closed, enquiry_status='dropped')
+        self.update_enquiry(reassigned, assign_enquiry=self.other.id)
+        Student_api.objects.get(pk=deleted.pk).delete()
+
+        course_type, course = self.create_course()
+        kept = self.register('Kept', course_type, course)
+        self.pay(kept, '500.00')
+        self.pay(kept, '250.00')
+        kept.record_ledger_entry(Decimal('-200.00'), self.counselor, entry_type='refund')
+        kept.payment_transactions.get(installment_number=3).delete()
+        self.register('Removed', course_type, course).delete()
+
+        counselor_stats = self.dashboard(self.counselor)
+        self.assertEqual(counselor_stats, self.recount(self.counselor))
+        self.assertEqual(counselor_stats, {
+            'follow_ups_due_today': 0,
+            'enquiries_created_today': 3,
+            'registrations_created_today': 1,
+            'payments_received_today': 2,
+            'payments_amount_today': 1500.0,
+        })
+        other_stats = self.dashboard(self.other)
+        self.assertEqual(other_stats, self.recount(self.other))
+        self.assertEqual(other_stats['follow_ups_due_today'], 1)
+
+        # The incrementally maintained rows equal a rebuild from the source tables
+        incremental = self.counter_rows()
+        rebuild_staff_counters(self.today)
+        self.assertEqual(incremental, self.counter_rows())
+
+    def test_reopening_an_enquiry_counts_its_follow_up_again(self):
+        student = self.create_enquiry('Reopened')
+        self.update_enquiry(student, enquiry_status='negative')
+        self.assertEqual(self.dashboard(self.counselor)['follow_ups_due_today'], 0)
+        self.update_enquiry(student, enquiry_status='follow_up_required')
+        self.assertEqual(self.dashboard(self.counselor)['follow_ups_due_today'], 1)
+        self.assertEqual(self.dashboard(self.counselor), self.recount(self.counselor))
+
+
+class ReferenceDataTests(StaffDataMixin, TestCase):
+    def setUp(self):
+        cache.clear()
+        app_cache.clear_local()
+        self.staff_profile = self.create_staff()
+        self.course_type, self.course = self.create_course()
+        self.client = APIClient()
+        self.client.force_authenticate(self.staff_profile.user)
+        self.courses_url = f'/api/staff/registrations/courses/{self.course_type.id}/'
+
+    def test_full_response_carries_a_strong_etag(self):
+        response = self.client.get(self.courses_url)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertRegex(response['ETag'], r'^"[0-9a-f]{32}"$')
+        self.assertEqual([course['id'] for course in response.json()], [self.course.id])
+        self.assertIn('private', response['Cache-Control'])
+        self.assertIn('Authorization', response['Vary'])
+
+    def test_matching_if_none_match_gets_304(self):
+        etag = self.client.get(self.courses_url)['ETag']
+
+        for header in (etag, f'W/{etag}', f'"stale", {etag}', '*'):
+            with self.subTest(if_none_match=header):
+                response = self.client.get(self.courses_url, HTTP_IF_NONE_MATCH=header)
+                self.assertEqual(response.status_code, 304)
+                self.assertEqual(response['ETag'], etag)
+                self.assertFalse(response.content)
+
+        self.assertEqual(self.client.get(self.courses_url, HTTP_IF_NONE_MATCH='"stale"').status_code, 200)
+
+    def test_course_save_changes_the_etag(self):
+        etag = self.client.get(self.courses_url)['ETag']
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.course.name = 'Full Stack Development'
+            self.course.save()
+
+        response = self.client.get(self.courses_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual(response.json()[0]['name'], 'Full Stack Development')
+
+    def test_staff_profile_save_changes_the_student_options_etag(self):
+        other = self.create_staff(username='other')
+        url = '/api/staff/students/options/'
+        etag = self.client.get(url)['ETag']
+
+        with self.captureOnCommitCallbacks(execute=True):
+            other.is_active = False
+            other.save()
+
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertNotIn(other.id, [staff['id'] for staff in response.json()['staff_options']])
@@ -15,12 +15,18 @@ urlpatterns = [
     
     # Staff Features (role-based)
     path('reports/', views.staff_reports, name='staff-reports'),
+    path('leaderboard/', views.staff_leaderboard, name='staff-leaderboard'),
+    path('reports/revenue/', views.revenue_report, name='revenue-report'),
     # Student Management
     path('students/create/', views.create_student, name='create-student'),
+    path('students/bulk-import/', views.bulk_import_students, name='bulk-import-students'),
     path('students/list/', views.list_students, name='list-students'),
     path('students/<int:student_id>/', views.get_student_detail, name='student-detail'),
     path('students/<int:student_id>/update/', views.update_student, name='update-student'),
     path('students/stats/', views.student_stats, name='student-stats'),
+    path('students/funnel/', views.enquiry_funnel_report, name='enquiry-funnel'),
+    path('students/time-to-conversion/', views.enquiry_time_to_conversion, name='enquiry-time-to-conversion'),
+    path('students/follow-ups/', views.follow_up_worklist, name='follow-up-worklist'),
     path('students/options/', views.get_student_options, name='student-options'),  # New endpoint
     # Student Registration
     path('registrations/options/', views.get_registration_options, name='registration-options'),
@@ -32,8 +38,13 @@ urlpatterns = [
     # Fee Management
     path('registrations/update-fee/', views.update_student_fee, name='update-fee'),
     path('registrations/add-payment/', views.add_payment_installment, name='add-payment'),
+    path('registrations/fee-adjustment/', views.add_fee_adjustment, name='fee-adjustment'),
     # path('registrations/<str:registration_number>/update-fee/', views.update_student_fee, name='update-fee'),
     path('registrations/fee-history/', views.get_fee_payment_history, name='fee-history'),
+    path('registrations/dues/', views.outstanding_dues, name='outstanding-dues'),
     # Certificate Management
     path('registrations/generate-certificate/', views.generate_certificate, name='generate-certificate'),
+    path('registrations/issue-certificates/', views.bulk_issue_certificates, name='bulk-issue-certificates'),
+    path('registrations/certificate-document/', views.download_certificate, name='download-certificate'),
+    path('certificates/verify/<str:certificate_number>/', views.verify_certificate_public, name='verify-certificate'),
 ]
\ No newline at end of file
@@ -0,0 +1,118 @@
+# staff_app/usernames.py
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+from .models import UsernameSequence
+
+# Room left after the base for a numeric suffix
+SUFFIX_DIGITS = 6
+SAVE_ATTEMPTS = 5
+
+
+def username_base(name, max_length=50):
+    """Base username for a student name, e.g. 'Aman Preet' -> 'amanpreet'"""
+    return name.lower().replace(' ', '')[:max_length - SUFFIX_DIGITS]
+
+
+def _format_username(base, suffix):
+    return base if suffix == 0 else f"{base}{suffix}"
+
+
+def _highest_suffixes(model, bases):
+    """
+    Highest suffix already taken in the model's table for each base
+    Only runs the first time a base is seen, to seed its counter row
+    """
+    highest = {base: -1 for base in bases}
+    query = Q()
+    for base in bases:
+        query |= Q(username__startswith=base)
+
+    for username in model.objects.filter(query).values_list('username', flat=True).iterator():
+        # 'amankaur12' can belong to 'amankaur' (12), 'amankaur1' (2) or 'amankaur12' (bare)
+        split = len(username)
+        while True:
+            stem, digits = username[:split], username[split:]
+            if stem in highest:
+                suffix = int(digits) if digits else 0
+                highest[stem] = max(highest[stem], suffix)
+            if split == 0 or not username[split - 1].isdigit():
+                break
+            split -= 1
+    return highest
+
+
+def _create_missing_sequences(model, scope, bases):
+    """
+    Insert counter rows for bases seen for the first time, in their own short transaction
+    Locking a row that does not exist yet takes a gap lock on MySQL, and two requests
+    inserting into the same gap deadlock, so rows are created before any are locked
+    """
+    existing = set(UsernameSequence.objects.filter(scope=scope, base__in=bases).values_list('base', flat=True))
+    missing = sorted(bases - existing)
+    if not missing:
+        return
+    highest = _highest_suffixes(model, missing)
+    with transaction.atomic():
+        UsernameSequence.objects.bulk_create([
+            UsernameSequence(scope=scope, base=base, last_suffix=highest[base])
+            for base in missing
+        ], ignore_conflicts=True)
+
+
+def _lock_sequences(scope, bases):
+    sequences = UsernameSequence.objects.select_for_update().filter(
+        scope=scope, base__in=bases
+    ).order_by('base')
+    return {sequence.base: sequence for sequence in sequences}
+
+
+def allocate_usernames(model, names):
+    """
+    Reserve one username per name with a constant number of queries
+    Each base keeps a counter row, so the cost does not grow with the
+    number of students sharing a name
+    """
+    scope = model._meta.db_table
+    bases = [username_base(name) for name in names]
+    unique_bases = set(bases)
+
+    _create_missing_sequences(model, scope, unique_bases)
+    with transaction.atomic():
+        # Every row exists now, so only those rows are locked
+        sequences = _lock_sequences(scope, unique_bases)
+
+        usernames = []
+        for base in bases:
+            sequence = sequences[base]
+            sequence.last_suffix += 1
+            usernames.append(_format_username(base, sequence.last_suffix))
+
+        UsernameSequence.objects.bulk_update(sequences.values(), ['last_suffix'])
+
+    return usernames
+
+
+def allocate_username(model, name):
+    return allocate_usernames(model, [name])[0]
+
+
+def save_with_username(instance, save, *args, **kwargs):
+    """
+    Call save(), allocating instance.username first if it is empty
+    Retries with a fresh username when the insert hits a username that
+    was taken outside the counters (e.g. set by hand)
+    """
+    if instance.username:
+        return save(*args, **kwargs)
+
+    model = type(instance)
+    for attempt in range(SAVE_ATTEMPTS):
+        instance.username = allocate_username(model, instance.student_name)
+        try:
+            with transaction.atomic():
+                return save(*args, **kwargs)
+        except IntegrityError:
+            taken = model.objects.filter(username=instance.username).exists()
+            if not taken or attempt == SAVE_ATTEMPTS - 1:
+                instance.username = ''
+                raise
@@ -1,15 +1,35 @@
 # staff_app/views.py
+import datetime
+from decimal import Decimal
 from rest_framework import status
-from django.db.models import Count
-from rest_framework.decorators import api_view, permission_classes
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.core.paginator import Paginator
+from django.db import IntegrityError
+from django.db.models import (
+    Case, CharField, Count, DecimalField, ExpressionWrapper, F, OuterRef, Q, Subquery, Sum, Value, When, Window
+)
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+from rest_framework.decorators import api_view, authentication_classes, permission_classes, throttle_classes
 from rest_framework.response import Response
 from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework_simplejwt.tokens import RefreshToken
 from django.contrib.auth.models import User
+from techcadd_apis.db_router import replica_reads
 from .models import StaffProfile
 from .serializers import *
 from .models import Student_api
 from .serializers import StudentSerializer, CreateStudentSerializer, StudentListSerializer, UpdateStudentSerializer
+from .enquiry_import import import_enquiries, read_enquiry_rows
+from .idempotency import idempotent
+from . import enquiry_funnel, reference_data, revenue
+from .reference_data import reference_response
+from .enquiry_stats import student_stats_for
+from .counters import LEADERBOARD_METRICS, leaderboard, leaderboard_window, staff_counters_for
+from .certificates import (
+    CertificateVerifyThrottle, certificate_document_response, forget_verifications, issue_certificates,
+    verify_certificate
+)
 
 # Helper functions
 def is_staff_user(user):
@@ -26,6 +46,40 @@ def get_staff_profile(user):
     except StaffProfile.DoesNotExist:
         return None
 
+def parse_date_range(request, default_days=30):
+    """start_date/end_date query params, defaulting to the last default_days days"""
+    today = timezone.now().date()
+    try:
+        end_date = datetime.date.fromisoformat(request.GET.get('end_date') or today.isoformat())
+        start_date = datetime.date.fromisoformat(
+            request.GET.get('start_date') or (end_date - datetime.timedelta(days=default_days - 1)).isoformat()
+        )
+    except ValueError:
+        raise ValueError('Dates must be in YYYY-MM-DD format')
+    if start_date > end_date:
+        raise ValueError('start_date must not be after end_date')
+    return start_date, end_date
+
+def paginate(request, queryset, default_page_size=25, max_page_size=100, count=None):
+    """
+    Return the requested page of a queryset and its pagination details
+    Pass count when it is already known to skip the COUNT query
+    """
+    try:
+        page_size = min(int(request.GET.get('page_size', default_page_size)), max_page_size)
+    except ValueError:
+        page_size = default_page_size
+    paginator = Paginator(queryset, max(page_size, 1))
+    if count is not None:
+        paginator.count = count
+    page = paginator.get_page(request.GET.get('page'))
+    return page.object_list, {
+        'count': paginator.count,
+        'page': page.number,
+        'page_size': paginator.per_page,
+        'total_pages': paginator.num_pages,
+    }
+
 @api_view(['POST'])
 @permission_classes([AllowAny])
 def staff_login(request):
@@ -121,14 +175,21 @@ def staff_dashboard(request):
             'error': 'Access denied. Staff privileges required.'
         }, status=status.HTTP_403_FORBIDDEN)
     
+    # Single lookup on the (staff, date) counter row
+    today = timezone.now().date()
+    counters = staff_counters_for(staff_profile, today)
+    
     dashboard_data = {
         'welcome_message': f'Welcome, {request.user.first_name or request.user.username}!',
         'role': staff_profile.role,
         'department': staff_profile.department,
+        'date': today,
         'quick_stats': {
-            'pending_tasks': 5,
-            'completed_today': 12,
-            'messages': 3,
+            'follow_ups_due_today': counters['follow_ups_due'],
+            'enquiries_created_today': counters['enquiries_created'],
+            'registrations_created_today': counters['registrations_created'],
+            'payments_received_today': counters['payments_received'],
+            'payments_amount_today': float(counters['payments_amount']),
         }
     }
     
@@ -136,6 +197,44 @@ def staff_dashboard(request):
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
+def staff_leaderboard(request):
+    """
+    Staff ranked by conversions, registrations or collections
+    Query params: window=day|week|month (default week), metric=conversions|registrations|collections
+    """
+    staff_profile = get_staff_profile(request.user)
+    
+    if not staff_profile:
+        return Response({
+            'error': 'Access denied. Staff privileges required.'
+        }, status=status.HTTP_403_FORBIDDEN)
+    
+    window = request.GET.get('window', 'week')
+    metric = request.GET.get('metric', 'conversions')
+    if window not in ('day', 'week', 'month'):
+        return Response({
+            'error': 'Invalid window. Choose from: day, week, month'
+        }, status=status.HTTP_400_BAD_REQUEST)
+    if metric not in LEADERBOARD_METRICS:
+        return Response({
+            'error': f"Invalid metric. Choose from: {', '.join(LEADERBOARD_METRICS)}"
+        }, status=status.HTTP_400_BAD_REQUEST)
+    
+    today = timezone.now().date()
+    ranking = leaderboard(window, metric, today)
+    
+    return Response({
+        'window': window,
+        'metric': metric,
+        'start_date': leaderboard_window(window, today),
+        'end_date': today,
+        'my_rank': next((row['rank'] for row in ranking if row['staff_id'] == staff_profile.id), None),
+        'leaderboard': ranking
+    })
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+@replica_reads
 def staff_reports(request):
     """Staff reports - role-based access"""
     staff_profile = get_staff_profile(request.user)
@@ -151,15 +250,84 @@ def staff_reports(request):
             'error': 'Access denied. Manager or Sales privileges required to view reports.'
         }, status=status.HTTP_403_FORBIDDEN)
     
+    today = timezone.now().date()
+    # Net cash: installments less refunds (concessions are not sales)
+    daily_sales = DailyRevenueRollup.objects.filter(date=today).aggregate(
+        total=Sum('net_amount')
+    )['total'] or 0
+    
     reports_data = {
-        'daily_sales': 1500,
-        'new_customers': 23,
-        'pending_orders': 7,
+        'daily_sales': float(daily_sales),
+        'new_customers': StudentRegistration.objects.filter(created_at__date=today).count(),
+        'pending_orders': StudentRegistration.objects.filter(fee_balance__gt=0).count(),
         'available_for_role': staff_profile.role,
     }
     
     return Response(reports_data)
 
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+@replica_reads
+def revenue_report(request):
+    """
+    Collections per day, week or month broken down by one dimension
+    Query params: period=day|week|month, group_by=branch|course_type|payment_mode|received_by,
+    start_date, end_date (YYYY-MM-DD, default last 30 days), branch
+    """
+    staff_profile = get_staff_profile(request.user)
+    
+    if not staff_profile:
+        return Response({
+            'error': 'Access denied. Staff privileges required.'
+        }, status=status.HTTP_403_FORBIDDEN)
+    
+    if staff_profile.role != 'manager':
+        return Response({
+            'error': 'Access denied. Manager privileges required to view revenue.'
+        }, status=status.HTTP_403_FORBIDDEN)
+    
+    period = request.GET.get('period', 'day')
+    group_by = request.GET.get('group_by', 'branch')
+    if period not in revenue.PERIODS:
+        return Response({
+            'error': f"Invalid period. Choose from: {', '.join(revenue.PERIODS)}"
+        }, status=status.HTTP_400_BAD_REQUEST)
+    if group_by not in revenue.DIMENSIONS:
+        return Response({
+            'error': f"Invalid group_by. Choose from: {', '.join(revenue.DIMENSIONS)}"
+        }, status=status.HTTP_400_BAD_REQUEST)
+    
+    try:
+        start_date, end_date = parse_date_range(request)
+    except ValueError as e:
+        return Response({
+            'error': str(e)
+        }, status=status.HTTP_400_BAD_REQUEST)
+    
+    rows, totals = revenue.revenue_report(
+        start_date,
+        end_date,
+        period=period,
+        group_by=group_by,
+        branch=request.GET.get('branch')
+    )
+    
+    return Response({
+        'period': period,
+        'group_by': group_by,
+        'start_date': start_date,
+        'end_date': end_date,
+        'totals': {
+            field: float(value) if isinstance(value, Decimal) else value or 0
+            for field, value in totals.items()
+        },
+        'rows': [
+            {field: float(value) if isinstance(value, Decimal) else value for field, value in row.items()}
+            for row in rows
+        ]
+    })
+
 @api_view(['POST'])
 @permission_classes([AllowAny])
 def staff_token_refresh(request):
@@ -242,8 +410,48 @@ def create_student(request):
         'details': serializer.errors
     }, status=status.HTTP_400_BAD_REQUEST)
 
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def bulk_import_students(request):
+    """
+    Staff imports enquiries in bulk
+    Accepts a CSV/JSON upload in 'file' or a JSON body {"students": [...]}
+    """
+    staff_profile = get_staff_profile(request.user)
+    
+    if not staff_profile:
+        return Response({
+            'error': 'Access denied. Staff privileges required.'
+        }, status=status.HTTP_403_FORBIDDEN)
+    
+    upload = request.FILES.get('file')
+    try:
+        if upload:
+            rows = read_enquiry_rows(upload, upload.name)
+        elif isinstance(request.data, list):
+            rows = request.data
+        else:
+            rows = request.data.get('students')
+    except (ValueError, UnicodeDecodeError) as e:
+        return Response({
+            'error': f'Could not read import file: {str(e)}'
+        }, status=status.HTTP_400_BAD_REQUEST)
+    
+    if not isinstance(rows, list) or not rows:
+        return Response({
+            'error': 'Provide a CSV/JSON file or a non-empty students list'
+        }, status=status.HTTP_400_BAD_REQUEST)
+    
+    report = import_enquiries(rows, staff_profile)
+    
+    return Response({
+        'message': f"Imported {report['created']} of {report['total_rows']} enquiries",
+        **report
+    }, status=status.HTTP_201_CREATED if report['created'] else status.HTTP_400_BAD_REQUEST)
+
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
+@replica_reads
 def list_students(request):
     """Staff views all students (with filtering options)"""
     staff_profile = get_staff_profile(request.user)
@@ -327,7 +535,12 @@ def update_student(request, student_id):
                 'error': 'Access denied. You can only update your assigned students.'
             }, status=status.HTTP_403_FORBIDDEN)
         
-        serializer = UpdateStudentSerializer(student, data=request.data, partial=True)
+        serializer = UpdateStudentSerializer(
+            student,
+            data=request.data,
+            partial=True,
+            context={'staff_profile': staff_profile}
+        )
         
         if serializer.is_valid():
             serializer.save()
@@ -353,6 +566,7 @@ def update_student(request, student_id):
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
+@replica_reads
 def student_stats(request):
     """Get student statistics for dashboard"""
     staff_profile = get_staff_profile(request.user)
@@ -362,32 +576,158 @@ def student_stats(request):
             'error': 'Access denied. Staff privileges required.'
         }, status=status.HTTP_403_FORBIDDEN)
     
-    # Base queryset
+    # Cached per scope, recomputed from a single grouped query
+    return Response(student_stats_for(staff_profile))
+
+def funnel_scope(request, staff_profile):
+    """
+    Rollup rows the caller may see and the group_by to report on
+    Counselors see their own enquiries; managers everything, or one counselor via staff_id
+    """
+    group_by = request.GET.get('group_by') or None
+    if group_by and group_by not in enquiry_funnel.DIMENSIONS:
+        raise ValueError(f"Invalid group_by. Choose from: {', '.join(enquiry_funnel.DIMENSIONS)}")
+    start_date, end_date = parse_date_range(request)
+    
+    counselor = staff_profile
     if staff_profile.role == 'manager':
-        students = Student_api.objects.all()
-    else:
-        students = Student_api.objects.filter(assign_enquiry=staff_profile)
+        counselor = request.GET.get('staff_id') or None
+    rollups = enquiry_funnel.funnel_rollups(
+        start_date,
+        end_date,
+        counselor=counselor,
+        enquiry_source=request.GET.get('enquiry_source'),
+        trade=request.GET.get('trade'),
+        centre=request.GET.get('centre')
+    )
+    return rollups, group_by, start_date, end_date
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+@replica_reads
+def enquiry_funnel_report(request):
+    """
+    Enquiries entering each status over a date range, from the daily funnel rollup
+    Query params: start_date, end_date, group_by=enquiry_source|trade|centre|counselor,
+    enquiry_source, trade, centre, staff_id (managers)
+    """
+    staff_profile = get_staff_profile(request.user)
+    
+    if not staff_profile:
+        return Response({
+            'error': 'Access denied. Staff privileges required.'
+        }, status=status.HTTP_403_FORBIDDEN)
+    
+    try:
+        rollups, group_by, start_date, end_date = funnel_scope(request, staff_profile)
+    except ValueError as e:
+        return Response({
+            'error': str(e)
+        }, status=status.HTTP_400_BAD_REQUEST)
+    
+    return Response({
+        'start_date': start_date,
+        'end_date': end_date,
+        'group_by': group_by,
+        'stages': [choice for choice, label in Student_api.ENQUIRY_STATUS],
+        'funnel': enquiry_funnel.funnel_report(rollups, group_by)
+    })
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+@replica_reads
+def enquiry_time_to_conversion(request):
+    """
+    Average days from enquiry to a status (admission_done by default), from the daily funnel rollup
+    Query params: as for the funnel, plus status
+    """
+    staff_profile = get_staff_profile(request.user)
+    
+    if not staff_profile:
+        return Response({
+            'error': 'Access denied. Staff privileges required.'
+        }, status=status.HTTP_403_FORBIDDEN)
+    
+    target_status = request.GET.get('status', enquiry_funnel.CONVERSION_STATUS)
+    if target_status not in dict(Student_api.ENQUIRY_STATUS):
+        return Response({
+            'error': 'Invalid status'
+        }, status=status.HTTP_400_BAD_REQUEST)
+    try:
+        rollups, group_by, start_date, end_date = funnel_scope(request, staff_profile)
+    except ValueError as e:
+        return Response({
+            'error': str(e)
+        }, status=status.HTTP_400_BAD_REQUEST)
+    
+    return Response({
+        'start_date': start_date,
+        'end_date': end_date,
+        'group_by': group_by,
+        'status': target_status,
+        'results': enquiry_funnel.time_to_status_report(rollups, target_status, group_by)
+    })
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def follow_up_worklist(request):
+    """Open enquiries with a follow-up that is overdue, due today or due this week"""
+    staff_profile = get_staff_profile(request.user)
+    
+    if not staff_profile:
+        return Response({
+            'error': 'Access denied. Staff privileges required.'
+        }, status=status.HTTP_403_FORBIDDEN)
+    
+    # Managers can open another counselor's worklist
+    counselor = staff_profile
+    staff_id = request.GET.get('staff_id')
+    if staff_id and staff_profile.role == 'manager':
+        try:
+            counselor = StaffProfile.objects.get(id=staff_id)
+        except (StaffProfile.DoesNotExist, ValueError):
+            return Response({
+                'error': 'Staff member not found'
+            }, status=status.HTTP_404_NOT_FOUND)
     
-    total_students = students.count()
-    new_enquiries = students.filter(enquiry_status='new').count()
-    converted_students = students.filter(enquiry_status='admission_done').count()
+    today = timezone.now().date()
+    week_end = today + datetime.timedelta(days=6)
+    buckets = {
+        'overdue': Q(next_follow_up_date__lt=today),
+        'today': Q(next_follow_up_date=today),
+        'this_week': Q(next_follow_up_date__gt=today, next_follow_up_date__lte=week_end),
+    }
+    bucket = request.GET.get('bucket')
+    if bucket and bucket not in buckets:
+        return Response({
+            'error': f"Invalid bucket. Choose from: {', '.join(buckets)}"
+        }, status=status.HTTP_400_BAD_REQUEST)
     
-    # Trade-wise distribution
-    trade_stats = students.values('trade').annotate(count=Count('id'))
+    # Leading columns of students_follow_up_idx: a single range scan per counselor
+    follow_ups = Student_api.objects.filter(
+        assign_enquiry=counselor,
+        next_follow_up_date__lte=week_end,
+    ).exclude(
+        enquiry_status__in=Student_api.CLOSED_STATUSES
+    )
     
-    # Status-wise distribution
-    status_stats = students.values('enquiry_status').annotate(count=Count('id'))
+    summary = follow_ups.aggregate(**{
+        name: Count('id', filter=condition) for name, condition in buckets.items()
+    })
+    
+    if bucket:
+        follow_ups = follow_ups.filter(buckets[bucket])
+    follow_ups = follow_ups.select_related('enquiry_taken_by__user').order_by('next_follow_up_date', 'id')
     
-    # Centre-wise distribution
-    centre_stats = students.values('centre').annotate(count=Count('id'))
+    page, pagination = paginate(request, follow_ups)
+    serializer = StudentListSerializer(page, many=True)
     
     return Response({
-        'total_students': total_students,
-        'new_enquiries': new_enquiries,
-        'converted_students': converted_students,
-        'trade_distribution': list(trade_stats),
-        'status_distribution': list(status_stats),
-        'centre_distribution': list(centre_stats)
+        'counselor_id': counselor.id,
+        'date': today,
+        'summary': summary,
+        'pagination': pagination,
+        'students': serializer.data
     })
 
 
@@ -404,17 +744,7 @@ def get_student_options(request):
             'error': 'Access denied. Staff privileges required.'
         }, status=status.HTTP_403_FORBIDDEN)
     
-    # Get all staff for assign enquiry dropdown
-    staff_members = StaffProfile.objects.filter(is_active=True).select_related('user')
-    staff_options = [{'id': staff.id, 'name': staff.user.get_full_name() or staff.user.username} for staff in staff_members]
-    
-    return Response({
-        'centre_choices': Student_api.CENTRE_CHOICES,
-        'trade_choices': Student_api.TRADE_CHOICES,
-        'enquiry_source_choices': Student_api.ENQUIRY_SOURCE_CHOICES,
-        'enquiry_status_choices': Student_api.ENQUIRY_STATUS,
-        'staff_options': staff_options
-    })
+    return reference_response(request, reference_data.student_options())
 
 # --------------------registration Views start from here --------------------
 # staff_app/views.py - Add these views
@@ -430,21 +760,7 @@ def get_registration_options(request):
             'error': 'Access denied. Staff privileges required.'
         }, status=status.HTTP_403_FORBIDDEN)
     
-    course_types = CourseType.objects.filter(is_active=True)
-    course_types_serializer = CourseTypeSerializer(course_types, many=True)
-    
-    duration_choices = []
-    for choice in Course.DURATION_CHOICES:
-        duration_choices.append({
-            'value': choice[0],
-            'label': choice[1]
-        })
-    
-    return Response({
-        'course_types': course_types_serializer.data,
-        'duration_choices': duration_choices,
-        'branch_choices': StudentRegistration.CENTRE_CHOICES
-    })
+    return reference_response(request, reference_data.registration_options())
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
@@ -457,12 +773,7 @@ def get_courses_by_type(request, course_type_id):
             'error': 'Access denied. Staff privileges required.'
         }, status=status.HTTP_403_FORBIDDEN)
     
-    try:
-        courses = Course.objects.filter(course_type_id=course_type_id, is_active=True)
-        serializer = CourseSerializer(courses, many=True)
-        return Response(serializer.data)
-    except Course.DoesNotExist:
-        return Response([])
+    return reference_response(request, reference_data.courses_by_type(course_type_id))
 
 # @api_view(['POST'])
 # @permission_classes([IsAuthenticated])
@@ -507,6 +818,7 @@ def get_courses_by_type(request, course_type_id):
 #     }, status=status.HTTP_400_BAD_REQUEST)
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
+@idempotent
 def create_student_registration(request):
     """Create new student registration"""
     staff_profile = get_staff_profile(request.user)
@@ -537,7 +849,9 @@ def create_student_registration(request):
                 }
             }, status=status.HTTP_201_CREATED)
             
-        except Exception as e:
+        except (IntegrityError, DjangoValidationError) as e:
+            # e.g. the email was taken after validation; other database errors (deadlocks,
+            # lost connections) are left to surface as a 500 so the client can retry them
             return Response({
                 'error': f'Failed to create registration: {str(e)}'
             }, status=status.HTTP_400_BAD_REQUEST)
@@ -549,6 +863,7 @@ def create_student_registration(request):
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
+@replica_reads
 def list_student_registrations(request):
     """List all student registrations"""
     staff_profile = get_staff_profile(request.user)
@@ -579,6 +894,100 @@ def list_student_registrations(request):
         'registrations': serializer.data
     })
 
+DUE_SORT_FIELDS = {
+    'amount': ('fee_balance', 'id'),
+    '-amount': ('-fee_balance', 'id'),
+    'last_payment': ('last_payment_date', 'id'),
+    '-last_payment': ('-last_payment_date', 'id'),
+}
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+@replica_reads
+def outstanding_dues(request):
+    """
+    Registrations with a fee balance, aged by days since the last installment
+    (since joining when nothing has been paid)
+    Query params: branch, bucket=0_30|31_60|61_90|90_plus, sort=-amount|amount|last_payment|-last_payment
+    """
+    staff_profile = get_staff_profile(request.user)
+    
+    if not staff_profile:
+        return Response({
+            'error': 'Access denied. Staff privileges required.'
+        }, status=status.HTTP_403_FORBIDDEN)
+    
+    today = timezone.now().date()
+    buckets = {
+        '0_30': Q(last_payment_date__gte=today - datetime.timedelta(days=30)),
+        '31_60': Q(last_payment_date__lt=today - datetime.timedelta(days=30),
+                   last_payment_date__gte=today - datetime.timedelta(days=60)),
+        '61_90': Q(last_payment_date__lt=today - datetime.timedelta(days=60),
+                   last_payment_date__gte=today - datetime.timedelta(days=90)),
+        '90_plus': Q(last_payment_date__lt=today - datetime.timedelta(days=90)),
+    }
+    bucket = request.GET.get('bucket')
+    if bucket and bucket not in buckets:
+        return Response({
+            'error': f"Invalid bucket. Choose from: {', '.join(buckets)}"
+        }, status=status.HTTP_400_BAD_REQUEST)
+    sort = request.GET.get('sort', '-amount')
+    if sort not in DUE_SORT_FIELDS:
+        return Response({
+            'error': f"Invalid sort. Choose from: {', '.join(DUE_SORT_FIELDS)}"
+        }, status=status.HTTP_400_BAD_REQUEST)
+    
+    last_payment = PaymentTransaction.objects.filter(
+        student_registration=OuterRef('pk'),
+        entry_type='installment'
+    ).order_by('-payment_date').values('payment_date')[:1]
+    
+    # Leading columns of registration_dues_idx
+    dues = StudentRegistration.objects.filter(fee_balance__gt=0)
+    branch = request.GET.get('branch')
+    if branch:
+        dues = dues.filter(branch=branch)
+    dues = dues.annotate(
+        last_payment_date=Coalesce(Subquery(last_payment), F('joining_date'))
+    ).annotate(
+        aging_bucket=Case(
+            *[When(condition, then=Value(name)) for name, condition in buckets.items()],
+            output_field=CharField()
+        )
+    )
+    
+    # Per-bucket counts and amounts in one aggregate
+    totals = {}
+    for name, condition in buckets.items():
+        totals[f'{name}_count'] = Count('id', filter=condition)
+        totals[f'{name}_amount'] = Sum('fee_balance', filter=condition)
+    totals = dues.aggregate(**totals)
+    summary = {
+        name: {
+            'count': totals[f'{name}_count'],
+            'amount': float(totals[f'{name}_amount'] or 0)
+        }
+        for name in buckets
+    }
+    
+    if bucket:
+        dues = dues.filter(buckets[bucket])
+        count = summary[bucket]['count']
+    else:
+        count = sum(item['count'] for item in summary.values())
+    dues = dues.select_related('course').order_by(*DUE_SORT_FIELDS[sort])
+    
+    page, pagination = paginate(request, dues, count=count)
+    serializer = DueRegistrationSerializer(page, many=True)
+    
+    return Response({
+        'date': today,
+        'total_outstanding': float(sum(item['amount'] for item in summary.values())),
+        'summary': summary,
+        'pagination': pagination,
+        'registrations': serializer.data
+    })
+
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def get_registration_detail(request, registration_id):
@@ -601,6 +1010,7 @@ def get_registration_detail(request, registration_id):
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
+@replica_reads
 def search_student_registrations(request):
     """Search student registrations - SECURE (no password)"""
     staff_profile = get_staff_profile(request.user)
@@ -670,7 +1080,12 @@ def update_student_fee(request):
     
     try:
         registration = StudentRegistration.objects.get(registration_number=registration_number)
-        serializer = UpdateFeeSerializer(registration, data=request.data, partial=True)
+        serializer = UpdateFeeSerializer(
+            registration,
+            data=request.data,
+            partial=True,
+            context={'staff_profile': staff_profile}
+        )
         
         if serializer.is_valid():
             serializer.save()
@@ -691,6 +1106,12 @@ def update_student_fee(request):
         return Response({
             'error': 'Registration not found'
         }, status=status.HTTP_404_NOT_FOUND)
+    except DjangoValidationError as e:
+        # Raised by record_ledger_entry when paid_fee would leave 0..total_course_fee
+        return Response({
+            'error': 'Validation failed',
+            'details': e.message_dict
+        }, status=status.HTTP_400_BAD_REQUEST)
 
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
@@ -728,6 +1149,7 @@ def generate_certificate(request):
         registration.certificate_issue_date = timezone.now().date()
         registration.generate_certificate_number()
         registration.save()
+        forget_verifications([registration.certificate_number])
         
         response_serializer = StudentRegistrationSerializer(registration)
         
@@ -743,8 +1165,104 @@ def generate_certificate(request):
             'error': 'Registration not found'
         }, status=status.HTTP_404_NOT_FOUND)
 
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def bulk_issue_certificates(request):
+    """
+    Issue certificates to every eligible registration in one request
+    Expected data (all optional):
+    {
+        "branch": "ludhiana",
+        "course": 3,
+        "course_type": 1,
+        "dry_run": true
+    }
+    """
+    staff_profile = get_staff_profile(request.user)
+    
+    if not staff_profile:
+        return Response({
+            'error': 'Access denied. Staff privileges required.'
+        }, status=status.HTTP_403_FORBIDDEN)
+    
+    if staff_profile.role != 'manager':
+        return Response({
+            'error': 'Access denied. Manager privileges required to issue certificates in bulk.'
+        }, status=status.HTTP_403_FORBIDDEN)
+    
+    branch = request.data.get('branch')
+    if branch and branch not in dict(StudentRegistration.CENTRE_CHOICES):
+        return Response({
+            'error': 'Invalid branch'
+        }, status=status.HTTP_400_BAD_REQUEST)
+    try:
+        course_id = int(request.data['course']) if request.data.get('course') else None
+        course_type_id = int(request.data['course_type']) if request.data.get('course_type') else None
+    except (TypeError, ValueError):
+        return Response({
+            'error': 'course and course_type must be ids'
+        }, status=status.HTTP_400_BAD_REQUEST)
+    dry_run = str(request.data.get('dry_run', '')).lower() in ('1', 'true', 'yes')
+    
+    summary = issue_certificates(
+        branch=branch,
+        course_id=course_id,
+        course_type_id=course_type_id,
+        dry_run=dry_run
+    )
+    
+    return Response({
+        'message': f"{'Would issue' if dry_run else 'Issued'} {summary['issued']} certificates",
+        **summary
+    })
+
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
+def download_certificate(request):
+    """Download the rendered certificate document (202 while it is being rendered)"""
+    registration_number = request.GET.get('registration_number')
+    if not registration_number:
+        return Response({'error': 'registration_number parameter is required'}, status=400)
+    staff_profile = get_staff_profile(request.user)
+    
+    if not staff_profile:
+        return Response({
+            'error': 'Access denied. Staff privileges required.'
+        }, status=status.HTTP_403_FORBIDDEN)
+    
+    try:
+        registration = StudentRegistration.objects.select_related('course', 'course_type').get(
+            registration_number=registration_number
+        )
+    except StudentRegistration.DoesNotExist:
+        return Response({
+            'error': 'Registration not found'
+        }, status=status.HTTP_404_NOT_FOUND)
+    
+    return certificate_document_response(registration)
+
+@api_view(['GET'])
+@authentication_classes([])
+@permission_classes([AllowAny])
+@throttle_classes([CertificateVerifyThrottle])
+def verify_certificate_public(request, certificate_number):
+    """Public certificate verification for employers, returns only what is printed on the certificate"""
+    details = verify_certificate(certificate_number)
+    
+    if details is None:
+        return Response({
+            'valid': False,
+            'error': 'No certificate found with this number'
+        }, status=status.HTTP_404_NOT_FOUND)
+    
+    return Response({
+        'valid': True,
+        'certificate': details
+    })
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+@replica_reads
 def get_fee_payment_history(request):
     """Get fee payment history (you can expand this with a Payment model later)"""
     registration_number = request.GET.get('registration_number')
@@ -760,17 +1278,42 @@ def get_fee_payment_history(request):
     try:
         registration = StudentRegistration.objects.get(registration_number=registration_number)
         
-        # Get all payment transactions
         payment_transactions = PaymentTransaction.objects.filter(
             student_registration=registration
-        ).order_by('installment_number')
-        
-        payment_serializer = PaymentTransactionSerializer(payment_transactions, many=True)
+        )
         
-        # Calculate summary
-        total_paid = sum([t.amount for t in payment_transactions])
+        # Summary straight from the ledger in one aggregate query
+        totals = payment_transactions.aggregate(
+            total_paid=Sum('amount'),
+            total_entries=Count('id'),
+            total_installments=Count('id', filter=Q(entry_type='installment')),
+            total_adjusted=Sum('amount', filter=Q(entry_type='adjustment')),
+            total_refunded=Sum('amount', filter=Q(entry_type='refund')),
+            total_corrected=Sum('amount', filter=Q(entry_type='correction'))
+        )
+        total_paid = totals['total_paid'] or Decimal('0')
         payment_percentage = (total_paid / registration.total_course_fee) * 100 if registration.total_course_fee > 0 else 0
         
+        # Running totals are computed by the database over the whole ledger, then paginated
+        ledger_order = [F('created_at').asc(), F('id').asc()]
+        ledger = payment_transactions.select_related('received_by__user').annotate(
+            running_paid=Window(Sum('amount'), order_by=ledger_order)
+        ).annotate(
+            running_balance=ExpressionWrapper(
+                Value(registration.total_course_fee) - F('running_paid'),
+                output_field=DecimalField(max_digits=12, decimal_places=2)
+            )
+        ).order_by(*ledger_order)
+        
+        page, pagination = paginate(
+            request,
+            ledger,
+            default_page_size=50,
+            max_page_size=200,
+            count=totals['total_entries']
+        )
+        payment_serializer = FeeLedgerEntrySerializer(page, many=True)
+        
         return Response({
             'registration_number': registration.registration_number,
             'student_name': registration.student_name,
@@ -778,8 +1321,12 @@ def get_fee_payment_history(request):
             'total_paid_fee': float(total_paid),
             'fee_balance': float(registration.total_course_fee - total_paid),
             'payment_percentage': round(payment_percentage, 2),
-            'total_installments': payment_transactions.count(),
+            'total_installments': totals['total_installments'],
+            'total_adjusted': float(totals['total_adjusted'] or 0),
+            'total_refunded': float(-(totals['total_refunded'] or 0)),
+            'total_corrected': float(totals['total_corrected'] or 0),
             'payment_status': 'fully_paid' if total_paid >= registration.total_course_fee else 'partially_paid',
+            'pagination': pagination,
             'payment_history': payment_serializer.data
         })
         
@@ -791,6 +1338,7 @@ def get_fee_payment_history(request):
         # new api for add payments 
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
+@idempotent
 def add_payment_installment(request):
     registration_number = request.GET.get('registration_number')
     
@@ -834,4 +1382,69 @@ def add_payment_installment(request):
     except StudentRegistration.DoesNotExist:
         return Response({
             'error': 'Registration not found'
-        }, status=status.HTTP_404_NOT_FOUND)
\ No newline at end of file
+        }, status=status.HTTP_404_NOT_FOUND)
+    except DjangoValidationError as e:
+        # Raised by record_ledger_entry when paid_fee would leave 0..total_course_fee
+        return Response({
+            'error': 'Validation failed',
+            'details': e.message_dict
+        }, status=status.HTTP_400_BAD_REQUEST)
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+@idempotent
+def add_fee_adjustment(request):
+    """
+    Record a concession/correction (adjustment) or a refund in the fee ledger
+    Expected data:
+    {
+        "entry_type": "adjustment" or "refund",
+        "amount": 500,
+        "remark": "Sibling concession"
+    }
+    """
+    registration_number = request.GET.get('registration_number')
+    
+    if not registration_number:
+        return Response({'error': 'registration_number parameter is required'}, status=400)
+    staff_profile = get_staff_profile(request.user)
+    if not staff_profile:
+        return Response({
+            'error': 'Access denied. Staff privileges required.'
+        }, status=status.HTTP_403_FORBIDDEN)
+    try:
+        registration = StudentRegistration.objects.get(registration_number=registration_number)
+        
+        serializer = AddFeeAdjustmentSerializer(
+            data=request.data,
+            context={
+                'registration': registration,
+                'staff_profile': staff_profile
+            }
+        )
+        
+        if serializer.is_valid():
+            entry = serializer.save()
+            
+            return Response({
+                'message': f'{entry.get_entry_type_display()} of {abs(entry.amount)} recorded successfully',
+                'entry_details': PaymentTransactionSerializer(entry).data,
+                'paid_fee': float(registration.paid_fee),
+                'updated_balance': float(registration.fee_balance)
+            }, status=status.HTTP_201_CREATED)
+        
+        return Response({
+            'error': 'Validation failed',
+            'details': serializer.errors
+        }, status=status.HTTP_400_BAD_REQUEST)
+        
+    except StudentRegistration.DoesNotExist:
+        return Response({
+            'error': 'Registration not found'
+        }, status=status.HTTP_404_NOT_FOUND)
+    except DjangoValidationError as e:
+        # Raised by record_ledger_entry when paid_fee would leave 0..total_course_fee
+        return Response({
+            'error': 'Validation failed',
+            'details': e.message_dict
+        }, status=status.HTTP_400_BAD_REQUEST)
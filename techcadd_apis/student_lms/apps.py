@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class StudentLmsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'student_lms'
+
+    def ready(self):
+        from . import signals  # noqa: F401
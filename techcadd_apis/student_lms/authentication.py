@@ -48,7 +48,8 @@ class StudentJWTAuthentication(JWTAuthentication):
             if student_id is None:
                 raise AuthenticationFailed('Token contained no recognizable student identification')
             
-            student = StudentRegistration.objects.get(id=student_id)
+            # Course and course type are read by most student views, so they come in the same query
+            student = StudentRegistration.objects.select_related('course', 'course_type').get(id=student_id)
             
             # Add a flag to identify this as a student
             student.is_authenticated = True
@@ -0,0 +1,5 @@
+# student_lms/signals.py
+from techcadd_apis.app_cache import invalidate_on_change
+from .models import CourseModule, Lesson
+
+invalidate_on_change('course_tree', CourseModule, Lesson)
@@ -1,3 +1,85 @@
+import datetime
+from django.contrib.auth.models import User
 from django.test import TestCase
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import RefreshToken
+from staff_app.models import Course, CourseType, StaffProfile, StudentRegistration
+from .models import CourseModule, Lesson, StudentProgress
+from .utils import course_quick_stats
 
-# Create your tests here.
+
+class CourseQuickStatsTests(TestCase):
+    def setUp(self):
+        user = User.objects.create_user(username='staff', password='password')
+        self.staff_profile = StaffProfile.objects.create(user=user, role='admin')
+        course_type = CourseType.objects.create(name='Design')
+        self.course = Course.objects.create(
+            course_type=course_type, name='AutoCAD', duration_months='3_months', duration_hours=100, course_fee=10000
+        )
+        self.student = self.create_student('Asha')
+        self.classmate = self.create_student('Ravi')
+
+        module = CourseModule.objects.create(course=self.course, title='Basics')
+        hidden_module = CourseModule.objects.create(course=self.course, title='Hidden', is_active=False)
+        self.lessons = [Lesson.objects.create(module=module, title=f'Lesson {n}', order=n) for n in range(4)]
+        self.inactive_lesson = Lesson.objects.create(module=module, title='Retired', is_active=False)
+        self.hidden_lesson = Lesson.objects.create(module=hidden_module, title='Draft')
+
+    def create_student(self, name):
+        return StudentRegistration.objects.create(
+            branch='ludhiana', joining_date=datetime.date(2024, 1, 1), student_name=name, father_name='Father',
+            date_of_birth=datetime.date(2000, 1, 1), email=f'{name.lower()}@example.com', qualification='BCA',
+            work_college='College', contact_address='Address', phone_no='9999999999',
+            course_type=self.course.course_type, course=self.course, duration_months='3_months',
+            duration_hours=100, total_course_fee=10000, created_by=self.staff_profile
+        )
+
+    def progress(self, student, lesson, status, minutes):
+        return StudentProgress.objects.create(student=student, lesson=lesson, status=status, time_spent_minutes=minutes)
+
+    def test_counts_only_this_students_progress_on_active_lessons(self):
+        self.progress(self.student, self.lessons[0], 'completed', 30)
+        self.progress(self.student, self.lessons[1], 'in_progress', 10)
+        # Progress on lessons that are not shown any more is left out
+        self.progress(self.student, self.inactive_lesson, 'completed', 40)
+        self.progress(self.student, self.hidden_lesson, 'completed', 40)
+        # The classmate's rows join the same lessons and must not be counted
+        for lesson in self.lessons:
+            self.progress(self.classmate, lesson, 'completed', 50)
+
+        stats = course_quick_stats(self.student)
+
+        self.assertEqual(stats['total_lessons'], 4)
+        self.assertEqual(stats['completed_lessons'], 1)
+        self.assertEqual(stats['lessons_in_progress'], 1)
+        self.assertEqual(stats['time_spent_minutes'], 40)
+        self.assertEqual(stats['percent_complete'], 25.0)
+        self.assertEqual(stats['last_accessed_lesson']['id'], self.lessons[1].id)
+
+        classmate_stats = course_quick_stats(self.classmate)
+        self.assertEqual(classmate_stats['completed_lessons'], 4)
+        self.assertEqual(classmate_stats['percent_complete'], 100.0)
+
+    def test_no_progress_yet(self):
+        stats = course_quick_stats(self.student)
+        self.assertEqual(stats['completed_lessons'], 0)
+        self.assertEqual(stats['time_spent_minutes'], 0)
+        self.assertEqual(stats['percent_complete'], 0)
+        self.assertIsNone(stats['last_accessed_lesson'])
+
+    def test_dashboard_keeps_the_original_quick_stats_keys(self):
+        self.progress(self.student, self.lessons[0], 'completed', 30)
+        refresh = RefreshToken()
+        refresh['student_id'] = self.student.id
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Bearer {refresh.access_token}')
+
+        response = client.get('/api/student/lms/dashboard/')
+
+        self.assertEqual(response.status_code, 200)
+        quick_stats = response.data['dashboard']['quick_stats']
+        self.assertEqual(quick_stats['total_courses'], 1)
+        self.assertEqual(quick_stats['upcoming_classes'], 0)
+        self.assertEqual(quick_stats['pending_assignments'], 0)
+        self.assertEqual(quick_stats['completed_lessons'], 1)
+        self.assertEqual(quick_stats['percent_complete'], 25.0)
@@ -6,6 +6,7 @@ urlpatterns = [
     # Authentication
     path('login/', views.student_login, name='student-login'),
     path('dashboard/', views.student_dashboard, name='student-dashboard'),
+    path('certificate/', views.my_certificate, name='student-certificate'),
     # Debug (remove after fixing)
     path('debug-course/', views.debug_course, name='debug-course'),
     
@@ -1,5 +1,7 @@
 # student_lms/utils.py
+from django.db.models import Count, FilteredRelation, Q, Sum
 from rest_framework.exceptions import AuthenticationFailed
+from .models import Lesson, StudentProgress
 
 def get_student_from_token(request):
     """
@@ -8,4 +10,50 @@ def get_student_from_token(request):
     """
     if hasattr(request.user, 'registration_number'):
         return request.user
-    raise AuthenticationFailed('Invalid student authentication')
\ No newline at end of file
+    raise AuthenticationFailed('Invalid student authentication')
+
+
+def course_quick_stats(student):
+    """
+    Progress over the active lessons of the student's course in one aggregate query;
+    the join only pulls this student's progress rows
+    """
+    stats = Lesson.objects.filter(
+        module__course_id=student.course_id,
+        module__is_active=True,
+        is_active=True
+    ).annotate(
+        my_progress=FilteredRelation('student_progress', condition=Q(student_progress__student=student))
+    ).aggregate(
+        total_lessons=Count('id'),
+        completed_lessons=Count('my_progress', filter=Q(my_progress__status='completed')),
+        lessons_in_progress=Count('my_progress', filter=Q(my_progress__status='in_progress')),
+        time_spent_minutes=Sum('my_progress__time_spent_minutes'),
+    )
+
+    last_progress = StudentProgress.objects.filter(
+        student=student,
+        lesson__module__course_id=student.course_id,
+        lesson__module__is_active=True,
+        lesson__is_active=True
+    ).select_related('lesson').order_by('-last_accessed').first()
+
+    total = stats['total_lessons']
+    return {
+        # Keys the dashboard has always sent; there is no class schedule or assignment
+        # submission model yet, so those two stay 0 until there is
+        'total_courses': 1,
+        'upcoming_classes': 0,
+        'pending_assignments': 0,
+        'total_lessons': total,
+        'completed_lessons': stats['completed_lessons'],
+        'lessons_in_progress': stats['lessons_in_progress'],
+        'time_spent_minutes': stats['time_spent_minutes'] or 0,
+        'percent_complete': round(stats['completed_lessons'] * 100 / total, 1) if total else 0,
+        'last_accessed_lesson': {
+            'id': last_progress.lesson.id,
+            'title': last_progress.lesson.title,
+            'module_id': last_progress.lesson.module_id,
+            'last_accessed': last_progress.last_accessed,
+        } if last_progress else None,
+    }
@@ -7,7 +7,9 @@ from rest_framework_simplejwt.tokens import RefreshToken
 from .serializers import StudentLoginSerializer, StudentDashboardSerializer
 from .authentication import StudentJWTAuthentication
 from .permissions import IsStudentAuthenticated
+from .utils import course_quick_stats
 from staff_app.models import StudentRegistration
+from staff_app.certificates import certificate_document_response
 
 @api_view(['POST'])
 @permission_classes([AllowAny])
@@ -67,12 +69,7 @@ def student_dashboard(request):
         
         # Add some quick stats
         dashboard_data = serializer.data
-        dashboard_data['quick_stats'] = {
-            'total_courses': 1,
-            'completed_lessons': 0,
-            'upcoming_classes': 0,
-            'pending_assignments': 0,
-        }
+        dashboard_data['quick_stats'] = course_quick_stats(student)
         
         return Response({
             'message': 'Dashboard data retrieved successfully',
@@ -87,6 +84,14 @@ def student_dashboard(request):
         }, status=status.HTTP_400_BAD_REQUEST)
 
 
+@api_view(['GET'])
+@authentication_classes([StudentJWTAuthentication])
+@permission_classes([IsStudentAuthenticated])
+def my_certificate(request):
+    """Download the student's own certificate document (202 while it is being rendered)"""
+    return certificate_document_response(request.user)
+
+
     # -------------------course details view-------------------
 # student_lms/course_views.py
 from rest_framework import status
@@ -0,0 +1,213 @@
+# techcadd_apis/app_cache.py
+"""
+Application cache shared by staff_app, student_lms and admin_app
+
+Two levels: a small in-process LRU in front of the configured Django cache (CACHES['default']).
+Keys live in a namespace per domain and embed that namespace's version, so invalidating a
+domain is one counter bump: post_save/post_delete of the models wired with
+invalidate_on_change() bump it, and every key written under the old version is simply
+never read again.
+
+    from techcadd_apis import app_cache
+    options = app_cache.get_or_set('catalog', 'registration-options', build_options)
+"""
+import threading
+import time
+from collections import OrderedDict
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+
+NAMESPACES = ('catalog', 'staff_directory', 'course_tree', 'stats')
+
+KEY_PREFIX = 'app'
+_MISSING = object()
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+class LocalLRU:
+    """Thread-safe in-process LRU with per-entry expiry"""
+
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return _MISSING
+            value, expires_at = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                return _MISSING
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, timeout):
+        with self._lock:
+            self._entries[key] = (value, time.monotonic() + timeout)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+class CacheStats:
+    """Per-namespace hit/miss counters and time spent, for this process"""
+
+    FIELDS = ('local_hits', 'shared_hits', 'misses', 'lookup_seconds', 'compute_seconds')
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._namespaces = {}
+
+    def add(self, namespace, **amounts):
+        with self._lock:
+            counters = self._namespaces.setdefault(namespace, dict.fromkeys(self.FIELDS, 0))
+            for field, amount in amounts.items():
+                counters[field] += amount
+
+    def snapshot(self):
+        with self._lock:
+            namespaces = {namespace: dict(counters) for namespace, counters in self._namespaces.items()}
+        for counters in namespaces.values():
+            lookups = counters['local_hits'] + counters['shared_hits'] + counters['misses']
+            counters['hit_rate'] = round((lookups - counters['misses']) / lookups, 3) if lookups else None
+            counters['avg_lookup_ms'] = round(counters['lookup_seconds'] * 1000 / lookups, 3) if lookups else None
+            counters['avg_compute_ms'] = (
+                round(counters['compute_seconds'] * 1000 / counters['misses'], 3) if counters['misses'] else None
+            )
+        return namespaces
+
+    def reset(self):
+        with self._lock:
+            self._namespaces.clear()
+
+
+_local = LocalLRU(_setting('APP_CACHE_LOCAL_MAX_ENTRIES', 1000))
+_versions = {}
+_versions_lock = threading.Lock()
+stats = CacheStats()
+
+
+def _check_namespace(namespace):
+    if namespace not in NAMESPACES:
+        raise ValueError(f'Unknown cache namespace "{namespace}"')
+
+
+def _version_key(namespace):
+    return f'{KEY_PREFIX}:{namespace}:version'
+
+
+def _fresh_version():
+    # Time based, so a version key lost to eviction never restarts at a number already used
+    return int(time.time() * 1000)
+
+
+def get_version(namespace):
+    """
+    Current version of a namespace. Read from the shared cache at most every
+    APP_CACHE_VERSION_CHECK_SECONDS, which bounds how long another process can serve
+    in-process entries after an invalidation
+    """
+    now = time.monotonic()
+    with _versions_lock:
+        known = _versions.get(namespace)
+    if known and known[1] > now:
+        return known[0]
+
+    version = cache.get_or_set(_version_key(namespace), _fresh_version, timeout=None)
+    with _versions_lock:
+        _versions[namespace] = (version, now + _setting('APP_CACHE_VERSION_CHECK_SECONDS', 2))
+    return version
+
+
+def invalidate(namespace):
+    """Orphan every key of a namespace by bumping its version"""
+    _check_namespace(namespace)
+    try:
+        version = cache.incr(_version_key(namespace))
+    except ValueError:
+        version = _fresh_version()
+        cache.set(_version_key(namespace), version, timeout=None)
+    with _versions_lock:
+        _versions[namespace] = (version, time.monotonic() + _setting('APP_CACHE_VERSION_CHECK_SECONDS', 2))
+
+
+def make_key(namespace, key):
+    _check_namespace(namespace)
+    return f'{KEY_PREFIX}:{namespace}:v{get_version(namespace)}:{key}'
+
+
+def get(namespace, key, default=None):
+    started = time.perf_counter()
+    full_key = make_key(namespace, key)
+    value = _local.get(full_key)
+    if value is not _MISSING:
+        stats.add(namespace, local_hits=1, lookup_seconds=time.perf_counter() - started)
+        return value
+
+    value = cache.get(full_key, _MISSING)
+    if value is _MISSING:
+        stats.add(namespace, misses=1, lookup_seconds=time.perf_counter() - started)
+        return default
+
+    _local.set(full_key, value, _setting('APP_CACHE_LOCAL_TTL', 30))
+    stats.add(namespace, shared_hits=1, lookup_seconds=time.perf_counter() - started)
+    return value
+
+
+def set(namespace, key, value, timeout=None):
+    timeout = timeout if timeout is not None else _setting('APP_CACHE_DEFAULT_TTL', 300)
+    full_key = make_key(namespace, key)
+    cache.set(full_key, value, timeout)
+    _local.set(full_key, value, min(timeout, _setting('APP_CACHE_LOCAL_TTL', 30)))
+
+
+def get_or_set(namespace, key, producer, timeout=None):
+    """Cached value, or producer() stored under the current namespace version"""
+    value = get(namespace, key, _MISSING)
+    if value is not _MISSING:
+        return value
+
+    started = time.perf_counter()
+    value = producer()
+    stats.add(namespace, compute_seconds=time.perf_counter() - started)
+    set(namespace, key, value, timeout)
+    return value
+
+
+def invalidate_on_change(namespace, *models, fields=None):
+    """
+    Bump the namespace whenever one of the models is saved or deleted
+    With fields, a save(update_fields=...) that touches none of them is ignored
+    (e.g. the last_login update on every User sign-in)
+    """
+    _check_namespace(namespace)
+    watched = frozenset(fields) if fields is not None else None
+
+    def receiver(sender, update_fields=None, **kwargs):
+        if watched is not None and update_fields is not None and not watched & update_fields:
+            return
+        # After commit, so a concurrent read cannot cache the pre-commit data under the new version
+        transaction.on_commit(lambda: invalidate(namespace))
+
+    for model in models:
+        dispatch_uid = f'app-cache:{namespace}:{model._meta.label}'
+        post_save.connect(receiver, sender=model, weak=False, dispatch_uid=dispatch_uid)
+        post_delete.connect(receiver, sender=model, weak=False, dispatch_uid=dispatch_uid)
+
+
+def clear_local():
+    _local.clear()
+    with _versions_lock:
+        _versions.clear()
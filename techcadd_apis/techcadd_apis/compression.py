@@ -0,0 +1,173 @@
+# techcadd_apis/compression.py
+"""
+Response compression: brotli when the client accepts it and the brotli package is installed,
+gzip otherwise
+
+Only responses whose content type is in COMPRESSION_CONTENT_TYPES are touched, so files that
+are already compressed (lesson PDFs, Office documents, images, video, zip) pass through as is,
+as does anything with a Content-Encoding or 'Cache-Control: no-transform'. Buffered responses
+below COMPRESSION_MIN_SIZE bytes are left alone; streaming responses are compressed chunk by
+chunk and flushed after every chunk so the client still receives them progressively.
+"""
+import re
+import zlib
+from django.conf import settings
+from django.utils.cache import patch_vary_headers
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+DEFAULT_CONTENT_TYPES = (
+    'application/json',
+    'application/javascript',
+    'application/xml',
+    'text/',
+    'image/svg+xml',
+)
+
+_accept_encoding_re = re.compile(r'\s*([\w*-]+)\s*(?:;\s*q\s*=\s*([0-9.]+))?\s*')
+
+
+def accepted_encodings(header):
+    """Codings from an Accept-Encoding header with a non-zero quality"""
+    codings = set()
+    for part in header.split(','):
+        match = _accept_encoding_re.fullmatch(part)
+        if not match:
+            continue
+        try:
+            quality = float(match.group(2)) if match.group(2) else 1.0
+        except ValueError:
+            continue
+        if quality > 0:
+            codings.add(match.group(1).lower())
+    return codings
+
+
+class GzipCompressor:
+    encoding = 'gzip'
+
+    def __init__(self, level):
+        # wbits=31 writes the gzip header and trailer
+        self._compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+
+    def compress(self, data):
+        return self._compressor.compress(data)
+
+    def flush(self):
+        return self._compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self):
+        return self._compressor.flush(zlib.Z_FINISH)
+
+
+class BrotliCompressor:
+    encoding = 'br'
+
+    def __init__(self, quality):
+        self._compressor = brotli.Compressor(quality=quality)
+
+    def compress(self, data):
+        return self._compressor.process(data)
+
+    def flush(self):
+        return self._compressor.flush()
+
+    def finish(self):
+        return self._compressor.finish()
+
+
+def get_compressor(encoding):
+    if encoding == 'br':
+        return BrotliCompressor(getattr(settings, 'COMPRESSION_BROTLI_QUALITY', 4))
+    return GzipCompressor(getattr(settings, 'COMPRESSION_GZIP_LEVEL', 6))
+
+
+def choose_encoding(accept_encoding):
+    codings = accepted_encodings(accept_encoding)
+    if brotli is not None and 'br' in codings:
+        return 'br'
+    if 'gzip' in codings:
+        return 'gzip'
+    return None
+
+
+def compress_bytes(data, encoding):
+    compressor = get_compressor(encoding)
+    return compressor.compress(data) + compressor.finish()
+
+
+def _compress_stream(chunks, encoding):
+    compressor = get_compressor(encoding)
+    for chunk in chunks:
+        data = compressor.compress(chunk) + compressor.flush()
+        if data:
+            yield data
+    yield compressor.finish()
+
+
+async def _compress_async_stream(chunks, encoding):
+    compressor = get_compressor(encoding)
+    async for chunk in chunks:
+        data = compressor.compress(chunk) + compressor.flush()
+        if data:
+            yield data
+    yield compressor.finish()
+
+
+def is_compressible(response):
+    content_type = response.get('Content-Type', '').split(';', 1)[0].strip().lower()
+    allowed = getattr(settings, 'COMPRESSION_CONTENT_TYPES', DEFAULT_CONTENT_TYPES)
+    return any(
+        content_type.startswith(allowed_type) if allowed_type.endswith('/') else content_type == allowed_type
+        for allowed_type in allowed
+    )
+
+
+class CompressionMiddleware:
+    """Replaces django.middleware.gzip.GZipMiddleware; place it first in MIDDLEWARE"""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        return self.compress_response(request, response)
+
+    def compress_response(self, request, response):
+        if response.has_header('Content-Encoding') or not is_compressible(response):
+            return response
+        if 'no-transform' in response.get('Cache-Control', ''):
+            return response
+        if not response.streaming and len(response.content) < getattr(settings, 'COMPRESSION_MIN_SIZE', 1024):
+            return response
+
+        # The representation depends on Accept-Encoding from here on, compressed or not
+        patch_vary_headers(response, ('Accept-Encoding',))
+        encoding = choose_encoding(request.META.get('HTTP_ACCEPT_ENCODING', ''))
+        if encoding is None:
+            return response
+
+        if response.streaming:
+            if response.is_async:
+                response.streaming_content = _compress_async_stream(response.streaming_content, encoding)
+            else:
+                response.streaming_content = _compress_stream(response.streaming_content, encoding)
+            # Unknown until the last chunk is sent
+            del response.headers['Content-Length']
+        else:
+            compressed = compress_bytes(response.content, encoding)
+            if len(compressed) >= len(response.content):
+                return response
+            response.content = compressed
+            response.headers['Content-Length'] = str(len(compressed))
+
+        # A compressed body is a different representation; keep conditional requests working
+        # with a weak ETag (RFC 9110 8.8.1), as GZipMiddleware does
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response.headers['ETag'] = 'W/' + etag
+        response.headers['Content-Encoding'] = encoding
+        return response
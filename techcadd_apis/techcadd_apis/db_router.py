@@ -0,0 +1,109 @@
+# techcadd_apis/db_router.py
+import contextvars
+import functools
+import hashlib
+import random
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, connections
+
+PIN_CACHE_PREFIX = 'db-pinned:'
+
+# Per request: None outside a request, otherwise {'replica': bool, 'pinned': bool, 'wrote': bool}
+_request_state = contextvars.ContextVar('db_request_state', default=None)
+
+
+def get_replicas():
+    return getattr(settings, 'DATABASE_REPLICAS', [])
+
+
+def _client_key(request):
+    """Who 'the client' is for read-your-writes: the bearer token, else the session, else the address"""
+    identity = (
+        request.headers.get('Authorization')
+        or request.COOKIES.get(settings.SESSION_COOKIE_NAME)
+        or request.META.get('REMOTE_ADDR', '')
+    )
+    return PIN_CACHE_PREFIX + hashlib.sha256(identity.encode()).hexdigest()
+
+
+class PrimaryReplicaRouter:
+    """
+    Writes always go to the primary. Reads go to a replica only inside views marked with
+    @replica_reads, and never once this client wrote recently or this request has written
+    """
+
+    def db_for_read(self, model, **hints):
+        state = _request_state.get()
+        replicas = get_replicas()
+        if not state or not state['replica'] or state['pinned'] or not replicas:
+            return DEFAULT_DB_ALIAS
+        # Reads inside a transaction on the primary must see that transaction
+        if connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return DEFAULT_DB_ALIAS
+        return random.choice(replicas)
+
+    def db_for_write(self, model, **hints):
+        state = _request_state.get()
+        if state:
+            state['pinned'] = state['wrote'] = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        aliases = {DEFAULT_DB_ALIAS, *get_replicas()}
+        return obj1._state.db in aliases and obj2._state.db in aliases
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Replicas get their schema through replication
+        return db not in get_replicas()
+
+
+class ReplicaStickinessMiddleware:
+    """
+    Tracks read preference per request. After a request writes, the same client reads
+    from the primary for REPLICA_STICKY_SECONDS so it sees its own changes
+
+    The pin is kept in the default cache. With the shipped locmem cache that is per
+    process, so a client whose next request lands on another worker can read from a
+    replica inside the window; with several workers configure a shared CACHE_BACKEND
+    (file or redis), or carry the pin in a signed cookie instead
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not get_replicas():
+            return self.get_response(request)
+
+        key = _client_key(request)
+        state = {'replica': False, 'pinned': bool(cache.get(key)), 'wrote': False}
+        token = _request_state.set(state)
+        try:
+            response = self.get_response(request)
+        finally:
+            _request_state.reset(token)
+
+        if state['wrote']:
+            cache.set(key, True, getattr(settings, 'REPLICA_STICKY_SECONDS', 5))
+        return response
+
+
+def replica_reads(view):
+    """
+    Let a read-only view's queries go to a replica (GET/HEAD only)
+    Place below @api_view, like @idempotent
+    """
+    @functools.wraps(view)
+    def wrapper(request, *args, **kwargs):
+        state = _request_state.get()
+        if state is None or request.method not in ('GET', 'HEAD'):
+            return view(request, *args, **kwargs)
+
+        previous = state['replica']
+        state['replica'] = True
+        try:
+            return view(request, *args, **kwargs)
+        finally:
+            state['replica'] = previous
+    return wrapper
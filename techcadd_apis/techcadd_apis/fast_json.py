@@ -0,0 +1,74 @@
+# techcadd_apis/fast_json.py
+"""
+orjson-backed JSON renderer and parser for DRF (pip install orjson)
+
+Output matches rest_framework.renderers.JSONRenderer with the project's settings: compact,
+non-ASCII left as is, U+2028/U+2029 escaped, Decimal as a number, datetimes in ISO 8601
+with 'Z' for UTC. Types orjson does not know are handed to DRF's own encoder. Without orjson,
+or when the client asks for indentation, both classes behave exactly like DRF's.
+
+One difference: a NaN or infinite float renders as null, where DRF's strict encoder raises
+ValueError. Parsing rejects NaN/Infinity just like DRF.
+
+Enabled with FAST_JSON=1 (see REST_FRAMEWORK in settings.py).
+"""
+import codecs
+from django.conf import settings
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+_fallback_encoder = JSONEncoder()
+
+
+def _default(obj):
+    # Decimal -> float, timedelta, UUID, QuerySet, lazy strings ... exactly as DRF encodes them
+    return _fallback_encoder.default(obj)
+
+
+def _is_utf8(encoding):
+    try:
+        return codecs.lookup(encoding or 'utf-8').name == 'utf-8'
+    except LookupError:
+        return False
+
+
+class FastJSONRenderer(JSONRenderer):
+    options = (orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS) if orjson else 0
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if orjson is None or self.ensure_ascii or not self.compact:
+            return super().render(data, accepted_media_type, renderer_context)
+        if data is None:
+            return b''
+
+        renderer_context = renderer_context or {}
+        if self.get_indent(accepted_media_type, renderer_context):
+            return super().render(data, accepted_media_type, renderer_context)
+
+        ret = orjson.dumps(data, default=_default, option=self.options)
+        # Same escaping as DRF: these are valid JSON but break JavaScript string literals
+        return ret.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
+
+
+class FastJSONParser(JSONParser):
+    renderer_class = FastJSONRenderer
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        parser_context = parser_context or {}
+        encoding = parser_context.get('encoding', settings.DEFAULT_CHARSET)
+        if orjson is None or not _is_utf8(encoding):
+            return super().parse(stream, media_type, parser_context)
+
+        try:
+            # orjson rejects NaN/Infinity, as DRF does with STRICT_JSON
+            return orjson.loads(stream.read())
+        except orjson.JSONDecodeError as exc:
+            raise ParseError('JSON parse error - %s' % str(exc))
+
@@ -10,8 +10,12 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.1/ref/settings/
 """
 
+import importlib.util
+import os
 from pathlib import Path
 
+from django.core.exceptions import ImproperlyConfigured
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -45,6 +49,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # First, so it compresses the final response body
+    'techcadd_apis.compression.CompressionMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -52,6 +58,7 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'techcadd_apis.db_router.ReplicaStickinessMiddleware',
 ]
 
 ROOT_URLCONF = 'techcadd_apis.urls'
@@ -85,18 +92,65 @@ WSGI_APPLICATION = 'techcadd_apis.wsgi.application'
 #     }
 # }
 
+def env_flag(name, default=False):
+    return os.environ.get(name, str(default)).strip().lower() in ('1', 'true', 'yes', 'on')
+
+
+# Set by asgi.py. Under ASGI each sync view runs on an executor thread and a persistent
+# connection stays tied to that thread, so the ASGI default is to close connections
+# after every request (or use DB_POOL below)
+ASGI_DEPLOYMENT = env_flag('DJANGO_ASGI')
+
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.mysql',
-        'NAME': 'techcadd_api3',
-        'USER': 'root',
-        'PASSWORD': '',
-        'HOST':'localhost',
-        'PORT':'3306',
-        
+        'NAME': os.environ.get('DB_NAME', 'techcadd_api3'),
+        'USER': os.environ.get('DB_USER', 'root'),
+        'PASSWORD': os.environ.get('DB_PASSWORD', ''),
+        'HOST': os.environ.get('DB_HOST', 'localhost'),
+        'PORT': os.environ.get('DB_PORT', '3306'),
+        # WSGI workers keep connections open between requests instead of reconnecting every
+        # time; health checks drop a connection the server has closed before it is reused.
+        # Defaults to 0 under ASGI or with DB_POOL, where Django must not hold connections
+        'CONN_MAX_AGE': int(os.environ.get(
+            'DB_CONN_MAX_AGE', '0' if ASGI_DEPLOYMENT or env_flag('DB_POOL') else '60'
+        )),
+        'CONN_HEALTH_CHECKS': env_flag('DB_CONN_HEALTH_CHECKS', True),
     }
 }
 
+# Optional connection pool (pip install django-db-connection-pool[mysql]), mainly for the
+# ASGI deployment where each request may run on a different thread
+if env_flag('DB_POOL'):
+    if importlib.util.find_spec('dj_db_conn_pool') is None:
+        raise ImproperlyConfigured('DB_POOL is set but django-db-connection-pool is not installed')
+    DATABASES['default'].update({
+        'ENGINE': 'dj_db_conn_pool.backends.mysql',
+        # The pool owns connection reuse; Django must hand connections back after each request
+        'CONN_MAX_AGE': 0,
+        'POOL_OPTIONS': {
+            'POOL_SIZE': int(os.environ.get('DB_POOL_SIZE', '10')),
+            'MAX_OVERFLOW': int(os.environ.get('DB_POOL_MAX_OVERFLOW', '10')),
+            'RECYCLE': int(os.environ.get('DB_POOL_RECYCLE', '3600')),
+            'PRE_PING': True,
+        },
+    })
+
+# Read replicas: DB_REPLICA_HOSTS=host1,host2 adds replica1, replica2, ... with the primary's credentials.
+# Only views marked @replica_reads read from them (see techcadd_apis/db_router.py)
+DATABASE_REPLICAS = []
+for index, replica_host in enumerate(filter(None, os.environ.get('DB_REPLICA_HOSTS', '').split(',')), start=1):
+    alias = f'replica{index}'
+    DATABASES[alias] = {**DATABASES['default'], 'HOST': replica_host.strip(), 'TEST': {'MIRROR': 'default'}}
+    DATABASE_REPLICAS.append(alias)
+
+DATABASE_ROUTERS = ['techcadd_apis.db_router.PrimaryReplicaRouter']
+
+# After a client writes, its reads stay on the primary this long to cover replication lag.
+# The pin lives in the default cache (CACHES below): locmem only pins within one worker,
+# so run replicas with a shared cache backend when there is more than one worker
+REPLICA_STICKY_SECONDS = 5
+
 # REST Framework configuration
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
@@ -106,7 +160,23 @@ REST_FRAMEWORK = {
     'DEFAULT_PERMISSION_CLASSES': (
         'rest_framework.permissions.IsAuthenticated',
     ),
+    'DEFAULT_THROTTLE_RATES': {
+        # Public certificate verification, per client IP
+        'certificate_verify': '60/min',
+    },
 }
+
+# Opt-in orjson renderer/parser (FAST_JSON=1); falls back to DRF's encoder when orjson is missing
+if env_flag('FAST_JSON'):
+    REST_FRAMEWORK['DEFAULT_RENDERER_CLASSES'] = (
+        'techcadd_apis.fast_json.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    )
+    REST_FRAMEWORK['DEFAULT_PARSER_CLASSES'] = (
+        'techcadd_apis.fast_json.FastJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    )
 from datetime import timedelta
 SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': timedelta(hours=1),
@@ -129,6 +199,69 @@ SIMPLE_JWT = {
     'AUTH_TOKEN_CLASSES': ('rest_framework_simplejwt.tokens.AccessToken',),
     'TOKEN_TYPE_CLAIM': 'token_type',
 }
+
+# How long a stored Idempotency-Key response is replayed for retried POSTs
+IDEMPOTENCY_KEY_TTL = timedelta(hours=24)
+# How long a request that is still running holds its key; a retry after this reclaims a key
+# left behind by a worker that died mid-request. Keep it above the slowest POST it covers
+IDEMPOTENCY_KEY_LEASE = timedelta(seconds=60)
+
+# Rendered certificate documents; bump the version after editing the certificate template
+CERTIFICATE_ROOT = BASE_DIR / 'certificates'
+CERTIFICATE_TEMPLATE_VERSION = '1'
+CERTIFICATE_RENDER_WORKERS = 2
+# Cached public verification results; unknown numbers are cached for less time
+CERTIFICATE_VERIFY_CACHE_TTL = 3600
+CERTIFICATE_VERIFY_NOT_FOUND_TTL = 300
+
+# Seconds a staff dashboard's student_stats stay cached (dropped earlier on enquiry writes)
+STUDENT_STATS_CACHE_TTL = 60
+
+# Admin overview: served as is while fresh, then served stale while one background refresh runs
+ADMIN_OVERVIEW_FRESH_SECONDS = 60
+ADMIN_OVERVIEW_STALE_SECONDS = 600
+
+# Seconds a computed staff leaderboard ranking is reused
+LEADERBOARD_CACHE_TTL = 60
+
+# Shared cache behind techcadd_apis.app_cache and the stats/verification/overview caches.
+# locmem is per process: with several workers use the file backend (or redis) so invalidation
+# and replica stickiness are seen by every worker, e.g.
+#   CACHE_BACKEND=django.core.cache.backends.filebased.FileBasedCache CACHE_LOCATION=/var/tmp/techcadd_cache
+CACHES = {
+    'default': {
+        'BACKEND': os.environ.get('CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.environ.get('CACHE_LOCATION', 'techcadd'),
+        'TIMEOUT': 300,
+        'OPTIONS': {'MAX_ENTRIES': 10000},
+    }
+}
+
+# Application cache: in-process LRU size and lifetime, how often a worker re-reads namespace
+# versions bumped by other workers, and the default lifetime in the shared cache
+APP_CACHE_LOCAL_MAX_ENTRIES = 1000
+APP_CACHE_LOCAL_TTL = 30
+APP_CACHE_VERSION_CHECK_SECONDS = 2
+APP_CACHE_DEFAULT_TTL = 300
+
+# Form dropdown snapshots (student/registration options, courses by type): lifetime in the
+# application cache, and how long clients reuse them before revalidating with their ETag
+REFERENCE_DATA_CACHE_TTL = 3600
+REFERENCE_DATA_MAX_AGE = 600
+
+# Response compression (brotli when installed and accepted, else gzip). Only these content
+# types are compressed; lesson documents (PDF, Office, zip, media) are already compressed
+COMPRESSION_MIN_SIZE = 1024
+COMPRESSION_CONTENT_TYPES = (
+    'application/json',
+    'application/javascript',
+    'application/xml',
+    'text/',
+    'image/svg+xml',
+)
+COMPRESSION_GZIP_LEVEL = 6
+COMPRESSION_BROTLI_QUALITY = 4
+
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
 
@@ -0,0 +1,142 @@
+import datetime
+import gzip
+import io
+import json
+import uuid
+from decimal import Decimal
+from django.http import FileResponse, HttpResponse
+from django.test import RequestFactory, SimpleTestCase, override_settings
+from django.utils.translation import gettext_lazy
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from .compression import CompressionMiddleware, accepted_encodings
+from .fast_json import FastJSONParser, FastJSONRenderer
+
+BODY = json.dumps([{'id': n, 'name': f'Student {n}', 'status': 'follow_up_required'} for n in range(200)]).encode()
+
+
+@override_settings(COMPRESSION_MIN_SIZE=1024)
+class CompressionMiddlewareTests(SimpleTestCase):
+    def compress(self, response, accept_encoding='gzip'):
+        request = RequestFactory().get('/', HTTP_ACCEPT_ENCODING=accept_encoding)
+        return CompressionMiddleware(lambda request: response)(request)
+
+    def test_large_json_is_gzipped(self):
+        response = self.compress(HttpResponse(BODY, content_type='application/json'))
+
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(gzip.decompress(response.content), BODY)
+        self.assertEqual(response['Content-Length'], str(len(response.content)))
+        self.assertIn('Accept-Encoding', response['Vary'])
+
+    def test_body_below_threshold_is_untouched(self):
+        body = BODY[:1000]
+        response = self.compress(HttpResponse(body, content_type='application/json'))
+
+        self.assertFalse(response.has_header('Content-Encoding'))
+        self.assertFalse(response.has_header('Vary'))
+        self.assertEqual(response.content, body)
+
+    def test_already_compressed_types_pass_through(self):
+        for content_type in ('application/pdf', 'application/zip', 'image/png'):
+            with self.subTest(content_type=content_type):
+                response = self.compress(HttpResponse(BODY, content_type=content_type))
+                self.assertFalse(response.has_header('Content-Encoding'))
+                self.assertEqual(response.content, BODY)
+
+    def test_streaming_file_response_decompresses_to_the_original(self):
+        response = FileResponse(io.BytesIO(BODY), content_type='text/csv')
+        response.block_size = 512
+        self.assertEqual(response['Content-Length'], str(len(BODY)))
+
+        response = self.compress(response)
+        chunks = list(response.streaming_content)
+
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertFalse(response.has_header('Content-Length'))
+        # Flushed per chunk, so the client receives the file progressively
+        self.assertGreater(len(chunks), 1)
+        self.assertEqual(gzip.decompress(b''.join(chunks)), BODY)
+
+    def test_zero_quality_is_honoured(self):
+        for header in ('gzip;q=0', 'gzip; q=0.0, identity', 'br;q=0'):
+            with self.subTest(accept_encoding=header):
+                response = self.compress(HttpResponse(BODY, content_type='application/json'), header)
+                self.assertFalse(response.has_header('Content-Encoding'))
+                self.assertEqual(response.content, BODY)
+                # Still varies: another Accept-Encoding would get a compressed body
+                self.assertIn('Accept-Encoding', response['Vary'])
+
+    def test_accepted_encodings(self):
+        self.assertEqual(accepted_encodings('gzip;q=0, br, deflate;q=0.5'), {'br', 'deflate'})
+        self.assertEqual(accepted_encodings(''), set())
+
+    def test_etag_is_weakened_when_compressed(self):
+        response = HttpResponse(BODY, content_type='application/json')
+        response['ETag'] = '"abc123"'
+        self.assertEqual(self.compress(response)['ETag'], 'W/"abc123"')
+
+        uncompressed = HttpResponse(BODY, content_type='application/json')
+        uncompressed['ETag'] = '"abc123"'
+        self.assertEqual(self.compress(uncompressed, 'identity')['ETag'], '"abc123"')
+
+    def test_no_transform_and_encoded_responses_are_left_alone(self):
+        response = HttpResponse(BODY, content_type='application/json')
+        response['Cache-Control'] = 'no-transform'
+        self.assertFalse(self.compress(response).has_header('Content-Encoding'))
+
+        encoded = HttpResponse(b'already', content_type='application/json')
+        encoded['Content-Encoding'] = 'br'
+        self.assertEqual(self.compress(encoded).content, b'already')
+
+
+class FastJSONTests(SimpleTestCase):
+    def test_renders_the_same_bytes_as_drf(self):
+        payloads = {
+            'decimal': Decimal('12.50'),
+            'date': datetime.date(2024, 1, 2),
+            'aware_datetime': datetime.datetime(2024, 1, 2, 3, 4, 5, 123456, tzinfo=datetime.timezone.utc),
+            'offset_datetime': datetime.datetime(
+                2024, 1, 2, 3, 4, 5, tzinfo=datetime.timezone(datetime.timedelta(hours=5, minutes=30))
+            ),
+            'naive_datetime': datetime.datetime(2024, 1, 2, 3, 4, 5, 123456),
+            'time': datetime.time(3, 4, 5),
+            'lazy_string': gettext_lazy('Follow Up Required'),
+            'line_separators': 'one\u2028two\u2029three',
+            'non_ascii': 'Ludhiana – ਲੁਧਿਆਣਾ',
+            'uuid': uuid.UUID(int=1),
+            'duration': datetime.timedelta(hours=1),
+            'integer_keys': {1: 'one'},
+            'nested': [{'amount': Decimal('0.10'), 'paid_on': datetime.date(2024, 2, 29), 'note': None}],
+        }
+        for name, value in payloads.items():
+            with self.subTest(name):
+                data = {name: value}
+                self.assertEqual(FastJSONRenderer().render(data), JSONRenderer().render(data))
+
+    def test_line_separators_are_escaped(self):
+        self.assertEqual(FastJSONRenderer().render(['a\u2028b']), b'["a\\u2028b"]')
+
+    def test_non_finite_floats_render_as_null(self):
+        # Documented difference: DRF's strict encoder raises instead
+        self.assertEqual(FastJSONRenderer().render({'rate': float('nan')}), b'{"rate":null}')
+        with self.assertRaises(ValueError):
+            JSONRenderer().render({'rate': float('nan')})
+
+    def test_none_renders_an_empty_body(self):
+        self.assertEqual(FastJSONRenderer().render(None), JSONRenderer().render(None))
+
+    def test_parses_like_drf(self):
+        body = '{"name": "ਲੁਧਿਆਣਾ", "amount": 12.5, "tags": [1, null, true]}'.encode()
+        self.assertEqual(
+            FastJSONParser().parse(io.BytesIO(body)),
+            JSONParser().parse(io.BytesIO(body))
+        )
+
+    def test_parse_errors(self):
+        for body in (b'', b'{"amount": NaN}', b'[Infinity]', b'{"amount": '):
+            for parser in (FastJSONParser(), JSONParser()):
+                with self.subTest(body=body, parser=type(parser).__name__):
+                    with self.assertRaises(ParseError):
+                        parser.parse(io.BytesIO(body))